@@ -0,0 +1,234 @@
+"""Declarative achievement rules evaluated when entries are written
+
+Each rule names the events that can change its outcome. Writers call into
+this module inside their own transaction; it bumps the per-user progress
+counters in ``user_achievement_progress``, runs only the rules subscribed to
+the events the write caused, and records every unlock in one INSERT.
+
+Scopes are user ids, with 0 meaning "all entries" (see ``models.Streak``).
+"""
+
+ENTRY_ADDED = 'entry_added'
+CATEGORY_ADDED = 'category_added'
+DAILY_COUNT_CHANGED = 'daily_count_changed'
+STREAK_CHANGED = 'streak_changed'
+
+ALL_EVENTS = frozenset({ENTRY_ADDED, CATEGORY_ADDED, DAILY_COUNT_CHANGED, STREAK_CHANGED})
+
+class Rule:
+    def __init__(self, achievement, events, check):
+        self.achievement = achievement
+        self.events = frozenset(events)
+        self.check = check
+
+# Checks receive the scope's user_achievement_progress row
+RULES = [
+    Rule("Starter Ship", {ENTRY_ADDED},
+         lambda progress: progress['ships'] >= 1),
+    Rule("Weekly Warrior", {STREAK_CHANGED},
+         lambda progress: progress['longest_streak'] >= 7),
+    Rule("Monthly Master", {STREAK_CHANGED},
+         lambda progress: progress['longest_streak'] >= 30),
+    Rule("Category Collector", {CATEGORY_ADDED},
+         lambda progress: progress['distinct_categories'] >= 5),  # All categories shipped
+    Rule("Speed Demon", {DAILY_COUNT_CHANGED},
+         lambda progress: progress['max_daily_count'] >= 3),
+]
+
+PROGRESS_COLUMNS = ['user_id', 'ships', 'distinct_categories', 'max_daily_count',
+                    'current_streak', 'longest_streak']
+
+def _fetch_progress(cur):
+    row = cur.fetchone()
+    return dict(zip(PROGRESS_COLUMNS, row)) if row else None
+
+def dispatch(cur, scope, events, progress=None):
+    """
+    Evaluate the rules subscribed to ``events`` for one scope
+
+    Args:
+        cur: Cursor in the writer's transaction, so unlocks commit with the write
+        scope (int): User id, or 0 for all entries
+        events (iterable): Event names caused by the write
+        progress (dict): The scope's progress row if the caller already has it
+
+    Returns:
+        list: Names of achievements unlocked by this call
+    """
+    events = frozenset(events)
+    rules = [rule for rule in RULES if rule.events & events]
+    if not rules:
+        return []
+
+    if progress is None:
+        cur.execute(f"""
+            SELECT {', '.join(PROGRESS_COLUMNS)}
+            FROM user_achievement_progress WHERE user_id = %s
+        """, (scope,))
+        progress = _fetch_progress(cur)
+        if progress is None:
+            return []
+
+    passed = [rule.achievement for rule in rules if rule.check(progress)]
+    if not passed:
+        return []
+
+    cur.execute("""
+        INSERT INTO user_achievements (user_id, achievement_id)
+        SELECT %s, id FROM achievements WHERE name = ANY(%s)
+        ON CONFLICT DO NOTHING
+        RETURNING achievement_id
+    """, (scope, passed))
+    unlocked = [row[0] for row in cur.fetchall()]
+    if not unlocked:
+        return []
+    cur.execute("SELECT name FROM achievements WHERE id = ANY(%s)", (unlocked,))
+    return [row[0] for row in cur.fetchall()]
+
+def on_entry_added(cur, scopes, ship_date, category):
+    """
+    Fold one inserted entry into each scope's progress and fire its events
+
+    Must run after the insert and after streaks are updated, in the same
+    transaction.
+    """
+    unlocked = []
+    for scope in scopes:
+        events = {ENTRY_ADDED, DAILY_COUNT_CHANGED, STREAK_CHANGED}
+
+        new_category = 0
+        if category is not None:
+            cur.execute("""
+                INSERT INTO user_categories (user_id, category) VALUES (%s, %s)
+                ON CONFLICT DO NOTHING
+                RETURNING 1
+            """, (scope, category))
+            if cur.fetchone() is not None:
+                new_category = 1
+                events.add(CATEGORY_ADDED)
+
+        if scope == 0:
+            cur.execute("SELECT count FROM entry_daily_counts WHERE date = %s", (ship_date,))
+        else:
+            cur.execute("""
+                SELECT COUNT(*) FROM shipping_entries WHERE user_id = %s AND date = %s
+            """, (scope, ship_date))
+        row = cur.fetchone()
+        daily_count = row[0] if row else 1
+
+        cur.execute(f"""
+            INSERT INTO user_achievement_progress AS p
+                (user_id, ships, distinct_categories, max_daily_count,
+                 current_streak, longest_streak)
+            SELECT %(scope)s, 1, %(new_category)s, %(daily_count)s,
+                   COALESCE(s.current_streak, 0), COALESCE(s.longest_streak, 0)
+            FROM (SELECT 1) AS one
+            LEFT JOIN streaks s ON s.user_id = %(scope)s
+            WHERE TRUE  -- lets SQLite tell the upsert's ON from the join's
+            ON CONFLICT (user_id) DO UPDATE SET
+                ships = p.ships + 1,
+                distinct_categories = p.distinct_categories + EXCLUDED.distinct_categories,
+                max_daily_count = GREATEST(p.max_daily_count, EXCLUDED.max_daily_count),
+                current_streak = EXCLUDED.current_streak,
+                longest_streak = EXCLUDED.longest_streak,
+                updated_at = CURRENT_TIMESTAMP
+            RETURNING {', '.join(PROGRESS_COLUMNS)}
+        """, {'scope': scope, 'new_category': new_category, 'daily_count': daily_count})
+
+        unlocked += dispatch(cur, scope, events, _fetch_progress(cur))
+    return unlocked
+
+def on_entries_changed(cur, scopes, events):
+    """Recount progress for scopes touched by an update or delete, then fire ``events``"""
+    scopes = sorted(set(scopes))
+    rebuild_progress(cur, scopes)
+    unlocked = []
+    for scope in scopes:
+        unlocked += dispatch(cur, scope, events)
+    return unlocked
+
+def events_for_update(columns):
+    """Events an update of the given shipping_entries columns can cause"""
+    events = set()
+    if 'category' in columns or 'user_id' in columns:
+        events.add(CATEGORY_ADDED)
+    if 'date' in columns or 'user_id' in columns:
+        events.update({DAILY_COUNT_CHANGED, STREAK_CHANGED})
+    return events
+
+def rebuild_progress(cur, scopes=None):
+    """
+    Recount progress counters for the given scopes with set-based SQL
+
+    User scopes are recounted from their own entries through the user_id
+    indexes; scope 0 is read from the entry rollups, which must already be
+    current, so no write rescans the whole table. Streaks must be current
+    too, since their values are copied over.
+
+    Args:
+        scopes (list): Scopes to rebuild, or None for every scope
+    """
+    everyone = scopes is None
+    scopes = list(scopes or [])
+    users = [scope for scope in scopes if scope != 0]
+    params = {'all': everyone, 'scopes': scopes, 'users': users}
+
+    cur.execute("""
+        DELETE FROM user_categories WHERE %(all)s OR user_id = ANY(%(scopes)s)
+    """, params)
+    cur.execute("""
+        DELETE FROM user_achievement_progress WHERE %(all)s OR user_id = ANY(%(scopes)s)
+    """, params)
+
+    if everyone or users:
+        scoped = f"""
+            SELECT user_id AS scope, date, category FROM shipping_entries
+            WHERE user_id {'IS NOT NULL' if everyone else '= ANY(%(users)s)'}
+        """
+        cur.execute(f"""
+            INSERT INTO user_categories (user_id, category)
+            SELECT DISTINCT scope, category FROM ({scoped}) AS scoped
+            WHERE category IS NOT NULL
+        """, params)
+        cur.execute(f"""
+            WITH scoped AS ({scoped}),
+            daily AS (
+                SELECT scope, COUNT(*) AS day_count FROM scoped GROUP BY scope, date
+            )
+            INSERT INTO user_achievement_progress
+                (user_id, ships, distinct_categories, max_daily_count,
+                 current_streak, longest_streak)
+            SELECT t.scope, t.ships, t.categories, d.max_daily_count,
+                   COALESCE(s.current_streak, 0), COALESCE(s.longest_streak, 0)
+            FROM (
+                SELECT scope, COUNT(*) AS ships, COUNT(DISTINCT category) AS categories
+                FROM scoped GROUP BY scope
+            ) AS t
+            JOIN (
+                SELECT scope, MAX(day_count) AS max_daily_count FROM daily GROUP BY scope
+            ) AS d USING (scope)
+            LEFT JOIN streaks s ON s.user_id = t.scope
+        """, params)
+
+    if everyone or 0 in scopes:
+        # NULL categories are rolled up as ''
+        cur.execute("""
+            INSERT INTO user_categories (user_id, category)
+            SELECT 0, category FROM entry_category_counts
+            WHERE category <> '' AND count > 0
+        """)
+        cur.execute("""
+            INSERT INTO user_achievement_progress
+                (user_id, ships, distinct_categories, max_daily_count,
+                 current_streak, longest_streak)
+            SELECT 0, d.ships,
+                   (SELECT COUNT(*) FROM user_categories WHERE user_id = 0),
+                   d.max_daily_count,
+                   COALESCE(s.current_streak, 0), COALESCE(s.longest_streak, 0)
+            FROM (
+                SELECT SUM(count) AS ships, MAX(count) AS max_daily_count
+                FROM entry_daily_counts
+            ) AS d
+            LEFT JOIN streaks s ON s.user_id = 0
+            WHERE d.ships > 0
+        """)
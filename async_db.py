@@ -0,0 +1,403 @@
+"""Asyncio data access for page loads
+
+Uses psycopg2's native asynchronous connections, driven by the event loop's
+reader/writer callbacks, so several queries can be in flight at once on
+separate connections. The statements come from the models' ``*_query``
+methods; writes still go through the synchronous, transactional model
+methods (run in a worker thread).
+
+Async connections are always in autocommit mode, which suits the
+single-statement reads done here. Backends without an async driver (the
+embedded one) run each query on a worker thread instead.
+
+The async pool is separate from database.py's synchronous one and sized by
+DB_ASYNC_POOL_MAX (default 10), so one process can hold up to
+DB_POOL_MAX + DB_ASYNC_POOL_MAX connections; budget max_connections (or the
+pgbouncer pool) for that total.
+"""
+import os
+import time
+import asyncio
+import threading
+from datetime import date, timedelta
+import psycopg2
+import psycopg2.extensions
+from psycopg2.extras import RealDictCursor
+from werkzeug.security import check_password_hash
+import profiling
+from database import APPLICATION_NAME, dialect, get_connection, get_analytics_connection
+from models import User, ShippingEntry, EntryRollup, EntryStatusChange, Streak, Achievement
+
+async def _wait(conn):
+    """Drive an async connection until its pending operation completes"""
+    loop = asyncio.get_running_loop()
+    while True:
+        state = conn.poll()
+        if state == psycopg2.extensions.POLL_OK:
+            return
+
+        done = loop.create_future()
+        wake = lambda: done.done() or done.set_result(None)
+        fd = conn.fileno()
+        if state == psycopg2.extensions.POLL_READ:
+            loop.add_reader(fd, wake)
+            try:
+                await done
+            finally:
+                loop.remove_reader(fd)
+        elif state == psycopg2.extensions.POLL_WRITE:
+            loop.add_writer(fd, wake)
+            try:
+                await done
+            finally:
+                loop.remove_writer(fd)
+        else:
+            raise psycopg2.OperationalError(f"Unexpected poll state {state}")
+
+class AsyncConnectionPool:
+    """
+    Pool of async connections shared across event loops
+
+    Streamlit runs every session's script in its own thread, and each page
+    load runs its own short-lived loop, so bookkeeping uses a thread lock and
+    a connection only ever serves one coroutine at a time. A coroutine that
+    finds the pool full parks a future on its own loop, which putconn() wakes
+    thread-safely. Like database.ConnectionPool, connections idle past
+    ``health_check_after`` seconds are checked before reuse and ones idle past
+    ``max_idle`` are closed.
+    """
+
+    def __init__(self, max_size=10, max_idle=300, health_check_after=30, timeout=10):
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.health_check_after = health_check_after
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._idle = []  # (connection, returned_at), most recently used last
+        self._waiters = []  # (loop, future) of coroutines waiting for a slot
+        self._size = 0
+        self._stats = {'checkouts': 0, 'waits': 0, 'timeouts': 0, 'created': 0,
+                       'discarded': 0, 'reaped': 0, 'health_checks': 0}
+
+    async def _connect(self):
+        conn = psycopg2.connect(
+            host=os.environ['PGHOST'],
+            database=os.environ['PGDATABASE'],
+            user=os.environ['PGUSER'],
+            password=os.environ['PGPASSWORD'],
+            port=os.environ['PGPORT'],
+            application_name=APPLICATION_NAME,
+            async_=True,
+        )
+        await _wait(conn)
+        return conn
+
+    async def _is_healthy(self, conn, idle_for):
+        if conn.closed:
+            return False
+        if idle_for < self.health_check_after:
+            return True
+        with self._lock:
+            self._stats['health_checks'] += 1
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            await _wait(conn)
+            cur.close()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _reap_idle(self):
+        """Close connections idle past max_idle (lock held)"""
+        now = time.monotonic()
+        while self._idle and now - self._idle[0][1] > self.max_idle:
+            self._idle.pop(0)[0].close()
+            self._size -= 1
+            self._stats['reaped'] += 1
+
+    def _notify(self):
+        """Wake the longest-waiting coroutine still waiting (lock held)"""
+        while self._waiters:
+            loop, waiter = self._waiters.pop(0)
+            try:
+                loop.call_soon_threadsafe(lambda: waiter.done() or waiter.set_result(None))
+                return
+            except RuntimeError:
+                continue  # its loop has already closed
+
+    async def getconn(self):
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        while True:
+            with self._lock:
+                self._reap_idle()
+                conn = returned_at = waiter = None
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                elif self._size < self.max_size:
+                    self._size += 1  # reserve the slot before connecting outside the lock
+                else:
+                    if not waited:
+                        waited = True
+                        self._stats['waits'] += 1
+                    waiter = asyncio.get_running_loop().create_future()
+                    self._waiters.append((asyncio.get_running_loop(), waiter))
+
+            if waiter is not None:
+                try:
+                    await asyncio.wait_for(waiter, max(deadline - time.monotonic(), 0))
+                except asyncio.TimeoutError:
+                    with self._lock:
+                        if any(w[1] is waiter for w in self._waiters):
+                            self._waiters = [w for w in self._waiters if w[1] is not waiter]
+                        else:
+                            self._notify()  # woken as it timed out: pass the wakeup on
+                        self._stats['timeouts'] += 1
+                    raise TimeoutError(
+                        f"No async database connection available after {self.timeout}s")
+                continue
+
+            if conn is None:
+                try:
+                    conn = await self._connect()
+                except Exception:
+                    with self._lock:
+                        self._size -= 1
+                        self._notify()
+                    raise
+                with self._lock:
+                    self._stats['created'] += 1
+            elif not await self._is_healthy(conn, time.monotonic() - returned_at):
+                self.putconn(conn, discard=True)
+                continue
+
+            with self._lock:
+                self._stats['checkouts'] += 1
+            return conn
+
+    def putconn(self, conn, discard=False):
+        with self._lock:
+            if discard or conn.closed:
+                self._size -= 1
+                self._stats['discarded'] += 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._notify()
+        if discard and not conn.closed:
+            conn.close()
+
+    async def execute(self, sql, params=(), fetch='all', analytics=False):
+        conn = await self.getconn()
+        discard = True
+        try:
+            started = time.perf_counter()
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            cur.execute(sql, params)
+            await _wait(conn)
+            result = cur.fetchone() if fetch == 'one' else cur.fetchall()
+            # Includes time spent waiting on the event loop behind sibling queries
+            profiling.record_query(sql, time.perf_counter() - started, max(cur.rowcount, 0))
+            cur.close()
+            discard = False
+            return result
+        finally:
+            # A connection that failed mid-query may be left in an unknown state
+            self.putconn(conn, discard=discard)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, size=self._size, idle=len(self._idle),
+                        active=self._size - len(self._idle), max_size=self.max_size)
+
+class ThreadedQueryRunner:
+    """AsyncConnectionPool's interface over the synchronous backend, one worker thread per query"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {'queries': 0}
+
+    def _run(self, sql, params, fetch, analytics):
+        with (get_analytics_connection() if analytics else get_connection()) as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            try:
+                cur.execute(sql, params)
+                return cur.fetchone() if fetch == 'one' else cur.fetchall()
+            finally:
+                cur.close()
+
+    async def execute(self, sql, params=(), fetch='all', analytics=False):
+        with self._lock:
+            self._stats['queries'] += 1
+        return await asyncio.to_thread(self._run, sql, params, fetch, analytics)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_async_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                if dialect() != 'postgres':
+                    _pool = ThreadedQueryRunner()
+                else:
+                    _pool = AsyncConnectionPool(
+                        max_size=int(os.environ.get('DB_ASYNC_POOL_MAX', 10)),
+                        max_idle=float(os.environ.get('DB_POOL_MAX_IDLE', 300)),
+                        timeout=float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+                    )
+    return _pool
+
+async def fetch_all(query, analytics=False):
+    return await get_async_pool().execute(*query, analytics=analytics)
+
+async def fetch_one(query, analytics=False):
+    return await get_async_pool().execute(*query, fetch='one', analytics=analytics)
+
+class AsyncUser:
+    @staticmethod
+    async def get_by_username(username):
+        return await fetch_one(User.by_username_query(username))
+
+    @staticmethod
+    async def authenticate(username, password):
+        user = await AsyncUser.get_by_username(username)
+        # The password KDF is CPU-bound; keep it off the event loop
+        if user and await asyncio.to_thread(check_password_hash, user['password_hash'], password):
+            return user
+        return None
+
+class AsyncShippingEntry:
+    @staticmethod
+    async def add_entry(*args, **kwargs):
+        return await asyncio.to_thread(ShippingEntry.add_entry, *args, **kwargs)
+
+    @staticmethod
+    async def get_all_entries(user_id=None):
+        return await fetch_all(ShippingEntry.all_entries_query(user_id))
+
+    @staticmethod
+    async def get_entries_between(start, end, user_id=None):
+        return await fetch_all(ShippingEntry.between_query(start, end, user_id))
+
+    @staticmethod
+    async def get_recent(limit=5, user_id=None):
+        return await fetch_all(ShippingEntry.recent_query(limit, user_id))
+
+    @staticmethod
+    async def get_page(limit=50, cursor=None, user_id=None):
+        entries = await fetch_all(ShippingEntry.page_query(limit, cursor, user_id))
+        return ShippingEntry.page_result(entries, limit)
+
+    @staticmethod
+    async def search(query, limit=20, cursor=None, user_id=None):
+        entries = await fetch_all(ShippingEntry.search_query(query, limit, cursor, user_id))
+        return ShippingEntry.page_result(entries, limit, keys=('rank', 'date', 'id'))
+
+class AsyncEntryRollup:
+    @staticmethod
+    async def get_summary(since, user_id=None):
+        return await fetch_one(EntryRollup.summary_query(since, user_id), analytics=True)
+
+    @staticmethod
+    async def get_daily_counts(user_id=None):
+        return await fetch_all(EntryRollup.daily_counts_query(user_id), analytics=True)
+
+    @staticmethod
+    async def get_category_counts(user_id=None):
+        return await fetch_all(EntryRollup.category_counts_query(user_id), analytics=True)
+
+    @staticmethod
+    async def get_weekday_counts(user_id=None):
+        return await fetch_all(EntryRollup.weekday_counts_query(user_id), analytics=True)
+
+    @staticmethod
+    async def get_monthly_counts(user_id=None):
+        return await fetch_all(EntryRollup.monthly_counts_query(user_id), analytics=True)
+
+class AsyncEntryStatusChange:
+    @staticmethod
+    async def get_durations(from_status='Planned', to_status='Completed', user_id=None):
+        return await fetch_all(EntryStatusChange.durations_query(from_status, to_status, user_id))
+
+class AsyncStreak:
+    @staticmethod
+    async def get(user_id=None, tz=None):
+        return Streak.as_of_today(await fetch_one(Streak.get_query(user_id)), tz)
+
+class AsyncAchievement:
+    @staticmethod
+    async def get_achievements(user_id=None):
+        return await fetch_all(Achievement.achievements_query(user_id))
+
+# Every dataset a page can ask for, as name -> coroutine factory taking the
+# page context. ctx['scope'] is the owner whose entries are shown (None for
+# all, see User.entry_scope); ctx['user_id'] is the signed-in user.
+DATASETS = {
+    'summary': lambda ctx: AsyncEntryRollup.get_summary(
+        ctx['today'] - timedelta(days=7), ctx['scope']),
+    'streak': lambda ctx: AsyncStreak.get(ctx['scope']),
+    'timeline': lambda ctx: AsyncShippingEntry.get_entries_between(
+        ctx['today'] - timedelta(days=30), ctx['today'], ctx['scope']),
+    'category_counts': lambda ctx: AsyncEntryRollup.get_category_counts(ctx['scope']),
+    'daily_counts': lambda ctx: AsyncEntryRollup.get_daily_counts(ctx['scope']),
+    'weekday_counts': lambda ctx: AsyncEntryRollup.get_weekday_counts(ctx['scope']),
+    'monthly_counts': lambda ctx: AsyncEntryRollup.get_monthly_counts(ctx['scope']),
+    'durations': lambda ctx: AsyncEntryStatusChange.get_durations(user_id=ctx['scope']),
+    'recent': lambda ctx: AsyncShippingEntry.get_recent(5, ctx['scope']),
+    'entries': lambda ctx: AsyncShippingEntry.get_all_entries(ctx['scope']),
+    'achievements': lambda ctx: AsyncAchievement.get_achievements(ctx['user_id']),
+}
+
+# The datasets each page renders; pages not listed (Add Entry) need none
+PAGE_DATA = {
+    "Dashboard": ['summary', 'streak', 'timeline', 'category_counts', 'daily_counts', 'recent'],
+    "Analytics": ['weekday_counts', 'category_counts', 'daily_counts', 'monthly_counts',
+                  'durations'],
+    "Achievements": ['achievements'],
+    "Idea Generator": ['entries'],
+}
+
+class PageLoader:
+    """
+    Datasets for one rerun, each fetched at most once and only when asked for
+
+    prefetch() runs several queries concurrently (the page waits for the
+    slowest one); indexing fetches anything not prefetched on demand, e.g.
+    a chart input skipped because its figure was cached but evicted since.
+    """
+
+    def __init__(self, user_id=None, scope=None, today=None):
+        self.ctx = {'today': today or date.today(), 'user_id': user_id, 'scope': scope}
+        self._results = {}
+
+    async def _gather(self, names):
+        return await asyncio.gather(*(DATASETS[name](self.ctx) for name in names))
+
+    def prefetch(self, names):
+        missing = [name for name in dict.fromkeys(names) if name not in self._results]
+        if missing:
+            self._results.update(zip(missing, asyncio.run(self._gather(missing))))
+
+    def __getitem__(self, name):
+        if name not in self._results:
+            self.prefetch([name])
+        return self._results[name]
+
+    def __contains__(self, name):
+        return name in self._results
+
+    def loaded(self):
+        """Names fetched so far, in fetch order"""
+        return list(self._results)
+
+def load_page_data(page, user_id=None, skip=(), scope=None):
+    """A PageLoader with the page's datasets, minus ``skip``, already fetched"""
+    loader = PageLoader(user_id, scope)
+    loader.prefetch([name for name in PAGE_DATA.get(page, ()) if name not in skip])
+    return loader
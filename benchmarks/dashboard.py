@@ -0,0 +1,190 @@
+"""Benchmarks for the in-process work behind each dashboard page
+
+Feeds seeded synthetic histories (benchmarks/synthetic.py) of increasing
+size through the metric, streak, achievement-rule, chart, idea and
+analytics code, timing each case and recording its peak memory. No
+database is needed: inputs are shaped exactly like the rows the models
+return.
+
+The report is JSON; pass a previous report as --baseline to fail on
+regressions.
+
+Usage:
+    python benchmarks/dashboard.py --output baseline.json
+    python benchmarks/dashboard.py --sizes 100,10000,1000000 --baseline baseline.json
+"""
+import os
+import sys
+import json
+import logging
+import time
+import argparse
+import platform
+import statistics
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+import plotly
+import synthetic
+import achievement_rules
+from utils import compute_streaks
+from entry_frame import EntryFrame
+from components.analytics import calculate_metrics, render_analytics
+from components.charts import (create_shipping_timeline, create_category_distribution,
+                               create_shipping_frequency, create_completion_trend)
+from components.idea_generator import generate_project_idea
+
+DEFAULT_SIZES = [100, 1_000, 10_000, 100_000]
+
+def prepare(entries):
+    """Everything the cases read, built once per size outside the timings"""
+    today = entries[-1]['date']
+    frame = EntryFrame.from_entries(entries)
+    window = [entry for entry in entries if entry['date'] >= today - timedelta(days=30)]
+    return {
+        'entries': entries,
+        'frame': frame,
+        'timeline_frame': EntryFrame.from_entries(window),
+        'summary': synthetic.summary(entries, today - timedelta(days=7)),
+        'daily_counts': synthetic.daily_counts(entries),
+        'category_counts': synthetic.category_counts(entries),
+        'weekday_counts': synthetic.weekday_counts(entries),
+        'monthly_counts': synthetic.monthly_counts(entries),
+        'progress': synthetic.progress_rows(entries),
+        'days': np.array([entry['date'] for entry in entries], dtype='datetime64[D]'),
+        'owners': np.array([entry['user_id'] for entry in entries]),
+    }
+
+def _evaluate_rules(progress):
+    return [rule.achievement for row in progress for rule in achievement_rules.RULES
+            if rule.check(row)]
+
+# name -> callable taking the prepared context
+CASES = {
+    'EntryFrame.from_entries': lambda ctx: EntryFrame.from_entries(ctx['entries']),
+    'calculate_metrics': lambda ctx: calculate_metrics(ctx['summary']),
+    'compute_streaks': lambda ctx: compute_streaks(
+        np.concatenate([ctx['days'], ctx['days']]),
+        np.concatenate([ctx['owners'], np.zeros(len(ctx['owners']), dtype=np.int64)])),
+    'achievement_rules': lambda ctx: _evaluate_rules(ctx['progress']),
+    'create_shipping_timeline': lambda ctx: create_shipping_timeline(ctx['timeline_frame']),
+    'create_category_distribution': lambda ctx: create_category_distribution(ctx['category_counts']),
+    'create_shipping_frequency': lambda ctx: create_shipping_frequency(ctx['daily_counts']),
+    'generate_project_idea': lambda ctx: generate_project_idea(ctx['frame']),
+    'create_completion_trend': lambda ctx: create_completion_trend(ctx['monthly_counts']),
+    'render_analytics': lambda ctx: render_analytics(
+        ctx['weekday_counts'], ctx['category_counts'], ctx['daily_counts'], ctx['monthly_counts']),
+}
+
+def measure(call, ctx, repeat, budget):
+    """Time ``call`` up to ``repeat`` times (fewer once ``budget`` seconds are spent)"""
+    call(ctx)  # warm-up: imports, caches, first-call allocations
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < repeat:
+        t0 = time.perf_counter()
+        call(ctx)
+        timings.append((time.perf_counter() - t0) * 1000)
+        if time.perf_counter() - started > budget:
+            break
+
+    tracemalloc.start()
+    call(ctx)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {'runs': len(timings), 'median_ms': statistics.median(timings),
+            'min_ms': min(timings), 'peak_kib': peak / 1024}
+
+def run(sizes, seed, repeat, budget, cases, report=print):
+    results = []
+    for size in sizes:
+        started = time.perf_counter()
+        ctx = prepare(synthetic.generate_entries(size, seed=seed))
+        report(f"\n{size:,} entries (generated in {time.perf_counter() - started:.1f}s)")
+        for name in cases:
+            result = dict(case=name, entries=size, **measure(CASES[name], ctx, repeat, budget))
+            results.append(result)
+            report(f"  {name:<30} {result['median_ms']:10.2f} ms  "
+                   f"(min {result['min_ms']:.2f}, {result['runs']} runs)  "
+                   f"peak {result['peak_kib']:10.1f} KiB")
+    return results
+
+def compare(results, baseline, tolerance, min_delta_ms, min_delta_kib):
+    """Return (case, entries, metric, baseline value, value) for every regression"""
+    previous = {(row['case'], row['entries']): row for row in baseline['results']}
+    regressions = []
+    for row in results:
+        before = previous.get((row['case'], row['entries']))
+        if before is None:
+            continue
+        for metric, min_delta in (('median_ms', min_delta_ms), ('peak_kib', min_delta_kib)):
+            old, new = before[metric], row[metric]
+            if new > old * (1 + tolerance) and new - old > min_delta:
+                regressions.append((row['case'], row['entries'], metric, old, new))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help="Comma-separated entry counts (up to 1000000)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--budget', type=float, default=2.0,
+                        help="Seconds per case and size before repeats stop early")
+    parser.add_argument('--cases', default=','.join(CASES),
+                        help="Comma-separated subset of cases to run")
+    parser.add_argument('--output', help="Write the JSON report here")
+    parser.add_argument('--baseline', help="Previous JSON report to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Allowed relative slowdown / memory growth before failing")
+    parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                        help="Ignore slowdowns smaller than this (timer noise)")
+    parser.add_argument('--min-delta-kib', type=float, default=256.0)
+    args = parser.parse_args()
+
+    cases = args.cases.split(',')
+    unknown = [name for name in cases if name not in CASES]
+    if unknown:
+        parser.error(f"Unknown cases: {', '.join(unknown)}")
+
+    # Streamlit warns about the missing script context on every st.* call
+    logging.getLogger('streamlit.runtime.scriptrunner_utils.script_run_context').disabled = True
+
+    results = run([int(size) for size in args.sizes.split(',')],
+                  args.seed, args.repeat, args.budget, cases)
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'seed': args.seed,
+        'environment': {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'plotly': plotly.__version__,
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance,
+                              args.min_delta_ms, args.min_delta_kib)
+        for case, size, metric, old, new in regressions:
+            print(f"REGRESSION {case} @ {size:,}: {metric} {old:.2f} -> {new:.2f} "
+                  f"({(new / old - 1) * 100:+.0f}%)")
+        if regressions:
+            sys.exit(1)
+        print(f"\nNo regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""Query-plan regression harness for the queries issued by models.py
+
+Seeds a scratch Postgres database with a large synthetic history, calls
+the model methods the dashboard uses while recording every statement they
+send, then runs EXPLAIN (ANALYZE, BUFFERS) on each recorded query and
+write, rolling each one back. Exits non-zero if any plan falls back to a
+sequential scan of a large table, or if a row UPDATE or DELETE probes more
+monthly partitions than it targets.
+
+Usage (uses PGHOST/PGUSER/PGPASSWORD/PGPORT, never the app's PGDATABASE):
+    python benchmarks/query_plans.py --database shipping_bench --entries 500000
+"""
+import os
+import sys
+import json
+import argparse
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psycopg2
+import psycopg2.extensions
+from models import ShippingEntry
+
+CATEGORIES = ShippingEntry.CATEGORIES
+STATUSES = ShippingEntry.STATUSES
+
+class RecordingCursor:
+    """Cursor proxy that remembers every statement it executes"""
+
+    def __init__(self, cursor, log):
+        self._cursor = cursor
+        self._log = log
+
+    def execute(self, query, vars=None):
+        self._log.append((RecordingConnection.label, self._cursor.mogrify(query, vars)))
+        return self._cursor.execute(query, vars)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+class RecordingConnection(psycopg2.extensions.connection):
+    label = None
+    log = []
+
+    def cursor(self, *args, **kwargs):
+        return RecordingCursor(super().cursor(*args, **kwargs), RecordingConnection.log)
+
+def connect():
+    return psycopg2.connect(
+        host=os.environ['PGHOST'],
+        database=os.environ['PGDATABASE'],
+        user=os.environ['PGUSER'],
+        password=os.environ['PGPASSWORD'],
+        port=os.environ['PGPORT'],
+        connection_factory=RecordingConnection,
+    )
+
+def seed(cur, entries, users):
+    """Load a synthetic history with generate_series, then rebuild derived tables once"""
+    cur.execute("TRUNCATE shipping_entries")
+    cur.execute("DELETE FROM users WHERE username LIKE 'bench-%%'")
+    cur.execute("""
+        INSERT INTO users (username, password_hash, role)
+        SELECT 'bench-' || g, 'x', 'guest' FROM generate_series(1, %s) g
+    """, (users,))
+
+    cur.execute("""
+        SELECT ensure_entry_partition(month::date)
+        FROM generate_series(date_trunc('month', CURRENT_DATE - 3650), CURRENT_DATE,
+                             INTERVAL '1 month') AS month
+    """)
+
+    # Row triggers would maintain rollups one entry at a time; rebuild them afterwards instead
+    cur.execute("ALTER TABLE shipping_entries DISABLE TRIGGER USER")
+    cur.execute("""
+        INSERT INTO shipping_entries (date, project_name, description, category, status, user_id)
+        SELECT CURRENT_DATE - (random() * 3650)::int,
+               'project-' || g,
+               'Synthetic entry ' || g,
+               (%s::text[])[1 + floor(random() * %s)::int],
+               (%s::text[])[1 + floor(random() * %s)::int],
+               (SELECT MIN(id) FROM users WHERE username LIKE 'bench-%%') + floor(random() * %s)::int
+        FROM generate_series(1, %s) g
+    """, (CATEGORIES, len(CATEGORIES), STATUSES, len(STATUSES), users, entries))
+    cur.execute("ALTER TABLE shipping_entries ENABLE TRIGGER USER")
+
+    from rebuild_rollups import rebuild_all
+    rebuild_all(cur)
+    cur.execute("ANALYZE")
+
+def exercise_models():
+    """Call the model methods behind each page, labelling the statements they issue"""
+    from models import User, ShippingEntry, EntryRollup, Streak, Achievement
+
+    def run(label, call):
+        RecordingConnection.label = label
+        return call()
+
+    today = date.today()
+    user = run('User.get_by_username', lambda: User.get_by_username('bench-1'))
+    user_id = user['id'] if user else None
+
+    run('ShippingEntry.get_recent', lambda: ShippingEntry.get_recent(5))
+    run('ShippingEntry.get_entries_between',
+        lambda: ShippingEntry.get_entries_between(today - timedelta(days=30), today))
+    _, cursor = run('ShippingEntry.get_page', lambda: ShippingEntry.get_page(50))
+    run('ShippingEntry.get_page(cursor)', lambda: ShippingEntry.get_page(50, cursor))
+    # Seeded rows are 'project-<n>'/'Synthetic entry <n>', so one number matches a couple
+    _, cursor = run('ShippingEntry.search', lambda: ShippingEntry.search('42', 1))
+    if cursor:
+        run('ShippingEntry.search(cursor)', lambda: ShippingEntry.search('42', 1, cursor))
+    run('EntryRollup.get_summary', lambda: EntryRollup.get_summary(today - timedelta(days=7)))
+    run('EntryRollup.get_daily_counts', EntryRollup.get_daily_counts)
+    run('EntryRollup.get_category_counts', EntryRollup.get_category_counts)
+    run('EntryRollup.get_weekday_counts', EntryRollup.get_weekday_counts)
+    run('Streak.get', lambda: Streak.get(user_id))
+    run('Achievement.get_achievements', lambda: Achievement.get_achievements(user_id))
+    run('Achievement.get_progress', lambda: Achievement.get_progress(user_id))
+    entry_id = run('ShippingEntry.add_entry', lambda: ShippingEntry.add_entry(
+        today, 'plan-check', 'Inserted by the plan harness', 'Feature', 'Completed', user_id))
+    # Writes pass the entry's date along so Postgres can prune to its partition
+    run('ShippingEntry.bulk_update', lambda: ShippingEntry.bulk_update(
+        [(entry_id, {'status': 'In Progress'}, today)]))
+    run('ShippingEntry.bulk_update(date)', lambda: ShippingEntry.bulk_update(
+        [(entry_id, {'date': today - timedelta(days=1)}, today)]))
+    run('ShippingEntry.delete_entry', lambda: ShippingEntry.delete_entry(
+        entry_id, today - timedelta(days=1)))
+    RecordingConnection.label = None
+
+def walk(plan):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from walk(child)
+
+def scanned_rows(cur, relations):
+    """
+    Estimated rows per sequentially scanned table, partitions summed under their root
+
+    Monthly partitions of shipping_entries are small on their own; a plan that
+    scans all of them reads the whole table and has to count as such.
+    """
+    cur.execute("""
+        WITH RECURSIVE ancestry AS (
+            SELECT c.oid AS relid, c.oid AS root FROM pg_class c WHERE c.relname = ANY(%s::name[])
+            UNION ALL
+            SELECT a.relid, i.inhparent FROM ancestry a JOIN pg_inherits i ON i.inhrelid = a.root
+        )
+        SELECT r.relname, SUM(GREATEST(c.reltuples, 0))
+        FROM ancestry a
+        JOIN pg_class c ON c.oid = a.relid
+        JOIN pg_class r ON r.oid = a.root
+        WHERE NOT EXISTS (SELECT 1 FROM pg_inherits i WHERE i.inhrelid = a.root)
+        GROUP BY r.relname
+    """, (sorted(relations),))
+    return dict(cur.fetchall())
+
+def partition_parents(cur, relations):
+    """Parent table of each of ``relations`` that is a partition"""
+    cur.execute("""
+        SELECT c.relname, p.relname
+        FROM pg_class c
+        JOIN pg_inherits i ON i.inhrelid = c.oid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE c.relname = ANY(%s::name[])
+    """, (sorted(relations),))
+    return dict(cur.fetchall())
+
+# Statements worth planning; DDL, SET and the like are skipped
+EXPLAINED = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')
+# Writes that target known rows and so should prune to their partitions
+ROW_WRITES = ('UPDATE', 'DELETE')
+
+def check_plans(cur, statements, min_rows, max_partitions):
+    failures = []
+    for label, statement in statements:
+        sql = statement.decode().strip()
+        if not sql.upper().startswith(EXPLAINED):
+            continue
+        cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql)
+        result = cur.fetchone()[0][0]
+        nodes = list(walk(result['Plan']))
+
+        problems = []
+        relations = {node['Relation Name'] for node in nodes if node['Node Type'] == 'Seq Scan'}
+        if relations:
+            problems += [f"seq scan on {table}"
+                         for table, rows in sorted(scanned_rows(cur, relations).items())
+                         if rows >= min_rows]
+        # A writing CTE (bulk_update's WITH ... UPDATE) is a ModifyTable node too
+        if any(node['Node Type'] == 'ModifyTable' and node.get('Operation') in ('Update', 'Delete')
+               for node in nodes):
+            probed = {node['Relation Name'] for node in nodes
+                      if 'Relation Name' in node and node['Node Type'] != 'ModifyTable'
+                      and node.get('Actual Loops', 0) > 0}
+            per_parent = {}
+            for partition, parent in partition_parents(cur, probed).items():
+                per_parent[parent] = per_parent.get(parent, 0) + 1
+            problems += [f"{count} partitions of {parent} probed"
+                         for parent, count in sorted(per_parent.items())
+                         if count > max_partitions]
+        # EXPLAIN ANALYZE ran the statement: undo writes and keep locks short
+        cur.connection.rollback()
+
+        shared_hit = result['Plan'].get('Shared Hit Blocks', 0)
+        shared_read = result['Plan'].get('Shared Read Blocks', 0)
+        status = 'FAIL' if problems else 'ok'
+        print(f"{status:4} {label:<36} {result['Execution Time']:8.2f} ms  "
+              f"buffers hit={shared_hit} read={shared_read}"
+              + (f"  {'; '.join(problems)}" if problems else ""))
+        if problems:
+            failures.append((label, sql, '; '.join(problems),
+                             json.dumps(result['Plan'], indent=2)))
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', required=True,
+                        help="Scratch database to seed (must differ from PGDATABASE)")
+    parser.add_argument('--entries', type=int, default=200_000)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--min-rows', type=int, default=10_000,
+                        help="Sequential scans reading fewer rows than this are allowed "
+                             "(partitions count together under their parent)")
+    parser.add_argument('--max-partitions', type=int, default=1,
+                        help="Partitions of one table a single-row UPDATE or DELETE may probe")
+    parser.add_argument('--skip-seed', action='store_true',
+                        help="Reuse data seeded by a previous run")
+    args = parser.parse_args()
+
+    if args.database == os.environ.get('PGDATABASE'):
+        parser.error("Refusing to seed the application database; pass a scratch database")
+    os.environ['PGDATABASE'] = args.database
+
+    import database
+    database._pool = database.ConnectionPool(connect=connect)
+    from migrate import apply_migrations
+    apply_migrations()
+
+    with database.get_connection() as conn:
+        cur = conn.cursor()
+        if not args.skip_seed:
+            print(f"Seeding {args.entries} entries for {args.users} users...")
+            seed(cur, args.entries, args.users)
+        cur.close()
+
+    RecordingConnection.log.clear()
+    exercise_models()
+
+    with database.get_connection() as conn:
+        failures = check_plans(conn.cursor(), list(RecordingConnection.log),
+                               args.min_rows, args.max_partitions)
+
+    for label, sql, problems, plan in failures:
+        print(f"\n{label} regressed ({problems}):\n{sql}\n{plan}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""Cold-start benchmark: import cost of main.py and time to first render per page
+
+Every measurement runs in a fresh interpreter, like a new Streamlit worker.
+The import breakdown comes from ``python -X importtime -c "import main"``.
+Time to first render is the first script run of each page under
+streamlit.testing, as a guest, after Streamlit itself is imported (a real
+worker has it loaded already). Each page run also records which heavy
+modules ended up loaded. The app runs on the embedded backend
+(DB_BACKEND=embedded), seeded with a synthetic history in a temporary
+SQLite file, so no database server is needed.
+
+The report is JSON; pass a previous report as --baseline to fail on slower
+imports or first renders, or on a page that newly loads a heavy module.
+
+Usage:
+    python benchmarks/startup.py --output startup.json
+    python benchmarks/startup.py --baseline startup.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+PAGES = ["Dashboard", "Add Entry", "Analytics", "Achievements", "Idea Generator"]
+# Modules whose presence after a page's first render is part of the report
+HEAVY_MODULES = ['numpy', 'pandas', 'plotly.express', 'duckdb']
+
+def app_env(db_path):
+    return dict(os.environ, DB_BACKEND='embedded', SQLITE_PATH=db_path,
+                PROFILE_METRICS_FILE='', PYTHONPATH=ROOT)
+
+def seed(db_path, entries, seed_value):
+    """Create the embedded database with ``entries`` synthetic entries"""
+    os.environ.update(DB_BACKEND='embedded', SQLITE_PATH=db_path)
+    import synthetic
+    from database import init_db, get_connection, execute_values
+    from rebuild_rollups import rebuild_all
+
+    init_db()
+    rows = [(e['date'], e['project_name'], e['description'], e['category'], e['status'],
+             e['created_at'], e['user_id'])
+            for e in synthetic.generate_entries(entries, seed=seed_value)]
+    with get_connection() as conn:
+        cur = conn.cursor()
+        execute_values(cur, """
+            INSERT INTO shipping_entries
+                (date, project_name, description, category, status, created_at, user_id)
+            VALUES %s
+        """, rows, page_size=1000)
+        rebuild_all(cur)
+        cur.close()
+
+def parse_importtime(stderr, module='main'):
+    """Return (cumulative ms of ``module``, {direct import: cumulative ms})"""
+    children = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not cumulative.strip().isdigit():
+            continue  # the header line
+        depth = (len(name) - len(name.lstrip())) // 2
+        name = name.strip()
+        if depth == 0:
+            if name == module:
+                return int(cumulative) / 1000, children
+            children = {}
+        elif depth == 1:
+            children[name] = int(cumulative) / 1000
+    raise ValueError(f"{module} not found in -X importtime output")
+
+def measure_imports(env):
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import main'],
+                            cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return parse_importtime(result.stderr)
+
+def render_page(page):
+    """Child process: first and second run of ``page``; prints one JSON line"""
+    # Streamlit's own warnings about the bare test runtime
+    import logging
+    started = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    streamlit_ms = (time.perf_counter() - started) * 1000
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+
+    app = AppTest.from_file(os.path.join(ROOT, 'main.py'), default_timeout=300)
+    app.session_state['current_page'] = page
+    started = time.perf_counter()
+    app.run()
+    first_ms = (time.perf_counter() - started) * 1000
+    errors = [str(e.value) for e in app.exception]
+    loaded = {name: name in sys.modules for name in HEAVY_MODULES}
+
+    started = time.perf_counter()
+    app.run()
+    rerun_ms = (time.perf_counter() - started) * 1000
+
+    print(json.dumps({'streamlit_ms': streamlit_ms, 'first_render_ms': first_ms,
+                      'rerun_ms': rerun_ms, 'loaded': loaded, 'errors': errors}))
+
+def measure_page(page, env):
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', page],
+                            cwd=ROOT, env=env, capture_output=True, text=True)
+    lines = result.stdout.strip().splitlines()
+    if result.returncode != 0 or not lines:
+        raise RuntimeError(f"{page} failed:\n{result.stderr[-2000:]}")
+    return json.loads(lines[-1])
+
+def run(db_path, pages, repeat, report=print):
+    env = app_env(db_path)
+    imports = [measure_imports(env) for _ in range(repeat)]
+    import_ms = statistics.median(total for total, _ in imports)
+    breakdown = {name: statistics.median(children.get(name, 0) for _, children in imports)
+                 for name in imports[0][1]}
+    report(f"import main: {import_ms:.1f} ms")
+    for name, ms in sorted(breakdown.items(), key=lambda item: -item[1])[:10]:
+        report(f"  {name:<36} {ms:8.1f} ms")
+
+    results = {}
+    for page in pages:
+        runs = [measure_page(page, env) for _ in range(repeat)]
+        for run_ in runs:
+            if run_['errors']:
+                raise RuntimeError(f"{page} raised: {run_['errors']}")
+        results[page] = {
+            'first_render_ms': statistics.median(r['first_render_ms'] for r in runs),
+            'rerun_ms': statistics.median(r['rerun_ms'] for r in runs),
+            'streamlit_ms': statistics.median(r['streamlit_ms'] for r in runs),
+            'loaded': runs[0]['loaded'],
+        }
+        loaded = ', '.join(name for name, present in runs[0]['loaded'].items() if present)
+        report(f"{page:<16} first render {results[page]['first_render_ms']:8.1f} ms  "
+               f"rerun {results[page]['rerun_ms']:7.1f} ms  loaded: {loaded or '-'}")
+    return {'import_ms': import_ms, 'imports': breakdown, 'pages': results}
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """Return human-readable regressions against a previous report"""
+    regressions = []
+
+    def check(label, old, new):
+        if new > old * (1 + tolerance) and new - old > min_delta_ms:
+            regressions.append(f"{label}: {old:.1f} -> {new:.1f} ms ({(new / old - 1) * 100:+.0f}%)")
+
+    check("import main", baseline['import_ms'], results['import_ms'])
+    for page, row in results['pages'].items():
+        before = baseline['pages'].get(page)
+        if before is None:
+            continue
+        check(f"{page} first render", before['first_render_ms'], row['first_render_ms'])
+        for name, present in row['loaded'].items():
+            if present and before['loaded'].get(name) is False:
+                regressions.append(f"{page} now loads {name}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--pages', default=','.join(PAGES),
+                        help="Comma-separated pages to render")
+    parser.add_argument('--entries', type=int, default=5_000,
+                        help="Synthetic entries to seed the database with")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="Fresh processes per measurement (the median is reported)")
+    parser.add_argument('--output', help="Write the JSON report here")
+    parser.add_argument('--baseline', help="Previous JSON report to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Allowed relative slowdown before failing")
+    parser.add_argument('--min-delta-ms', type=float, default=20.0,
+                        help="Ignore slowdowns smaller than this (process start-up noise)")
+    args = parser.parse_args()
+
+    if args.child:
+        render_page(args.child)
+        return
+
+    pages = args.pages.split(',')
+    unknown = [page for page in pages if page not in PAGES]
+    if unknown:
+        parser.error(f"Unknown pages: {', '.join(unknown)}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'startup.db')
+        started = time.perf_counter()
+        seed(db_path, args.entries, args.seed)
+        print(f"Seeded {args.entries:,} entries in {time.perf_counter() - started:.1f}s\n")
+        results = run(db_path, pages, args.repeat)
+
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'entries': args.entries,
+        'environment': {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+        },
+        **results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"\nNo regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+if __name__ == "__main__":
+    main()
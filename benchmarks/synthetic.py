@@ -0,0 +1,130 @@
+"""Seeded synthetic shipping histories for benchmarks
+
+Entries cluster on active days (several ships on some days, none on
+others), categories and statuses follow a skewed distribution like real
+use, and every call with the same arguments returns the same history. The
+aggregate helpers produce exactly the rows the rollup tables and streak
+tables would hold for it, so chart and metric code can be fed without a
+database.
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+from models import ShippingEntry
+from utils import compute_streaks
+
+# Most ships are features and fixes; games and docs are rare
+CATEGORY_WEIGHTS = [0.30, 0.20, 0.15, 0.05, 0.08, 0.12, 0.07, 0.03]
+# A few percent of entries have no category, as in old data
+UNCATEGORIZED = 0.02
+STATUS_WEIGHTS = [0.75, 0.15, 0.10]
+
+def generate_entries(n, seed=0, users=20, end=None, ships_per_day=2.0, max_years=10):
+    """
+    Return ``n`` entry dicts shaped like ShippingEntry.get_all_entries() rows
+
+    Args:
+        n (int): Number of entries
+        seed (int): RNG seed; the same seed gives the same history
+        users (int): Owners to spread entries over (Zipf-like: a few heavy users)
+        end (date): Latest ship date, default today
+        ships_per_day (float): Mean ships on an active day; about 70% of
+            calendar days are active, so the history spans roughly
+            n / (0.7 * ships_per_day) days
+        max_years (int): Longest history to generate; large ``n`` raise
+            ships_per_day instead of reaching further back
+    """
+    rng = np.random.default_rng(seed)
+    end = np.datetime64(end or datetime.now().date(), 'D')
+    ships_per_day = max(ships_per_day, n / (0.7 * 365 * max_years))
+
+    # Ships per active day: 1 + Poisson gives multi-entry days with a long tail
+    per_day = 1 + rng.poisson(max(ships_per_day - 1, 0), size=n)
+    per_day = per_day[np.cumsum(per_day) - per_day < n]
+    per_day[-1] -= per_day.sum() - n
+    # Gaps between active days: mostly consecutive, sometimes a few days off
+    gaps = rng.geometric(0.7, size=len(per_day))
+    offsets = np.cumsum(gaps[::-1])[::-1] - gaps[-1]
+    dates = np.repeat(end - offsets.astype('timedelta64[D]'), per_day)
+
+    categories = np.array(ShippingEntry.CATEGORIES, dtype=object)[
+        rng.choice(len(ShippingEntry.CATEGORIES), size=n, p=CATEGORY_WEIGHTS)]
+    categories[rng.random(n) < UNCATEGORIZED] = None
+    statuses = np.array(ShippingEntry.STATUSES, dtype=object)[
+        rng.choice(len(ShippingEntry.STATUSES), size=n, p=STATUS_WEIGHTS)]
+
+    weights = 1 / np.arange(1, users + 1)
+    user_ids = 1 + rng.choice(users, size=n, p=weights / weights.sum())
+
+    dates = dates.astype(object)
+    return [
+        {
+            'id': i + 1,
+            'date': dates[i],
+            'project_name': f"project-{i + 1}",
+            'description': f"Synthetic entry {i + 1} shipped by user {user_ids[i]}",
+            'category': categories[i],
+            'status': statuses[i],
+            'created_at': datetime.combine(dates[i], datetime.min.time()) + timedelta(hours=12),
+            'user_id': int(user_ids[i]),
+        }
+        for i in range(n)
+    ]
+
+def _frame(entries):
+    return pd.DataFrame(entries, columns=['date', 'category', 'status', 'user_id'])
+
+def summary(entries, since):
+    """What EntryRollup.get_summary(since) returns for these entries"""
+    df = _frame(entries)
+    return {'total': len(df), 'completed': int((df['status'] == 'Completed').sum()),
+            'since': int((df['date'] > since).sum())}
+
+def daily_counts(entries):
+    """What EntryRollup.get_daily_counts() returns for these entries"""
+    counts = _frame(entries).groupby('date').size()
+    return [{'date': day, 'count': int(count)} for day, count in counts.items()]
+
+def category_counts(entries):
+    counts = _frame(entries)['category'].value_counts(dropna=False)
+    return [{'category': None if pd.isna(category) else category, 'count': int(count)}
+            for category, count in counts.items()]
+
+def weekday_counts(entries):
+    """Weekday 0 is Sunday, like the weekday rollup"""
+    weekdays = (pd.to_datetime(_frame(entries)['date']).dt.dayofweek + 1) % 7
+    counts = weekdays.value_counts().sort_index()
+    return [{'weekday': int(weekday), 'count': int(count)} for weekday, count in counts.items()]
+
+def monthly_counts(entries):
+    """What EntryRollup.get_monthly_counts() returns for these entries"""
+    df = _frame(entries)
+    df['month'] = pd.to_datetime(df['date']).dt.to_period('M').dt.start_time.dt.date
+    counts = df.groupby(['month', 'category', 'status'], dropna=False).size()
+    return [{'month': month, 'category': None if pd.isna(category) else category,
+             'status': None if pd.isna(status) else status, 'count': int(count)}
+            for (month, category, status), count in counts.items()]
+
+def progress_rows(entries):
+    """One user_achievement_progress row per scope (0 = all entries), as rebuild_progress writes"""
+    df = _frame(entries)
+    scoped = pd.concat([df, df.assign(user_id=0)])
+    streaks = compute_streaks(scoped['date'].to_numpy(), scoped['user_id'].to_numpy())
+    grouped = scoped.groupby('user_id')
+    max_daily = scoped.groupby(['user_id', 'date']).size().groupby('user_id').max()
+    return [
+        {
+            'user_id': int(scope),
+            'ships': len(group),
+            'distinct_categories': group['category'].nunique(),
+            'max_daily_count': int(max_daily[scope]),
+            'current_streak': streaks[scope]['current_streak'],
+            'longest_streak': streaks[scope]['longest_streak'],
+        }
+        for scope, group in grouped
+    ]
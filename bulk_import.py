@@ -0,0 +1,248 @@
+"""Bulk-load shipping entries from CSV or JSONL
+
+Rows are validated against the entry form's categories and statuses,
+streamed in batches through COPY into a temporary staging table, and
+merged into shipping_entries skipping any (date, project_name) that
+already exists. Rollups are adjusted once per batch rather than by the
+per-row trigger, and streaks and achievement progress are rebuilt once at
+the end. No table-level lock is taken: the app stays usable during an
+import and sees the new entries when it commits.
+
+Usage:
+    python bulk_import.py history.csv more.jsonl
+    cat export.jsonl | python bulk_import.py --format jsonl -
+"""
+import io
+import csv
+import sys
+import json
+import time
+import argparse
+from datetime import date, datetime
+from database import get_connection, dialect
+from cache import bump_data_version
+from models import ShippingEntry
+from rebuild_rollups import rebuild_all
+
+FIELDS = ['date', 'project_name', 'description', 'category', 'status', 'user_id']
+
+class InvalidRow(ValueError):
+    pass
+
+def read_rows(path, fmt=None):
+    """
+    Yield raw row dicts from a CSV or JSONL file ('-' for stdin)
+
+    A JSONL line that does not parse is yielded as an InvalidRow, which
+    validate() raises, so it is skipped like any other invalid row.
+    """
+    if fmt is None:
+        fmt = 'jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv'
+    f = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+    try:
+        if fmt == 'csv':
+            yield from csv.DictReader(f)
+        else:
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield InvalidRow(f"malformed JSON on line {number}: {e.msg}")
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+def _text(row, field):
+    value = row.get(field)
+    if value is not None and not isinstance(value, str):
+        raise InvalidRow(f"{field} must be text, not {type(value).__name__}")
+    return value
+
+def validate(row, default_user_id=None):
+    """Normalize one raw row into a tuple in FIELDS order, or raise InvalidRow"""
+    if isinstance(row, InvalidRow):
+        raise row
+    if not isinstance(row, dict):
+        raise InvalidRow(f"expected an object, not {type(row).__name__}")
+
+    raw_date = row.get('date')
+    if isinstance(raw_date, (date, datetime)):
+        entry_date = raw_date if not isinstance(raw_date, datetime) else raw_date.date()
+    else:
+        try:
+            entry_date = date.fromisoformat(str(raw_date).strip()[:10])
+        except ValueError:
+            raise InvalidRow(f"invalid date {raw_date!r}")
+
+    project_name = (_text(row, 'project_name') or '').strip()
+    if not project_name:
+        raise InvalidRow("missing project_name")
+    if len(project_name) > 255:
+        raise InvalidRow("project_name longer than 255 characters")
+
+    category = _text(row, 'category') or None
+    if category is not None and category not in ShippingEntry.CATEGORIES:
+        raise InvalidRow(f"unknown category {category!r}")
+    status = _text(row, 'status') or None
+    if status is not None and status not in ShippingEntry.STATUSES:
+        raise InvalidRow(f"unknown status {status!r}")
+
+    user_id = row.get('user_id')
+    if user_id in (None, ''):
+        user_id = default_user_id
+    else:
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            raise InvalidRow(f"invalid user_id {user_id!r}")
+
+    return (entry_date, project_name, _text(row, 'description') or None,
+            category, status, user_id)
+
+def _copy_batch(cur, batch):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in batch:
+        writer.writerow(['' if value is None else value for value in row])
+    buffer.seek(0)
+
+    cur.execute("TRUNCATE import_staging")
+    ShippingEntry.ensure_partitions(cur, {row[0] for row in batch})
+    # Unquoted empty fields load as NULL in CSV mode
+    cur.copy_expert(f"COPY import_staging ({', '.join(FIELDS)}) FROM STDIN WITH (FORMAT csv)",
+                    buffer)
+    # The rollup trigger is deferred for this transaction (see import_rows), so
+    # the same deltas adjust_entry_rollups() would apply row by row are added
+    # here once per batch, grouped
+    cur.execute("""
+        WITH inserted AS (
+            INSERT INTO shipping_entries (date, project_name, description, category, status, user_id)
+            SELECT DISTINCT ON (s.date, s.project_name)
+                   s.date, s.project_name, s.description, s.category, s.status, s.user_id
+            FROM import_staging s
+            WHERE NOT EXISTS (
+                SELECT 1 FROM shipping_entries e
+                WHERE e.date = s.date AND e.project_name = s.project_name
+            )
+            ORDER BY s.date, s.project_name
+            RETURNING date, category, status
+        ), daily AS (
+            INSERT INTO entry_daily_counts AS t (date, count)
+            SELECT date, COUNT(*) FROM inserted GROUP BY 1
+            ON CONFLICT (date) DO UPDATE SET count = t.count + EXCLUDED.count
+        ), categories AS (
+            INSERT INTO entry_category_counts AS t (category, count)
+            SELECT COALESCE(category, ''), COUNT(*) FROM inserted GROUP BY 1
+            ON CONFLICT (category) DO UPDATE SET count = t.count + EXCLUDED.count
+        ), statuses AS (
+            INSERT INTO entry_status_counts AS t (status, count)
+            SELECT COALESCE(status, ''), COUNT(*) FROM inserted GROUP BY 1
+            ON CONFLICT (status) DO UPDATE SET count = t.count + EXCLUDED.count
+        ), weekdays AS (
+            INSERT INTO entry_weekday_counts AS t (weekday, count)
+            SELECT EXTRACT(DOW FROM date), COUNT(*) FROM inserted GROUP BY 1
+            ON CONFLICT (weekday) DO UPDATE SET count = t.count + EXCLUDED.count
+        ), months AS (
+            INSERT INTO entry_monthly_counts AS t (month, category, status, count)
+            SELECT date_trunc('month', date)::date, COALESCE(category, ''),
+                   COALESCE(status, ''), COUNT(*)
+            FROM inserted GROUP BY 1, 2, 3
+            ON CONFLICT (month, category, status) DO UPDATE SET count = t.count + EXCLUDED.count
+        )
+        SELECT COUNT(*) FROM inserted
+    """)
+    return cur.fetchone()[0]
+
+def import_rows(rows, batch_size=10_000, default_user_id=None, strict=False, report=print):
+    """
+    Import an iterable of raw row dicts in a single transaction
+
+    Returns:
+        dict: Counts of rows read, inserted, skipped as duplicates and invalid
+    """
+    stats = {'read': 0, 'inserted': 0, 'duplicates': 0, 'invalid': 0}
+    started = time.monotonic()
+
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            CREATE TEMP TABLE import_staging (
+                date DATE, project_name VARCHAR(255), description TEXT,
+                category VARCHAR(100), status VARCHAR(50), user_id INTEGER
+            ) ON COMMIT DROP
+        """)
+        # The rollup trigger would update rollups once per entry; each batch
+        # applies them in bulk instead (migration 0014). Unlike disabling the
+        # trigger, this takes no table lock, so the app keeps reading and writing.
+        cur.execute("SET LOCAL shipping.defer_rollups = 'on'")
+
+        batch = []
+        for raw in rows:
+            stats['read'] += 1
+            try:
+                batch.append(validate(raw, default_user_id))
+            except InvalidRow as e:
+                stats['invalid'] += 1
+                if strict:
+                    raise InvalidRow(f"row {stats['read']}: {e}")
+                if stats['invalid'] <= 20:
+                    report(f"skipping row {stats['read']}: {e}")
+                continue
+
+            if len(batch) >= batch_size:
+                stats['inserted'] += _copy_batch(cur, batch)
+                batch = []
+                elapsed = time.monotonic() - started
+                report(f"{stats['read']} rows read, {stats['inserted']} inserted "
+                       f"({stats['read'] / elapsed:,.0f} rows/s)")
+        if batch:
+            stats['inserted'] += _copy_batch(cur, batch)
+
+        if stats['inserted']:
+            report("Rebuilding streaks and achievement progress...")
+            stats['unlocked'] = rebuild_all(cur, rollups=False)
+        cur.close()
+
+    if stats['inserted']:
+        bump_data_version('entries')
+    stats['duplicates'] = stats['read'] - stats['invalid'] - stats['inserted']
+    stats['seconds'] = time.monotonic() - started
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load shipping entries from CSV or JSONL")
+    parser.add_argument('files', nargs='*', default=['-'],
+                        help="Files to import, '-' for stdin (default)")
+    parser.add_argument('--format', choices=['csv', 'jsonl'],
+                        help="Input format (default: from file extension, csv for stdin)")
+    parser.add_argument('--batch-size', type=int, default=10_000)
+    parser.add_argument('--user-id', type=int,
+                        help="Owner for rows without a user_id column")
+    parser.add_argument('--strict', action='store_true',
+                        help="Abort the whole import on the first invalid row")
+    args = parser.parse_args()
+
+    if dialect() != 'postgres':
+        parser.error("bulk imports use COPY and need DB_BACKEND=postgres")
+
+    def rows():
+        for path in args.files:
+            yield from read_rows(path, args.format)
+
+    report = lambda message: print(message, file=sys.stderr)
+    try:
+        stats = import_rows(rows(), args.batch_size, args.user_id, args.strict, report)
+    except InvalidRow as e:
+        print(f"Import aborted, nothing was written: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    rate = stats['read'] / stats['seconds'] if stats['seconds'] else 0
+    print(f"Imported {stats['inserted']} entries in {stats['seconds']:.1f}s ({rate:,.0f} rows/s); "
+          f"{stats['duplicates']} duplicates and {stats['invalid']} invalid rows skipped")
+    if stats.get('unlocked'):
+        print(f"Unlocked achievements: {', '.join(stats['unlocked'])}")
+
+if __name__ == "__main__":
+    main()
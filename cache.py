@@ -0,0 +1,14 @@
+import threading
+
+_versions = {}
+_lock = threading.Lock()
+
+def data_version(name):
+    """Current version of a dataset; cached values built from it are valid while it holds"""
+    return _versions.get(name, 0)
+
+def bump_data_version(name):
+    """Mark a dataset as changed so caches keyed on its version miss"""
+    with _lock:
+        _versions[name] = _versions.get(name, 0) + 1
+        return _versions[name]
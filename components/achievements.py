@@ -1,61 +1,16 @@
 import streamlit as st
-import pandas as pd
 from models import Achievement
-from datetime import datetime, timedelta
 
-def check_achievements(entries):
-    """Check and unlock achievements based on shipping entries"""
-    if not entries:
-        return
-    
-    df = pd.DataFrame(entries)
-    df['date'] = pd.to_datetime(df['date'])
-    
-    # Check "Starter Ship"
-    if len(df) >= 1:
-        Achievement.unlock_achievement("Starter Ship")
-    
-    # Check streak achievements
-    current_streak = calculate_current_streak(df)
-    if current_streak >= 7:
-        Achievement.unlock_achievement("Weekly Warrior")
-    if current_streak >= 30:
-        Achievement.unlock_achievement("Monthly Master")
-    
-    # Check category collection
-    if len(df['category'].unique()) >= 5:  # All categories shipped
-        Achievement.unlock_achievement("Category Collector")
-    
-    # Check daily shipping count
-    daily_ships = df.groupby('date').size()
-    if any(count >= 3 for count in daily_ships):
-        Achievement.unlock_achievement("Speed Demon")
-
-def calculate_current_streak(df):
-    if df.empty:
-        return 0
-        
-    df = df.sort_values('date')
-    current_streak = 0
-    last_date = datetime.now().date()
-    
-    dates = df['date'].dt.date.unique()
-    dates = sorted(dates, reverse=True)
-    
-    for date in dates:
-        if (last_date - date).days == 1:
-            current_streak += 1
-            last_date = date
-        else:
-            break
-    
-    return current_streak
+def render_achievements(user_id=None, achievements=None):
+    """Display a user's achievements, or the all-entries ones when user_id is None
 
-def render_achievements():
-    """Display achievements section in the dashboard"""
+    ``achievements`` may be passed in when already fetched; its rows carry
+    the progress counters too.
+    """
     st.subheader("🏆 Achievements")
-    
-    achievements = Achievement.get_achievements()
+
+    if achievements is None:
+        achievements = Achievement.get_achievements(user_id)
     
     if not achievements:
         st.info("No achievements available yet.")
@@ -90,3 +45,12 @@ def render_achievements():
                 """)
         else:
             st.success("Wow! You've unlocked all achievements! 🎉")
+
+    progress = Achievement.progress_from(achievements)
+    if progress:
+        st.caption(
+            f"Progress: {progress['ships']} ships · "
+            f"{progress['distinct_categories']} categories · "
+            f"best day {progress['max_daily_count']} ships · "
+            f"longest streak {progress['longest_streak']} days"
+        )
@@ -1,23 +1,18 @@
-import pandas as pd
 import streamlit as st
-from datetime import datetime, timedelta
+from utils import summarize_durations
+from components.charts import (create_shipping_frequency, create_completion_trend,
+                               create_duration_histogram)
 
-def calculate_metrics(entries):
-    df = pd.DataFrame(entries)
-    if len(entries) > 0:
-        print('Columns available:', df.columns.tolist())
-        df['date'] = pd.to_datetime(df['date']) if 'date' in df.columns else pd.Series(dtype='datetime64[ns]')
-    
+# Indexed like Postgres EXTRACT(DOW), which the weekday rollup uses
+WEEKDAY_NAMES = ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday",
+                 "Friday", "Saturday"]
+
+def calculate_metrics(summary):
+    """Render headline metrics from an EntryRollup.get_summary() row"""
     # Calculate metrics
-    total_ships = len(df)
-    
-    # Only calculate these metrics if we have date column and entries
-    if 'date' in df.columns and len(df) > 0:
-        ships_last_week = len(df[df['date'] >= datetime.now() - timedelta(days=7)])
-        completion_rate = len(df[df['status'] == 'Completed']) / total_ships * 100 if total_ships > 0 else 0
-    else:
-        ships_last_week = 0
-        completion_rate = 0
+    total_ships = summary['total']
+    ships_last_week = summary['since']
+    completion_rate = summary['completed'] / total_ships * 100 if total_ships > 0 else 0
     
     # Display metrics
     col1, col2, col3 = st.columns(3)
@@ -31,16 +26,70 @@ def calculate_metrics(entries):
     with col3:
         st.metric("Completion Rate", f"{completion_rate:.1f}%")
 
-def render_project_details(entries):
-    df = pd.DataFrame(entries)
-    
+def render_project_details(frame):
+    df = frame.df
+
     if len(df) > 0:
         st.subheader("Recent Projects")
         
-        for _, row in df.head(5).iterrows():
-            with st.expander(f"{row['project_name']} - {row['date']}"):
+        for _, row in df.iterrows():
+            with st.expander(f"{row['project_name']} - {row['date'].date()}"):
                 st.write(f"**Category:** {row['category']}")
                 st.write(f"**Status:** {row['status']}")
                 st.write(f"**Description:** {row['description']}")
     else:
         st.info("No projects to display yet. Add your first shipping entry!")
+
+def render_analytics(weekday_counts, category_counts, daily_counts=None,
+                     monthly_counts=None, durations=None):
+    """
+    Render the Analytics page from rollup rows
+
+    Args:
+        weekday_counts (list): EntryRollup.get_weekday_counts() rows
+        category_counts (list): EntryRollup.get_category_counts() rows
+        daily_counts (list): EntryRollup.get_daily_counts() rows, for throughput
+        monthly_counts (list): EntryRollup.get_monthly_counts() rows, for the
+            completion-rate trend
+        durations (list): EntryStatusChange.get_durations() rows
+    """
+    st.subheader("Shipping Analytics")
+
+    # Most productive day
+    if weekday_counts:
+        busiest = max(weekday_counts, key=lambda row: row['count'])
+        st.info(f"Most productive day: {WEEKDAY_NAMES[busiest['weekday']]}")
+
+    # Category breakdown
+    st.subheader("Category Breakdown")
+    category_counts = [row for row in category_counts if row['category'] is not None]
+    if category_counts:
+        st.bar_chart(category_counts, x='category', y='count')
+
+    # Throughput, with a rolling average (4 weeks or 3 months) over the bars
+    if daily_counts:
+        st.subheader("Throughput")
+        granularity = st.radio("Per", ['week', 'month'], horizontal=True,
+                               format_func=str.capitalize, key='throughput_granularity')
+        st.plotly_chart(create_shipping_frequency(daily_counts, granularity),
+                        width="stretch")
+
+    if monthly_counts:
+        st.subheader("Completion Trend")
+        st.plotly_chart(create_completion_trend(monthly_counts), width="stretch")
+
+    if durations is not None:
+        st.subheader("Planned to Completed")
+        stats = summarize_durations([row['days'] for row in durations],
+                                    [row['count'] for row in durations])
+        if stats['entries']:
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Entries", stats['entries'])
+            with col2:
+                st.metric("Median", f"{stats['median']:.0f} days")
+            with col3:
+                st.metric("90th Percentile", f"{stats['p90']:.0f} days")
+            st.plotly_chart(create_duration_histogram(durations), width="stretch")
+        else:
+            st.info("No planned project has been completed yet.")
@@ -1,14 +1,103 @@
-import plotly.express as px
-import plotly.graph_objects as go
-import pandas as pd
-from datetime import datetime, timedelta
-
-def create_shipping_timeline(entries):
-    """Create a timeline visualization with proper data validation"""
-    df = pd.DataFrame(entries)
-    
-    # Check if dataframe is empty or missing required columns
-    if len(df) == 0 or not all(col in df.columns for col in ['date', 'project_name']):
+# plotly and pandas are imported inside the functions that draw them, so pages
+# without charts never pay for the charting stack
+import os
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+from cache import data_version
+from utils import compute_frequency, rolling_mean
+from events import subscribe, ENTRIES_CHANGED
+
+# Serialized figures keyed on (kind, params, entries data version), least recently used first
+FIGURE_CACHE_SIZE = int(os.environ.get('CHART_CACHE_SIZE', 64))
+_figures = OrderedDict()
+_figures_lock = threading.Lock()
+_figure_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+def _figure_key(kind, params):
+    return (kind, params, data_version('entries'))
+
+def has_cached_figure(kind, params=()):
+    """Whether cached_figure would be a hit, so callers can skip loading its data"""
+    with _figures_lock:
+        return _figure_key(kind, params) in _figures
+
+def cached_figure(kind, params, build):
+    """
+    Return the figure for ``kind``/``params``, building it only on a cache miss
+
+    Args:
+        kind (str): Chart kind, e.g. 'timeline'
+        params (tuple): Hashable parameters that change the figure; for
+            date-windowed charts the first two are the window's start and end
+        build (callable): Returns a fresh figure; it should also fetch and
+            prepare its data so hits skip that work too
+    """
+    key = _figure_key(kind, params)
+    with _figures_lock:
+        cached = _figures.get(key)
+        if cached is not None:
+            _figures.move_to_end(key)
+            _figure_stats['hits'] += 1
+        else:
+            _figure_stats['misses'] += 1
+    if cached is not None:
+        import plotly.io as pio
+        return pio.from_json(cached)
+
+    fig = build()
+    with _figures_lock:
+        _figures[key] = fig.to_json()
+        while len(_figures) > FIGURE_CACHE_SIZE:
+            _figures.popitem(last=False)
+            _figure_stats['evictions'] += 1
+    return fig
+
+def figure_cache_stats():
+    with _figures_lock:
+        return dict(_figure_stats, size=len(_figures), max_size=FIGURE_CACHE_SIZE)
+
+def clear_figure_cache():
+    with _figures_lock:
+        _figures.clear()
+
+# Charts whose params start with a (start, end) date window
+WINDOWED_CHARTS = {'timeline'}
+
+def _evict_changed(changes):
+    days = {row['date'] for change in changes
+            for row in (change['before'], change['after']) if row is not None}
+    with _figures_lock:
+        for key in list(_figures):
+            kind, params, _ = key
+            if kind in WINDOWED_CHARTS and not any(params[0] <= day <= params[1] for day in days):
+                continue
+            del _figures[key]
+
+subscribe(ENTRIES_CHANGED, _evict_changed)
+
+# Above this many distinct projects the timeline draws aggregated lanes instead
+TIMELINE_MAX_PROJECTS = int(os.environ.get('TIMELINE_MAX_PROJECTS', 60))
+# Aggregated lanes are bucketed by day, widening to weeks/months past this many buckets
+TIMELINE_MAX_BUCKETS = 90
+
+def create_shipping_timeline(frame, max_projects=None, lane='category'):
+    """
+    Create a timeline visualization with proper data validation
+
+    Small windows get one bar per project. Past ``max_projects`` projects the
+    figure switches to one WebGL lane per ``lane`` value (category or status)
+    with a marker per time bucket sized by its ship count, so its payload
+    depends on lanes x buckets rather than on the number of entries.
+    """
+    import pandas as pd
+    import plotly.express as px
+    import plotly.graph_objects as go
+
+    df = frame.df
+
+    # Check if there is anything to draw
+    if len(df) == 0:
         fig = go.Figure()
         fig.update_layout(
             title='No timeline data available',
@@ -18,18 +107,17 @@ def create_shipping_timeline(entries):
         )
         return fig
     
+    if max_projects is None:
+        max_projects = TIMELINE_MAX_PROJECTS
+
     try:
-        # Ensure proper date formatting
-        df['date'] = pd.to_datetime(df['date'])
-        
-        # Create explicit start and end dates for timeline
-        df['start_date'] = df['date']
-        df['end_date'] = df['date'] + pd.Timedelta(days=1)
-        
-        # Ensure status has a default value if missing
-        if 'status' not in df.columns:
-            df['status'] = 'Unknown'
-        
+        if df['project_name'].nunique() > max_projects:
+            return _aggregated_timeline(df, lane)
+
+        # Create explicit start and end dates for timeline (the shared frame stays untouched)
+        df = df.assign(start_date=df['date'],
+                       end_date=df['date'] + pd.Timedelta(days=1))
+
         fig = px.timeline(
             df,
             x_start='start_date',
@@ -55,23 +143,61 @@ def create_shipping_timeline(entries):
         print(f"Error creating timeline: {e}")
         return go.Figure()
 
-def create_category_distribution(entries):
-    """Create a pie chart of categories with data validation"""
-    df = pd.DataFrame(entries)
-    
-    # Check if dataframe is empty or missing category column
-    if len(df) == 0 or 'category' not in df.columns:
+def _aggregated_timeline(df, lane):
+    """One Scattergl trace per status, with lanes on y and ship counts as marker size"""
+    import plotly.graph_objects as go
+
+    span = (df['date'].max() - df['date'].min()).days + 1
+    freq = 'D' if span <= TIMELINE_MAX_BUCKETS else 'W' if span <= TIMELINE_MAX_BUCKETS * 7 else 'M'
+    buckets = df['date'].dt.to_period(freq).dt.start_time
+
+    counts = (df.assign(bucket=buckets,
+                        lane=df[lane].astype(object).fillna('Uncategorized'),
+                        status=df['status'].astype(object).fillna('Unknown'))
+                .groupby(['status', 'lane', 'bucket'], observed=True)
+                .size()
+                .reset_index(name='count'))
+    largest = counts['count'].max()
+
+    fig = go.Figure()
+    for status, group in counts.groupby('status'):
+        fig.add_trace(go.Scattergl(
+            x=group['bucket'],
+            y=group['lane'],
+            name=status,
+            mode='markers',
+            marker={'size': 6 + 24 * (group['count'] / largest) ** 0.5},
+            customdata=group['count'],
+            hovertemplate='%{y}<br>%{x|%Y-%m-%d}<br>%{customdata} ships<extra>%{fullData.name}</extra>'
+        ))
+
+    unit = {'D': 'day', 'W': 'week', 'M': 'month'}[freq]
+    fig.update_layout(
+        title=f'Shipping Timeline ({len(df)} ships by {lane}, per {unit})',
+        xaxis_title="Date",
+        yaxis_title=lane.capitalize(),
+        height=400,
+        showlegend=True,
+        xaxis={'type': 'date'}
+    )
+    return fig
+
+def create_category_distribution(category_counts):
+    """Create a pie chart of categories from EntryRollup.get_category_counts() rows"""
+    import plotly.express as px
+    import plotly.graph_objects as go
+
+    # Check if there are any entries to count
+    if len(category_counts) == 0:
         fig = go.Figure(go.Pie(labels=['No Data'], values=[1]))
         fig.update_layout(title='No categories available')
         return fig
     
     try:
         # Remove any null categories and get value counts
-        category_counts = df['category'].fillna('Uncategorized').value_counts()
-        
         fig = px.pie(
-            values=category_counts.values,
-            names=category_counts.index,
+            values=[row['count'] for row in category_counts],
+            names=[row['category'] or 'Uncategorized' for row in category_counts],
             title='Project Categories Distribution'
         )
         
@@ -85,12 +211,22 @@ def create_category_distribution(entries):
         print(f"Error creating category distribution: {e}")
         return go.Figure()
 
-def create_shipping_frequency(entries):
-    """Create a bar chart of shipping frequency with proper data validation"""
-    df = pd.DataFrame(entries)
-    
-    # Check if dataframe is empty or missing date column
-    if len(df) == 0 or 'date' not in df.columns:
+# Rolling-average width in buckets for each granularity
+FREQUENCY_WINDOWS = {'day': 7, 'week': 4, 'month': 3}
+FREQUENCY_TITLES = {'day': 'Daily', 'week': 'Weekly', 'month': 'Monthly'}
+
+def create_shipping_frequency(daily_counts, granularity=None):
+    """
+    Create a bar chart of shipping frequency from EntryRollup.get_daily_counts() rows
+
+    Granularity (day/week/month) is picked from the history's span unless
+    given, so the chart stays a bounded number of bars; a rolling average is
+    drawn over the bars.
+    """
+    import plotly.graph_objects as go
+
+    # Check if there are any entries to count
+    if len(daily_counts) == 0:
         fig = go.Figure()
         fig.update_layout(
             title='No shipping data available',
@@ -100,53 +236,101 @@ def create_shipping_frequency(entries):
         return fig
     
     try:
-        # Ensure proper date formatting
-        df['date'] = pd.to_datetime(df['date'])
-        
-        # Create date range for all dates
-        if len(df) > 0:
-            date_range = pd.date_range(
-                start=df['date'].min(),
-                end=df['date'].max(),
-                freq='D'
-            )
-            
-            # Group by date and count entries
-            daily_counts = df.groupby('date').size().reindex(date_range, fill_value=0)
-            
-            # Create DataFrame with counts, ensuring no infinite values
-            daily_df = pd.DataFrame({
-                'date': daily_counts.index,
-                'count': daily_counts.values
-            })
-            
-            # Replace any potential infinite values with 0
-            daily_df['count'] = daily_df['count'].replace([float('inf'), float('-inf')], 0)
-            
-            fig = px.bar(
-                daily_df,
-                x='date',
-                y='count',
-                title='Daily Shipping Frequency'
-            )
-            
-            # Update layout for better visualization
-            fig.update_layout(
-                xaxis_title="Date",
-                yaxis_title="Number of Shipments",
-                bargap=0.1,
-                height=400,
-                showlegend=False
-            )
-        else:
-            fig = go.Figure()
-            fig.update_layout(
-                title='No shipping data available',
-                xaxis_title="Date",
-                yaxis_title="Number of Shipments"
-            )
-        
+        frequency = compute_frequency(
+            [row['date'] for row in daily_counts],
+            [row['count'] for row in daily_counts],
+            granularity=granularity)
+        granularity = frequency['granularity']
+        window = FREQUENCY_WINDOWS[granularity]
+        rolling = (rolling_mean(frequency['counts'], window)
+                   if len(frequency['counts']) > window else None)
+
+        fig = go.Figure(go.Bar(
+            x=frequency['starts'],
+            y=frequency['counts'],
+            name='Ships'
+        ))
+        if rolling is not None:
+            fig.add_trace(go.Scatter(
+                x=frequency['starts'],
+                y=rolling,
+                mode='lines',
+                name=f'{window}-{granularity} average'
+            ))
+
+        # Update layout for better visualization
+        fig.update_layout(
+            title=f'{FREQUENCY_TITLES[granularity]} Shipping Frequency',
+            xaxis_title="Date",
+            yaxis_title="Number of Shipments",
+            bargap=0.1,
+            height=400,
+            showlegend=rolling is not None
+        )
         return fig
     except Exception as e:
         print(f"Error creating frequency chart: {e}")
         return go.Figure()
+
+def create_completion_trend(monthly_counts):
+    """Create a line chart of each category's monthly completion rate from EntryRollup.get_monthly_counts() rows"""
+    import pandas as pd
+    import plotly.graph_objects as go
+
+    if len(monthly_counts) == 0:
+        fig = go.Figure()
+        fig.update_layout(title='No completion data available')
+        return fig
+
+    try:
+        df = pd.DataFrame(monthly_counts, columns=['month', 'category', 'status', 'count'])
+        df['month'] = pd.to_datetime(df['month'])
+        df['category'] = df['category'].fillna('Uncategorized')
+        df['completed'] = df['count'].where(df['status'] == 'Completed', 0)
+        totals = df.groupby(['category', 'month'])[['completed', 'count']].sum()
+        rates = (totals['completed'] / totals['count'] * 100).rename('rate').reset_index()
+
+        fig = go.Figure()
+        for category, group in rates.groupby('category', sort=True):
+            fig.add_trace(go.Scatter(
+                x=group['month'],
+                y=group['rate'],
+                mode='lines+markers',
+                name=category,
+                hovertemplate='%{x|%b %Y}: %{y:.0f}%<extra>%{fullData.name}</extra>'
+            ))
+
+        fig.update_layout(
+            title='Completion Rate by Category',
+            xaxis_title="Month",
+            yaxis_title="Completed (%)",
+            yaxis={'range': [0, 105]},
+            height=400
+        )
+        return fig
+    except Exception as e:
+        print(f"Error creating completion trend: {e}")
+        return go.Figure()
+
+def create_duration_histogram(durations, title='Days from Planned to Completed'):
+    """Create a bar chart from EntryStatusChange.get_durations() rows"""
+    import plotly.graph_objects as go
+
+    if len(durations) == 0:
+        fig = go.Figure()
+        fig.update_layout(title='No completed plans yet')
+        return fig
+
+    fig = go.Figure(go.Bar(
+        x=[row['days'] for row in durations],
+        y=[row['count'] for row in durations],
+        name='Entries'
+    ))
+    fig.update_layout(
+        title=title,
+        xaxis_title="Days",
+        yaxis_title="Entries",
+        bargap=0.1,
+        height=400
+    )
+    return fig
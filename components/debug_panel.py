@@ -0,0 +1,38 @@
+import streamlit as st
+from database import pool_stats
+from async_db import get_async_pool
+from notify_listener import listener_stats
+from components.charts import figure_cache_stats
+
+def render_debug_panel(profile):
+    """Admin-only breakdown of a finished rerun's profile (see profiling.py)"""
+    import pandas as pd
+
+    summary = profile.summary()
+    with st.expander(f"🛠 Debug: {summary['total_ms']:.0f} ms, "
+                     f"{summary['queries']} queries this rerun"):
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Rerun", f"{summary['total_ms']:.1f} ms")
+        col2.metric("SQL statements", summary['queries'])
+        col3.metric("SQL time", f"{summary['query_ms']:.1f} ms")
+        col4.metric("Rows", summary['rows'])
+
+        st.markdown("**Sections**")
+        st.dataframe(pd.DataFrame(
+            [{'section': ' ' * depth + name, 'ms': round(ms or 0, 2)}
+             for name, depth, ms in profile.sections],
+            columns=['section', 'ms']), hide_index=True, width="stretch")
+
+        st.markdown("**SQL statements**")
+        st.caption("Concurrent page queries overlap, so their latencies can add up "
+                   "to more than the rerun took.")
+        st.dataframe(pd.DataFrame(
+            [dict(stats, total_ms=round(stats['total_ms'], 2), max_ms=round(stats['max_ms'], 2))
+             for stats in profile.query_stats()],
+            columns=['sql', 'count', 'total_ms', 'max_ms', 'rows']),
+            hide_index=True, width="stretch")
+
+        st.markdown("**Pools and caches**")
+        st.json({'connections': pool_stats(), 'async': get_async_pool().stats(),
+                 'figures': figure_cache_stats(), 'change_listener': listener_stats()},
+                expanded=False)
@@ -0,0 +1,24 @@
+import io
+import streamlit as st
+from export import FORMATS, available_formats, write_export
+
+def render_export_panel(user_id=None):
+    """Date range and format pickers that build a history export to download"""
+    with st.expander("📥 Export history"):
+        col1, col2, col3 = st.columns(3)
+        start = col1.date_input("From", value=None, key='export_start')
+        end = col2.date_input("To", value=None, key='export_end')
+        fmt = col3.selectbox("Format", available_formats(), key='export_format')
+
+        # Streamlit serves downloads from memory, so the whole export is built
+        # in memory here; `python export.py` is the streaming path for large
+        # histories
+        def build_export():
+            buffer = io.BytesIO()
+            write_export(buffer, fmt, start, end, user_id)
+            return buffer.getvalue()
+
+        # Generated when clicked rather than on every rerun
+        st.download_button("Download export", data=build_export,
+                           file_name=f"shipping_history.{fmt}", mime=FORMATS[fmt],
+                           key='export_download')
@@ -9,13 +9,8 @@ def render_entry_form():
         date = st.date_input("Date", datetime.now())
         project_name = st.text_input("Project Name")
         description = st.text_area("Description")
-        category = st.selectbox("Category", [
-            "Feature", "Bug Fix", "Enhancement", 
-            "Documentation", "Refactoring", "Web Development", "GenAI", "Game"
-        ])
-        status = st.selectbox("Status", [
-            "Completed", "In Progress", "Planned"
-        ])
+        category = st.selectbox("Category", ShippingEntry.CATEGORIES)
+        status = st.selectbox("Status", ShippingEntry.STATUSES)
         
         submitted = st.form_submit_button("Submit")
         
@@ -1,13 +1,13 @@
 import streamlit as st
 import random
-import pandas as pd
 from models import ShippingEntry
+from entry_frame import get_entry_frame
 
-def generate_project_idea(entries):
+def generate_project_idea(frame):
     """Generate a project idea based on existing entries and predefined patterns"""
-    
+
     # Get existing project data
-    df = pd.DataFrame(entries) if entries else pd.DataFrame()
+    df = frame.df
     
     # Base project types
     project_types = [
@@ -28,9 +28,8 @@ def generate_project_idea(entries):
     ]
     
     # Get unique categories from existing projects if available
-    if not df.empty and 'category' in df.columns:
-        existing_categories = df['category'].unique().tolist()
-    else:
+    existing_categories = df['category'].dropna().unique().tolist()
+    if not existing_categories:
         existing_categories = ["Feature", "Enhancement", "Integration"]
     
     # Generate random combinations
@@ -66,11 +65,12 @@ def generate_project_idea(entries):
         "feature": feature
     }
 
-def render_idea_generator():
+def render_idea_generator(frame=None):
     st.subheader("🎯 Project Idea Generator")
-    
+
     # Get existing entries for context
-    entries = ShippingEntry.get_all_entries()
+    if frame is None:
+        frame = get_entry_frame('all', ShippingEntry.get_all_entries)
     
     # Add description
     st.markdown("""
@@ -80,7 +80,7 @@ def render_idea_generator():
     """)
     
     if st.button("🎲 Generate New Idea"):
-        idea = generate_project_idea(entries)
+        idea = generate_project_idea(frame)
         
         # Display the generated idea in a card-like container
         with st.container():
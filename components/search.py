@@ -0,0 +1,46 @@
+import streamlit as st
+from models import ShippingEntry
+from cache import data_version, bump_data_version
+from events import subscribe, ENTRIES_CHANGED
+
+PAGE_SIZE = 20
+
+def _results_version():
+    # Any entry write can change matches or ranks; broad changes bump 'entries'
+    return (data_version('entries'), data_version('entry_search'))
+
+def _on_entries_changed(changes):
+    bump_data_version('entry_search')
+
+subscribe(ENTRIES_CHANGED, _on_entries_changed)
+
+def render_project_search(user_id=None):
+    """Search box over ``user_id``'s projects (all when None), loaded a page at a time"""
+    query = st.text_input("🔍 Search projects", key="project_search",
+                          placeholder='e.g. dashboard "dark mode" -draft').strip()
+    if not query:
+        return
+
+    # Keep fetched pages across reruns until the query changes or entries do
+    key = (query, user_id, _results_version())
+    state = st.session_state.get('search_results')
+    if state is None or state['key'] != key:
+        entries, cursor = ShippingEntry.search(query, PAGE_SIZE, user_id=user_id)
+        state = {'key': key, 'entries': entries, 'cursor': cursor}
+        st.session_state.search_results = state
+
+    if not state['entries']:
+        st.info(f"No projects match \"{query}\".")
+        return
+
+    for entry in state['entries']:
+        with st.expander(f"{entry['project_name']} - {entry['date']}"):
+            st.write(f"**Category:** {entry['category']}")
+            st.write(f"**Status:** {entry['status']}")
+            st.write(f"**Description:** {entry['description']}")
+
+    if state['cursor'] is not None and st.button("More results", key="search_more"):
+        entries, cursor = ShippingEntry.search(query, PAGE_SIZE, state['cursor'], user_id)
+        state['entries'] += entries
+        state['cursor'] = cursor
+        st.rerun()
@@ -1,7 +1,15 @@
 import os
+import time
+import socket
+import threading
+from contextlib import contextmanager
 import psycopg2
-from psycopg2.extras import RealDictCursor
-from werkzeug.security import generate_password_hash
+import psycopg2.extras
+import profiling
+
+# Identifies this process's sessions, e.g. so change notifications can tell
+# our own writes apart (Postgres truncates it to 63 characters)
+APPLICATION_NAME = f"daily-shipping:{socket.gethostname()}:{os.getpid()}"[:63]
 
 def get_db_connection():
     conn = psycopg2.connect(
@@ -9,53 +17,369 @@ def get_db_connection():
         database=os.environ['PGDATABASE'],
         user=os.environ['PGUSER'],
         password=os.environ['PGPASSWORD'],
-        port=os.environ['PGPORT']
+        port=os.environ['PGPORT'],
+        application_name=APPLICATION_NAME
     )
     return conn
 
+class PoolTimeout(Exception):
+    pass
+
+class ConnectionPool:
+    """Thread-safe pool of psycopg2 connections shared by every session in the process"""
+
+    def __init__(self, connect=get_db_connection, min_size=1, max_size=10,
+                 max_idle=300, health_check_after=30, timeout=10):
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.health_check_after = health_check_after
+        self.timeout = timeout
+
+        self._lock = threading.Condition()
+        self._idle = []  # (connection, returned_at), most recently used last
+        self._size = 0
+        self._closed = False
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time': 0.0,
+            'timeouts': 0,
+            'created': 0,
+            'discarded': 0,
+            'reaped': 0,
+            'health_checks': 0,
+        }
+
+        for _ in range(min_size):
+            self._idle.append((self._new_connection(), time.monotonic()))
+
+    def _new_connection(self):
+        conn = self._connect()
+        with self._lock:
+            self._size += 1
+            self._stats['created'] += 1
+        return conn
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._size -= 1
+            self._stats['discarded'] += 1
+            self._lock.notify()
+
+    def _is_healthy(self, conn, idle_for):
+        if conn.closed:
+            return False
+        if idle_for < self.health_check_after:
+            return True
+        with self._lock:
+            self._stats['health_checks'] += 1
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.close()
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _reap_idle(self):
+        """Close connections idle past max_idle while keeping min_size around (lock held)"""
+        now = time.monotonic()
+        stale = []
+        while (self._idle and self._size - len(stale) > self.min_size
+               and now - self._idle[0][1] > self.max_idle):
+            stale.append(self._idle.pop(0)[0])
+        for conn in stale:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        self._size -= len(stale)
+        self._stats['reaped'] += len(stale)
+
+    def getconn(self):
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        started = time.monotonic()
+
+        while True:
+            with self._lock:
+                if self._closed:
+                    raise PoolTimeout("Connection pool is closed")
+                self._reap_idle()
+
+                conn = returned_at = None
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                elif self._size < self.max_size:
+                    self._size += 1  # reserve the slot before connecting outside the lock
+                else:
+                    if not waited:
+                        waited = True
+                        self._stats['waits'] += 1
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeout(
+                            f"No database connection available after {self.timeout}s"
+                        )
+                    self._lock.wait(remaining)
+                    continue
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._size -= 1
+                        self._lock.notify()
+                    raise
+                with self._lock:
+                    self._stats['created'] += 1
+            elif not self._is_healthy(conn, time.monotonic() - returned_at):
+                self._discard(conn)
+                continue
+
+            with self._lock:
+                self._stats['checkouts'] += 1
+                if waited:
+                    self._stats['wait_time'] += time.monotonic() - started
+            return conn
+
+    def putconn(self, conn, discard=False):
+        if not discard and not conn.closed:
+            try:
+                # Never hand out a connection with an open transaction
+                conn.rollback()
+            except psycopg2.Error:
+                discard = True
+        if discard or conn.closed or self._closed:
+            self._discard(conn)
+            return
+        with self._lock:
+            self._idle.append((conn, time.monotonic()))
+            self._lock.notify()
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection for the duration of one request
+
+        Commits when the block exits cleanly, rolls back otherwise.
+        """
+        conn = self.getconn()
+        discard = False
+        try:
+            yield conn
+            conn.commit()
+        except Exception as e:
+            discard = isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError))
+            if not conn.closed:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    discard = True
+            raise
+        finally:
+            self.putconn(conn, discard=discard)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = self._size
+            stats['idle'] = len(self._idle)
+            stats['active'] = self._size - len(self._idle)
+            stats['min_size'] = self.min_size
+            stats['max_size'] = self.max_size
+            return stats
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._lock.notify_all()
+        for conn, _ in idle:
+            conn.close()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Return the process-wide connection pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    min_size=int(os.environ.get('DB_POOL_MIN', 1)),
+                    max_size=int(os.environ.get('DB_POOL_MAX', 10)),
+                    max_idle=float(os.environ.get('DB_POOL_MAX_IDLE', 300)),
+                    timeout=float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+                )
+    return _pool
+
+class PostgresBackend:
+    """The production backend: pooled psycopg2 connections and SQL migrations"""
+    name = 'postgres'
+    dialect = 'postgres'
+    analytics_dialect = 'postgres'
+    # Other processes' writes arrive as LISTEN/NOTIFY messages (notify_listener.py)
+    notifications = True
+
+    def connection(self):
+        return get_pool().connection()
+
+    def analytics_connection(self):
+        return get_pool().connection()
+
+    def stats(self):
+        return get_pool().stats()
+
+    def ensure_schema(self):
+        from migrate import ensure_schema
+        ensure_schema()
+
+    def rebuild_rollups(self, cur):
+        cur.execute("SELECT rebuild_entry_rollups()")
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_backend():
+    """
+    Return the process-wide storage backend, chosen by DB_BACKEND
+
+    'postgres' (the default) needs the PG* environment variables;
+    'embedded' runs on a local SQLite file with DuckDB for aggregates
+    (see embedded_db.py) and needs no server.
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = os.environ.get('DB_BACKEND', 'postgres')
+                if name == 'postgres':
+                    _backend = PostgresBackend()
+                elif name == 'embedded':
+                    from embedded_db import EmbeddedBackend
+                    _backend = EmbeddedBackend(os.environ.get('SQLITE_PATH', 'shipping.db'))
+                else:
+                    raise ValueError(f"Unknown DB_BACKEND {name!r}; use 'postgres' or 'embedded'")
+    return _backend
+
+class InstrumentedCursor:
+    """Cursor proxy reporting each statement's latency and row count to profiling"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._query = None
+        self._count_fetches = False
+
+    def execute(self, sql, params=None):
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(sql, params)
+        finally:
+            # psycopg2 knows the rows up front; SQLite/DuckDB only as they are fetched
+            rows = getattr(self._cursor, 'rowcount', -1)
+            self._count_fetches = rows is None or rows < 0
+            self._query = profiling.record_query(sql, time.perf_counter() - started,
+                                                 0 if self._count_fetches else rows)
+
+    def _fetched(self, started, rows):
+        if self._query is not None:
+            self._query['ms'] += (time.perf_counter() - started) * 1000
+            if self._count_fetches:
+                self._query['rows'] += rows
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._fetched(started, row is not None)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        started = time.perf_counter()
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        self._fetched(started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._fetched(started, len(rows))
+        return rows
+
+    def execute_values(self, sql, argslist, template=None, page_size=100, fetch=False):
+        # Recorded as one statement however many pages it takes
+        started = time.perf_counter()
+        result = execute_values(self._cursor, sql, argslist, template=template,
+                                page_size=page_size, fetch=fetch)
+        rows = len(result) if fetch else max(getattr(self._cursor, 'rowcount', 0) or 0, 0)
+        self._query = profiling.record_query(sql, time.perf_counter() - started, rows)
+        self._count_fetches = False
+        return result
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+class InstrumentedConnection:
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._conn.cursor(*args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+@contextmanager
+def _instrumented(connection):
+    with connection as conn:
+        yield InstrumentedConnection(conn)
+
+def get_connection():
+    """Context manager yielding a connection for one unit of work"""
+    return _instrumented(get_backend().connection())
+
+def get_analytics_connection():
+    """
+    Like get_connection, for read-only aggregate queries
+
+    On the embedded backend these run on DuckDB, so the SQL must stick to
+    what Postgres and DuckDB (or SQLite, without DuckDB) both accept; see
+    analytics_dialect().
+    """
+    return _instrumented(get_backend().analytics_connection())
+
+def dialect():
+    """SQL dialect of get_connection(): 'postgres' or 'sqlite'"""
+    return get_backend().dialect
+
+def analytics_dialect():
+    """SQL dialect of get_analytics_connection(): 'postgres', 'duckdb' or 'sqlite'"""
+    return get_backend().analytics_dialect
+
+def execute_values(cur, sql, argslist, template=None, page_size=100, fetch=False):
+    """psycopg2.extras.execute_values for any backend's cursor"""
+    if hasattr(cur, 'execute_values'):
+        return cur.execute_values(sql, argslist, template=template,
+                                  page_size=page_size, fetch=fetch)
+    return psycopg2.extras.execute_values(cur, sql, argslist, template=template,
+                                          page_size=page_size, fetch=fetch)
+
+def pool_stats():
+    return get_backend().stats()
+
 def init_db():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
-    # Create shipping_entries table if it doesn't exist
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS shipping_entries (
-            id SERIAL PRIMARY KEY,
-            date DATE NOT NULL,
-            project_name VARCHAR(255) NOT NULL,
-            description TEXT,
-            category VARCHAR(100),
-            status VARCHAR(50),
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            user_id INTEGER
-        )
-    """)
-
-    # Create users table if it doesn't exist
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id SERIAL PRIMARY KEY,
-            username VARCHAR(100) UNIQUE NOT NULL,
-            password_hash VARCHAR(255) NOT NULL,
-            role VARCHAR(20) NOT NULL DEFAULT 'guest',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Create default admin user if it doesn't exist
-    admin_password = os.environ.get('ADMIN_PASSWORD', 'admin123')  # Default password if not set
-    cur.execute("""
-        INSERT INTO users (username, password_hash, role)
-        SELECT 'admin', %s, 'admin'
-        WHERE NOT EXISTS (
-            SELECT 1 FROM users WHERE username = 'admin'
-        )
-    """, (generate_password_hash(admin_password),))
-    
-    conn.commit()
-    cur.close()
-    conn.close()
-    
-    # Initialize achievements
-    from models import Achievement
-    Achievement.init_achievements()
+    """Bring the schema up to date; after the first call per process this is free"""
+    get_backend().ensure_schema()
@@ -0,0 +1,483 @@
+"""Embedded storage backend: SQLite for the app, DuckDB for aggregates
+
+Selected with DB_BACKEND=embedded (see database.get_backend). Entries, users,
+streaks and achievements live in one SQLite file (SQLITE_PATH, default
+shipping.db; ':memory:' for a throwaway database), so the app, benchmarks and
+load tests run without a Postgres server. The schema is embedded_schema.sql.
+
+The models keep writing Postgres-flavoured SQL; cursors here translate it:
+%s / %(name)s placeholders, ``= ANY(%s)`` lists, ``::type`` casts,
+GREATEST/LEAST and FOR UPDATE. Anything beyond that needs a dialect()
+branch in the model.
+
+Aggregate queries (database.get_analytics_connection) run on an in-process
+DuckDB copy of shipping_entries when the duckdb package is installed and
+DB_ANALYTICS is not 'sqlite'. The copy is kept current by appending rows
+inserted since the last query and reloading after updates or deletes (see
+ColumnarMirror). Without DuckDB they run on SQLite's rollup tables.
+"""
+import os
+import re
+import sqlite3
+import threading
+import functools
+import importlib.util
+from datetime import date, datetime
+from contextlib import contextmanager
+
+SCHEMA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'embedded_schema.sql')
+
+# SQLite's default SQLITE_MAX_VARIABLE_NUMBER
+MAX_VARIABLES = 32766
+
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_converter('DATE', lambda value: date.fromisoformat(value.decode()[:10]))
+sqlite3.register_converter('TIMESTAMP', lambda value: datetime.fromisoformat(value.decode()))
+
+_PLACEHOLDER = re.compile(r"=\s*ANY\(\s*(?:%s|%\((\w+)\)s)\s*\)|%\((\w+)\)s|%s|%%")
+_CAST = re.compile(r"::\w+(?:\[\])?")
+_MIN_MAX = re.compile(r"\b(GREATEST|LEAST)\(")
+_FOR_UPDATE = re.compile(r"\bFOR UPDATE\b")
+_WRITE = re.compile(r"\b(INSERT|UPDATE|DELETE|REPLACE)\b", re.IGNORECASE)
+
+@functools.lru_cache(maxsize=512)
+def _rewrite(sql, target):
+    if target == 'sqlite':
+        sql = _CAST.sub('', sql)
+        sql = _MIN_MAX.sub(lambda m: ('MAX(' if m.group(1) == 'GREATEST' else 'MIN('), sql)
+        sql = _FOR_UPDATE.sub('', sql)
+    return sql
+
+def translate(sql, params, target='sqlite'):
+    """
+    Rewrite a psycopg2-style statement for SQLite or DuckDB
+
+    Returns:
+        tuple: (sql, params) with qmark or named placeholders; lists bound to
+            ``= ANY(...)`` are expanded into ``IN (...)``
+    """
+    sql = _rewrite(sql, target)
+    if params is None:
+        return sql, ()
+
+    named = isinstance(params, dict)
+    prefix = ':' if target == 'sqlite' else '$'
+    values = {} if named else []
+    positional = None if named else iter(params)
+
+    def replace(match):
+        text = match.group(0)
+        if text == '%%':
+            return '%'
+        if text.startswith('='):
+            name = match.group(1)
+            items = list(params[name] if named else next(positional))
+            if not named:
+                values.extend(items)
+                return f"IN ({', '.join('?' * len(items))})"
+            keys = [f"{name}_{i}" for i in range(len(items))]
+            values.update(zip(keys, items))
+            return f"IN ({', '.join(prefix + key for key in keys)})"
+        if named:
+            name = match.group(2)
+            values[name] = params[name]
+            return prefix + name
+        values.append(next(positional))
+        return '?'
+
+    return _PLACEHOLDER.sub(replace, sql), values
+
+def _is_write(sql):
+    head = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ''
+    if head == 'SELECT':
+        return False
+    if head == 'WITH':
+        return _WRITE.search(sql) is not None
+    return head not in ('PRAGMA', 'VALUES', 'EXPLAIN', 'BEGIN', 'COMMIT', 'ROLLBACK')
+
+def fts_query(text):
+    """
+    Turn a web-search style query into an FTS5 MATCH expression
+
+    Words and "quoted phrases" must all match, ``-word`` excludes and ``or``
+    between two terms makes either enough, like websearch_to_tsquery.
+    Returns None when nothing searchable is left.
+    """
+    include, exclude = [], []
+    either = False
+    for token in re.findall(r'-?"[^"]*"|\S+', text):
+        negate = token.startswith('-')
+        term = token.lstrip('-').strip('"')
+        if not negate and term.lower() == 'or' and include:
+            either = True
+            continue
+        words = re.findall(r"\w+", term)
+        if not words:
+            continue
+        phrase = '"' + ' '.join(words) + '"'
+        if negate:
+            exclude.append(phrase)
+        elif either:
+            include[-1] = f"({include[-1]} OR {phrase})"
+            either = False
+        else:
+            include.append(phrase)
+    if not include:
+        return None
+    return ' AND '.join(include) + ''.join(f" NOT {phrase}" for phrase in exclude)
+
+class Cursor:
+    """DB-API cursor that accepts the models' Postgres-style SQL"""
+
+    def __init__(self, cursor, target, dict_rows=False, before_write=None):
+        self._cursor = cursor
+        self.dialect = target
+        self._dict_rows = dict_rows
+        self._before_write = before_write
+
+    def execute(self, sql, params=None):
+        if self._before_write is not None and _is_write(sql):
+            self._before_write()
+        self._cursor.execute(*translate(sql, params, self.dialect))
+        return self
+
+    def execute_values(self, sql, argslist, template=None, page_size=100, fetch=False):
+        """psycopg2.extras.execute_values: expand the single VALUES %s into pages of rows"""
+        rows = [tuple(args) for args in argslist]
+        results = []
+        if not rows:
+            return results if fetch else None
+        template = template or "(" + ", ".join(["%s"] * len(rows[0])) + ")"
+        page_size = max(1, min(page_size, MAX_VARIABLES // len(rows[0])))
+        head, tail = sql.split('%s', 1)
+        for start in range(0, len(rows), page_size):
+            page = rows[start:start + page_size]
+            self.execute(head + ", ".join([template] * len(page)) + tail,
+                         [value for row in page for value in row])
+            if fetch:
+                results.extend(self.fetchall())
+        return results if fetch else None
+
+    def _row(self, row):
+        if row is None or not self._dict_rows:
+            return row
+        return dict(zip([column[0] for column in self._cursor.description], row))
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchmany(self, size=None):
+        rows = self._cursor.fetchmany(size) if size else self._cursor.fetchmany()
+        return [self._row(row) for row in rows]
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return getattr(self._cursor, 'rowcount', -1)
+
+    def close(self):
+        self._cursor.close()
+
+class Connection:
+    """Enough of a psycopg2 connection for the models"""
+    closed = 0
+
+    def __init__(self, conn, target):
+        self._conn = conn
+        self.dialect = target
+
+    def _begin(self):
+        # Statements run in autocommit until the first write, which opens a
+        # transaction holding the write lock: reads before it see committed
+        # data, like Postgres' READ COMMITTED, and the write never fails on
+        # a stale snapshot
+        if not self._conn.in_transaction:
+            self._conn.execute("BEGIN IMMEDIATE")
+
+    def cursor(self, cursor_factory=None, name=None):
+        before_write = self._begin if self.dialect == 'sqlite' else None
+        # Any cursor_factory means RealDictCursor here: rows come back as dicts.
+        # A name (psycopg2's server-side cursor) needs nothing: SQLite already
+        # produces rows as they are fetched
+        return Cursor(self._conn.cursor(), self.dialect, dict_rows=cursor_factory is not None,
+                      before_write=before_write)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        pass
+
+def rebuild_rollups(cur):
+    """SQLite version of rebuild_entry_rollups() (migration 0004); also reindexes search"""
+    for table in ('entry_daily_counts', 'entry_category_counts',
+                  'entry_status_counts', 'entry_weekday_counts', 'entry_monthly_counts'):
+        cur.execute(f"DELETE FROM {table}")
+    cur.execute("""
+        INSERT INTO entry_daily_counts (date, count)
+        SELECT date, COUNT(*) FROM shipping_entries GROUP BY date
+    """)
+    cur.execute("""
+        INSERT INTO entry_category_counts (category, count)
+        SELECT COALESCE(category, ''), COUNT(*) FROM shipping_entries
+        GROUP BY COALESCE(category, '')
+    """)
+    cur.execute("""
+        INSERT INTO entry_status_counts (status, count)
+        SELECT COALESCE(status, ''), COUNT(*) FROM shipping_entries
+        GROUP BY COALESCE(status, '')
+    """)
+    cur.execute("""
+        INSERT INTO entry_weekday_counts (weekday, count)
+        SELECT CAST(strftime('%w', date) AS INTEGER), COUNT(*) FROM shipping_entries
+        GROUP BY 1
+    """)
+    cur.execute("""
+        INSERT INTO entry_monthly_counts (month, category, status, count)
+        SELECT strftime('%Y-%m-01', date), COALESCE(category, ''), COALESCE(status, ''), COUNT(*)
+        FROM shipping_entries
+        GROUP BY 1, 2, 3
+    """)
+    cur.execute("INSERT INTO shipping_entries_fts (shipping_entries_fts) VALUES ('rebuild')")
+
+# The DuckDB copy of shipping_entries, plus views named like the rollup tables
+# so EntryRollup's queries run unchanged
+MIRROR_SCHEMA = """
+    CREATE TABLE shipping_entries (
+        id INTEGER PRIMARY KEY,
+        date DATE NOT NULL,
+        project_name VARCHAR NOT NULL,
+        description VARCHAR,
+        category VARCHAR,
+        status VARCHAR,
+        created_at TIMESTAMP,
+        user_id INTEGER
+    );
+    CREATE VIEW entry_daily_counts AS
+        SELECT date, COUNT(*)::INTEGER AS count FROM shipping_entries GROUP BY date;
+    CREATE VIEW entry_category_counts AS
+        SELECT COALESCE(category, '') AS category, COUNT(*)::INTEGER AS count
+        FROM shipping_entries GROUP BY 1;
+    CREATE VIEW entry_status_counts AS
+        SELECT COALESCE(status, '') AS status, COUNT(*)::INTEGER AS count
+        FROM shipping_entries GROUP BY 1;
+    CREATE VIEW entry_weekday_counts AS
+        SELECT EXTRACT(DOW FROM date)::SMALLINT AS weekday, COUNT(*)::INTEGER AS count
+        FROM shipping_entries GROUP BY 1;
+    CREATE VIEW entry_monthly_counts AS
+        SELECT CAST(date_trunc('month', date) AS DATE) AS month, COALESCE(category, '') AS category,
+               COALESCE(status, '') AS status, COUNT(*)::INTEGER AS count
+        FROM shipping_entries GROUP BY 1, 2, 3;
+"""
+
+MIRROR_COLUMNS = ['id', 'date', 'project_name', 'description',
+                  'category', 'status', 'created_at', 'user_id']
+
+class ColumnarMirror:
+    """
+    In-process DuckDB copy of shipping_entries for aggregate queries
+
+    Before each analytics connection the entry_changes counters are read
+    from SQLite (one row): new inserts are appended by id, any update or
+    delete reloads the whole table. Each process keeps its own copy, and
+    writes from other processes show up the same way.
+    """
+
+    def __init__(self, backend):
+        import duckdb
+        self._backend = backend
+        self._db = duckdb.connect()
+        self._db.execute(MIRROR_SCHEMA)
+        self._lock = threading.Lock()
+        self._version = None
+        self._max_id = 0
+        self._stats = {'reloads': 0, 'appends': 0, 'rows': 0}
+
+    def refresh(self):
+        with self._backend.connection() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT inserted, modified FROM entry_changes")
+            version = cur.fetchone()
+            if version == self._version:
+                cur.close()
+                return
+
+            with self._lock:
+                if version == self._version:
+                    cur.close()
+                    return
+                reload = self._version is None or version[1] != self._version[1]
+                if reload:
+                    cur.execute(f"SELECT {', '.join(MIRROR_COLUMNS)} FROM shipping_entries")
+                else:
+                    cur.execute(f"""
+                        SELECT {', '.join(MIRROR_COLUMNS)} FROM shipping_entries WHERE id > %s
+                    """, (self._max_id,))
+                rows = cur.fetchall()
+                cur.close()
+                self._load(rows, reload)
+                # Rows committed after the counters were read are simply
+                # picked up (or reloaded) on the next refresh
+                self._version = version
+
+    def _load(self, rows, reload):
+        import pandas as pd
+        db = self._db.cursor()
+        try:
+            db.execute("BEGIN")
+            if reload:
+                db.execute("DELETE FROM shipping_entries")
+                self._max_id = 0
+            if rows:
+                db.register('incoming', pd.DataFrame(rows, columns=MIRROR_COLUMNS))
+                db.execute("""
+                    INSERT INTO shipping_entries
+                    SELECT id, CAST(date AS DATE), project_name, description, category,
+                           status, CAST(created_at AS TIMESTAMP), user_id
+                    FROM incoming
+                """)
+                db.unregister('incoming')
+                self._max_id = max(self._max_id, max(row[0] for row in rows))
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            self._version = None
+            raise
+        finally:
+            db.close()
+        self._stats['reloads' if reload else 'appends'] += 1
+        self._stats['rows'] += len(rows)
+
+    @contextmanager
+    def connection(self):
+        self.refresh()
+        db = self._db.cursor()
+        try:
+            yield Connection(db, 'duckdb')
+        finally:
+            db.close()
+
+    def stats(self):
+        return dict(self._stats, max_id=self._max_id)
+
+class EmbeddedBackend:
+    """SQLite file (one connection per thread) plus an optional DuckDB mirror"""
+    name = 'embedded'
+    dialect = 'sqlite'
+    # There is no LISTEN/NOTIFY; cache versions are per process
+    notifications = False
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+        self._stats = {'connections': 0}
+
+        if path == ':memory:':
+            # A named shared-cache database, so every thread sees the same
+            # data; the keeper connection stops it vanishing between uses
+            self._target, self._uri = f"file:shipping-{id(self)}?mode=memory&cache=shared", True
+            self._keeper = self._connect()
+        else:
+            self._target, self._uri = path, False
+
+        # The mirror (and duckdb itself) is only loaded by the first aggregate query
+        self._mirror = None
+        self._mirror_lock = threading.Lock()
+        self.analytics_dialect = 'sqlite'
+        if (os.environ.get('DB_ANALYTICS', 'duckdb') == 'duckdb'
+                and importlib.util.find_spec('duckdb') is not None):
+            self.analytics_dialect = 'duckdb'
+
+    def _connect(self):
+        conn = sqlite3.connect(self._target, uri=self._uri, timeout=30,
+                               detect_types=sqlite3.PARSE_DECLTYPES,
+                               isolation_level=None, check_same_thread=False)
+        if not self._uri:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA foreign_keys = ON")
+        self._stats['connections'] += 1
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Commits when the block exits cleanly, rolls back otherwise"""
+        local = self._local
+        nested = getattr(local, 'busy', False)
+        if nested:
+            # Never share the thread's connection with an enclosing unit of work
+            conn = self._connect()
+        else:
+            conn = getattr(local, 'conn', None)
+            if conn is None:
+                conn = local.conn = self._connect()
+            local.busy = True
+        try:
+            yield Connection(conn, 'sqlite')
+            if conn.in_transaction:
+                conn.commit()
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            if nested:
+                conn.close()
+            else:
+                local.busy = False
+
+    def analytics_connection(self):
+        if self.analytics_dialect != 'duckdb':
+            return self.connection()
+        if self._mirror is None:
+            with self._mirror_lock:
+                if self._mirror is None:
+                    self._mirror = ColumnarMirror(self)
+        return self._mirror.connection()
+
+    def stats(self):
+        stats = dict(self._stats, backend=self.name, path=self.path,
+                     analytics=self.analytics_dialect)
+        if self._mirror is not None:
+            stats['mirror'] = self._mirror.stats()
+        return stats
+
+    def ensure_schema(self):
+        """Apply embedded_schema.sql and create the admin user, once per process"""
+        if self._schema_ready:
+            return
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            from werkzeug.security import generate_password_hash
+            with open(SCHEMA_FILE, encoding='utf-8') as f:
+                schema = f.read()
+            with self.connection() as conn:
+                conn._conn.executescript(schema)
+                cur = conn.cursor()
+                cur.execute("SELECT 1 FROM users WHERE username = 'admin'")
+                if cur.fetchone() is None:
+                    cur.execute("""
+                        INSERT INTO users (username, password_hash, role)
+                        VALUES ('admin', %s, 'admin')
+                    """, (generate_password_hash(os.environ.get('ADMIN_PASSWORD', 'admin123')),))
+                cur.close()
+            self._schema_ready = True
+
+    def rebuild_rollups(self, cur):
+        rebuild_rollups(cur)
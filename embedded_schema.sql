@@ -0,0 +1,265 @@
+-- Schema of the embedded backend (embedded_db.py): what migrations/ build on
+-- Postgres, in SQLite terms. It is applied whole on every start, so keep every
+-- statement idempotent and keep it in step when a migration changes the schema.
+-- There are no partitions; full-text search uses FTS5 instead of tsvector.
+
+CREATE TABLE IF NOT EXISTS shipping_entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date DATE NOT NULL,
+    project_name VARCHAR(255) NOT NULL,
+    description TEXT,
+    category VARCHAR(100),
+    status VARCHAR(50),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    user_id INTEGER
+);
+
+CREATE INDEX IF NOT EXISTS shipping_entries_date_id_idx
+    ON shipping_entries (date DESC, id DESC);
+CREATE INDEX IF NOT EXISTS shipping_entries_user_date_idx
+    ON shipping_entries (user_id, date);
+CREATE INDEX IF NOT EXISTS shipping_entries_date_project_idx
+    ON shipping_entries (date, project_name);
+
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username VARCHAR(100) UNIQUE NOT NULL,
+    password_hash VARCHAR(255) NOT NULL,
+    role VARCHAR(20) NOT NULL DEFAULT 'guest',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS achievements (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(100) NOT NULL UNIQUE,
+    description TEXT,
+    badge_icon TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT OR IGNORE INTO achievements (name, description, badge_icon) VALUES
+    ('Starter Ship', 'Ship your first project', '🌟'),
+    ('Weekly Warrior', 'Complete 7 days shipping streak', '🔥'),
+    ('Monthly Master', 'Complete 30 days shipping streak', '👑'),
+    ('Category Collector', 'Ship projects in all categories', '🎯'),
+    ('Speed Demon', 'Ship 3 projects in a single day', '⚡');
+
+CREATE TABLE IF NOT EXISTS streaks (
+    user_id INTEGER PRIMARY KEY,
+    current_streak INTEGER NOT NULL,
+    longest_streak INTEGER NOT NULL,
+    last_ship_date DATE NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS user_achievements (
+    user_id INTEGER NOT NULL,
+    achievement_id INTEGER NOT NULL REFERENCES achievements(id) ON DELETE CASCADE,
+    unlocked_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, achievement_id)
+);
+
+CREATE TABLE IF NOT EXISTS user_achievement_progress (
+    user_id INTEGER PRIMARY KEY,
+    ships INTEGER NOT NULL DEFAULT 0,
+    distinct_categories INTEGER NOT NULL DEFAULT 0,
+    max_daily_count INTEGER NOT NULL DEFAULT 0,
+    current_streak INTEGER NOT NULL DEFAULT 0,
+    longest_streak INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS user_categories (
+    user_id INTEGER NOT NULL,
+    category VARCHAR(100) NOT NULL,
+    PRIMARY KEY (user_id, category)
+);
+
+-- Rollups (migration 0004); NULL category/status are stored as ''
+CREATE TABLE IF NOT EXISTS entry_daily_counts (
+    date DATE PRIMARY KEY,
+    count INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS entry_category_counts (
+    category VARCHAR(100) PRIMARY KEY,
+    count INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS entry_status_counts (
+    status VARCHAR(50) PRIMARY KEY,
+    count INTEGER NOT NULL
+);
+
+-- weekday follows strftime('%w'), which matches Postgres DOW: 0 = Sunday
+CREATE TABLE IF NOT EXISTS entry_weekday_counts (
+    weekday SMALLINT PRIMARY KEY,
+    count INTEGER NOT NULL
+);
+
+-- Counts inserts and other changes to shipping_entries so the DuckDB mirror
+-- knows whether to append new rows or reload (see embedded_db.ColumnarMirror)
+CREATE TABLE IF NOT EXISTS entry_changes (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    inserted INTEGER NOT NULL DEFAULT 0,
+    modified INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT OR IGNORE INTO entry_changes (id) VALUES (1);
+
+-- Insights (migration 0013): monthly (category, status) rollup, month being
+-- the first day of the month, and the history of every status an entry takes
+CREATE TABLE IF NOT EXISTS entry_monthly_counts (
+    month DATE NOT NULL,
+    category VARCHAR(100) NOT NULL,
+    status VARCHAR(50) NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (month, category, status)
+);
+
+CREATE TABLE IF NOT EXISTS entry_status_changes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    entry_id INTEGER NOT NULL,
+    from_status VARCHAR(50),
+    to_status VARCHAR(50),
+    changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS entry_status_changes_status_idx
+    ON entry_status_changes (to_status, entry_id, changed_at);
+
+-- Fill both for files created before they existed (a no-op afterwards)
+INSERT INTO entry_monthly_counts (month, category, status, count)
+SELECT strftime('%Y-%m-01', date), COALESCE(category, ''), COALESCE(status, ''), COUNT(*)
+FROM shipping_entries
+WHERE NOT EXISTS (SELECT 1 FROM entry_monthly_counts)
+GROUP BY 1, 2, 3;
+
+INSERT INTO entry_status_changes (entry_id, to_status, changed_at)
+SELECT id, status, COALESCE(created_at, CURRENT_TIMESTAMP) FROM shipping_entries
+WHERE NOT EXISTS (SELECT 1 FROM entry_status_changes);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS shipping_entries_fts USING fts5(
+    project_name, description,
+    content='shipping_entries', content_rowid='id', tokenize='porter'
+);
+
+CREATE TRIGGER IF NOT EXISTS shipping_entries_after_insert
+AFTER INSERT ON shipping_entries
+BEGIN
+    INSERT INTO entry_daily_counts (date, count) VALUES (NEW.date, 1)
+        ON CONFLICT (date) DO UPDATE SET count = count + 1;
+    INSERT INTO entry_category_counts (category, count) VALUES (COALESCE(NEW.category, ''), 1)
+        ON CONFLICT (category) DO UPDATE SET count = count + 1;
+    INSERT INTO entry_status_counts (status, count) VALUES (COALESCE(NEW.status, ''), 1)
+        ON CONFLICT (status) DO UPDATE SET count = count + 1;
+    INSERT INTO entry_weekday_counts (weekday, count)
+        VALUES (CAST(strftime('%w', NEW.date) AS INTEGER), 1)
+        ON CONFLICT (weekday) DO UPDATE SET count = count + 1;
+
+    INSERT INTO shipping_entries_fts (rowid, project_name, description)
+        VALUES (NEW.id, NEW.project_name, NEW.description);
+    UPDATE entry_changes SET inserted = inserted + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS shipping_entries_after_delete
+AFTER DELETE ON shipping_entries
+BEGIN
+    UPDATE entry_daily_counts SET count = count - 1 WHERE date = OLD.date;
+    UPDATE entry_category_counts SET count = count - 1 WHERE category = COALESCE(OLD.category, '');
+    UPDATE entry_status_counts SET count = count - 1 WHERE status = COALESCE(OLD.status, '');
+    UPDATE entry_weekday_counts SET count = count - 1
+        WHERE weekday = CAST(strftime('%w', OLD.date) AS INTEGER);
+    DELETE FROM entry_daily_counts WHERE date = OLD.date AND count <= 0;
+    DELETE FROM entry_category_counts WHERE category = COALESCE(OLD.category, '') AND count <= 0;
+    DELETE FROM entry_status_counts WHERE status = COALESCE(OLD.status, '') AND count <= 0;
+    DELETE FROM entry_weekday_counts
+        WHERE weekday = CAST(strftime('%w', OLD.date) AS INTEGER) AND count <= 0;
+
+    INSERT INTO shipping_entries_fts (shipping_entries_fts, rowid, project_name, description)
+        VALUES ('delete', OLD.id, OLD.project_name, OLD.description);
+    UPDATE entry_changes SET modified = modified + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS shipping_entries_rollup_update
+AFTER UPDATE OF date, category, status ON shipping_entries
+WHEN OLD.date IS NOT NEW.date OR OLD.category IS NOT NEW.category OR OLD.status IS NOT NEW.status
+BEGIN
+    UPDATE entry_daily_counts SET count = count - 1 WHERE date = OLD.date;
+    UPDATE entry_category_counts SET count = count - 1 WHERE category = COALESCE(OLD.category, '');
+    UPDATE entry_status_counts SET count = count - 1 WHERE status = COALESCE(OLD.status, '');
+    UPDATE entry_weekday_counts SET count = count - 1
+        WHERE weekday = CAST(strftime('%w', OLD.date) AS INTEGER);
+    DELETE FROM entry_daily_counts WHERE date = OLD.date AND count <= 0;
+    DELETE FROM entry_category_counts WHERE category = COALESCE(OLD.category, '') AND count <= 0;
+    DELETE FROM entry_status_counts WHERE status = COALESCE(OLD.status, '') AND count <= 0;
+    DELETE FROM entry_weekday_counts
+        WHERE weekday = CAST(strftime('%w', OLD.date) AS INTEGER) AND count <= 0;
+
+    INSERT INTO entry_daily_counts (date, count) VALUES (NEW.date, 1)
+        ON CONFLICT (date) DO UPDATE SET count = count + 1;
+    INSERT INTO entry_category_counts (category, count) VALUES (COALESCE(NEW.category, ''), 1)
+        ON CONFLICT (category) DO UPDATE SET count = count + 1;
+    INSERT INTO entry_status_counts (status, count) VALUES (COALESCE(NEW.status, ''), 1)
+        ON CONFLICT (status) DO UPDATE SET count = count + 1;
+    INSERT INTO entry_weekday_counts (weekday, count)
+        VALUES (CAST(strftime('%w', NEW.date) AS INTEGER), 1)
+        ON CONFLICT (weekday) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS shipping_entries_after_update
+AFTER UPDATE ON shipping_entries
+BEGIN
+    INSERT INTO shipping_entries_fts (shipping_entries_fts, rowid, project_name, description)
+        VALUES ('delete', OLD.id, OLD.project_name, OLD.description);
+    INSERT INTO shipping_entries_fts (rowid, project_name, description)
+        VALUES (NEW.id, NEW.project_name, NEW.description);
+    UPDATE entry_changes SET modified = modified + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS shipping_entries_insights_insert
+AFTER INSERT ON shipping_entries
+BEGIN
+    INSERT INTO entry_monthly_counts (month, category, status, count)
+        VALUES (strftime('%Y-%m-01', NEW.date), COALESCE(NEW.category, ''),
+                COALESCE(NEW.status, ''), 1)
+        ON CONFLICT (month, category, status) DO UPDATE SET count = count + 1;
+    INSERT INTO entry_status_changes (entry_id, to_status) VALUES (NEW.id, NEW.status);
+END;
+
+CREATE TRIGGER IF NOT EXISTS shipping_entries_insights_delete
+AFTER DELETE ON shipping_entries
+BEGIN
+    UPDATE entry_monthly_counts SET count = count - 1
+        WHERE month = strftime('%Y-%m-01', OLD.date)
+          AND category = COALESCE(OLD.category, '') AND status = COALESCE(OLD.status, '');
+    DELETE FROM entry_monthly_counts
+        WHERE month = strftime('%Y-%m-01', OLD.date)
+          AND category = COALESCE(OLD.category, '') AND status = COALESCE(OLD.status, '')
+          AND count <= 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS shipping_entries_insights_rollup_update
+AFTER UPDATE OF date, category, status ON shipping_entries
+WHEN OLD.date IS NOT NEW.date OR OLD.category IS NOT NEW.category OR OLD.status IS NOT NEW.status
+BEGIN
+    UPDATE entry_monthly_counts SET count = count - 1
+        WHERE month = strftime('%Y-%m-01', OLD.date)
+          AND category = COALESCE(OLD.category, '') AND status = COALESCE(OLD.status, '');
+    DELETE FROM entry_monthly_counts
+        WHERE month = strftime('%Y-%m-01', OLD.date)
+          AND category = COALESCE(OLD.category, '') AND status = COALESCE(OLD.status, '')
+          AND count <= 0;
+    INSERT INTO entry_monthly_counts (month, category, status, count)
+        VALUES (strftime('%Y-%m-01', NEW.date), COALESCE(NEW.category, ''),
+                COALESCE(NEW.status, ''), 1)
+        ON CONFLICT (month, category, status) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS shipping_entries_status_history
+AFTER UPDATE OF status ON shipping_entries
+WHEN OLD.status IS NOT NEW.status
+BEGIN
+    INSERT INTO entry_status_changes (entry_id, from_status, to_status)
+        VALUES (NEW.id, OLD.status, NEW.status);
+END;
@@ -0,0 +1,88 @@
+import threading
+from collections import OrderedDict
+from cache import data_version
+from events import subscribe, ENTRIES_CHANGED
+
+COLUMNS = ['id', 'date', 'project_name', 'description', 'category', 'status', 'created_at']
+
+class EntryFrame:
+    """Typed, read-only view of shipping entries shared by every component in a rerun
+
+    Dates are datetime64, category and status are categoricals. Consumers
+    must treat ``df`` as immutable (use ``assign``/``copy`` to derive columns)
+    because the same frame is handed to every chart and metric.
+    """
+
+    def __init__(self, df):
+        self.df = df
+
+    @classmethod
+    def from_entries(cls, entries):
+        import pandas as pd  # deferred: only pages that build frames need it
+        df = pd.DataFrame(list(entries), columns=COLUMNS)
+        df['date'] = pd.to_datetime(df['date'])
+        df['category'] = df['category'].astype('category')
+        df['status'] = df['status'].astype('category')
+        return cls(df)
+
+    @property
+    def empty(self):
+        return self.df.empty
+
+    def __len__(self):
+        return len(self.df)
+
+_frames = OrderedDict()
+_frames_lock = threading.Lock()
+MAX_FRAMES = 16
+
+def peek_entry_frame(key):
+    """Return the cached EntryFrame for ``key`` if it is current, without loading"""
+    with _frames_lock:
+        return _frames.get((key, data_version('entries')))
+
+def get_entry_frame(key, loader):
+    """
+    Return the EntryFrame for ``key``, building it at most once per data version
+
+    Args:
+        key: Hashable description of the query, e.g. ('all', owner) or
+            ('between', start, end, owner)
+        loader (callable): Fetches the entry rows when the cached frame is stale
+    """
+    cache_key = (key, data_version('entries'))
+    with _frames_lock:
+        frame = _frames.get(cache_key)
+        if frame is not None:
+            _frames.move_to_end(cache_key)
+            return frame
+
+    frame = EntryFrame.from_entries(loader())
+
+    with _frames_lock:
+        # Frames built from an older version can never be hit again
+        for stale in [k for k in _frames if k[1] != cache_key[1]]:
+            del _frames[stale]
+        _frames[cache_key] = frame
+        while len(_frames) > MAX_FRAMES:
+            _frames.popitem(last=False)
+    return frame
+
+def _covers(key, days):
+    """Whether a cached frame's query could include an entry dated on any of ``days``"""
+    if isinstance(key, tuple) and key[0] == 'between':
+        start, end = key[1], key[2]
+        return any(start <= day <= end for day in days)
+    # 'all', 'recent' and anything unknown: be safe and assume it does
+    return True
+
+def _evict_changed(changes):
+    # ShippingEntry and the notify listener emit plain dates
+    days = {row['date'] for change in changes
+            for row in (change['before'], change['after']) if row is not None}
+
+    with _frames_lock:
+        for cache_key in [k for k in _frames if _covers(k[0], days)]:
+            del _frames[cache_key]
+
+subscribe(ENTRIES_CHANGED, _evict_changed)
@@ -0,0 +1,29 @@
+"""In-process change events
+
+Writers emit an event after their transaction commits; subscribers (caches,
+derived views) use the payload to invalidate exactly what changed.
+"""
+import threading
+from collections import defaultdict
+
+# payload: changes=[{'id', 'columns', 'before', 'after'}]; before/after hold the
+# row's date, user_id, category and status (None for inserts/deletes)
+ENTRIES_CHANGED = 'entries_changed'
+
+_subscribers = defaultdict(list)
+_lock = threading.Lock()
+
+def subscribe(event, handler):
+    with _lock:
+        _subscribers[event].append(handler)
+    return handler
+
+def emit(event, **payload):
+    with _lock:
+        handlers = list(_subscribers[event])
+    for handler in handlers:
+        try:
+            handler(**payload)
+        except Exception as e:
+            # A broken subscriber must not fail the write that already committed
+            print(f"Error handling {event} event in {handler.__name__}: {e}")
@@ -0,0 +1,144 @@
+"""Export shipping entries to CSV, JSONL or Parquet
+
+Rows are streamed from ShippingEntry.iter_export() in fixed-size batches and
+written as each batch arrives, so memory use stays flat however long the
+history is. CSV and JSONL exports can be loaded back with bulk_import.py.
+Parquet needs pyarrow, which is optional; every batch becomes one row group.
+
+Usage:
+    python export.py --output history.csv
+    python export.py --format jsonl --start 2024-01-01 --user-id 3 > mine.jsonl
+    python export.py --output history.parquet --batch-size 50000
+"""
+import io
+import os
+import csv
+import sys
+import json
+import time
+import argparse
+import importlib.util
+from datetime import date, datetime
+from models import ShippingEntry
+
+COLUMNS = ShippingEntry.EXPORT_COLUMNS
+BATCH_SIZE = 5000
+
+# format -> MIME type
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+def available_formats():
+    """Formats usable in this environment (Parquet only with pyarrow installed)"""
+    return [fmt for fmt in FORMATS
+            if fmt != 'parquet' or importlib.util.find_spec('pyarrow') is not None]
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def write_csv(batches, f):
+    """Write batches of row tuples to the binary file ``f``; returns the row count"""
+    text = io.TextIOWrapper(f, encoding='utf-8', newline='', write_through=True)
+    writer = csv.writer(text)
+    writer.writerow(COLUMNS)
+    rows = 0
+    for batch in batches:
+        writer.writerows(batch)
+        rows += len(batch)
+    text.detach()  # leave ``f`` open for the caller
+    return rows
+
+def write_jsonl(batches, f):
+    rows = 0
+    for batch in batches:
+        f.write(''.join(json.dumps(dict(zip(COLUMNS, row)), default=_json_default) + '\n'
+                        for row in batch).encode('utf-8'))
+        rows += len(batch)
+    return rows
+
+def write_parquet(batches, f):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ('id', pa.int64()),
+        ('date', pa.date32()),
+        ('project_name', pa.string()),
+        ('description', pa.string()),
+        ('category', pa.string()),
+        ('status', pa.string()),
+        ('created_at', pa.timestamp('us')),
+        ('user_id', pa.int64()),
+    ])
+    rows = 0
+    with pq.ParquetWriter(f, schema) as writer:
+        for batch in batches:
+            columns = zip(*batch)
+            writer.write_table(pa.table(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema))
+            rows += len(batch)
+    return rows
+
+WRITERS = {'csv': write_csv, 'jsonl': write_jsonl, 'parquet': write_parquet}
+
+def write_export(f, fmt='csv', start=None, end=None, user_id=None, batch_size=BATCH_SIZE):
+    """
+    Stream the matching entries into a binary file object
+
+    Args:
+        f: Writable binary file object
+        fmt (str): 'csv', 'jsonl' or 'parquet'
+        start (date): First date to include, None for no lower bound
+        end (date): Last date to include, None for no upper bound
+        user_id (int): Owner to export, None for all entries
+        batch_size (int): Rows fetched and written at a time
+
+    Returns:
+        int: Number of entries written
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown export format {fmt!r}")
+    return WRITERS[fmt](ShippingEntry.iter_export(start, end, user_id, batch_size), f)
+
+def main():
+    parser = argparse.ArgumentParser(description="Export shipping entries to CSV, JSONL or Parquet")
+    parser.add_argument('--output', '-o', default='-',
+                        help="File to write, '-' for stdout (default)")
+    parser.add_argument('--format', choices=list(FORMATS),
+                        help="Output format (default: from file extension, csv for stdout)")
+    parser.add_argument('--start', type=date.fromisoformat, help="First date (YYYY-MM-DD)")
+    parser.add_argument('--end', type=date.fromisoformat, help="Last date (YYYY-MM-DD)")
+    parser.add_argument('--user-id', type=int, help="Only this owner's entries")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    fmt = args.format
+    if fmt is None:
+        extension = os.path.splitext(args.output)[1].lstrip('.').lower()
+        fmt = {'ndjson': 'jsonl'}.get(extension, extension)
+        if fmt not in FORMATS:
+            fmt = 'csv'
+    if fmt not in available_formats():
+        parser.error(f"{fmt} export needs pyarrow (pip install pyarrow)")
+
+    started = time.perf_counter()
+    f = sys.stdout.buffer if args.output == '-' else open(args.output, 'wb')
+    try:
+        rows = write_export(f, fmt, args.start, args.end, args.user_id, args.batch_size)
+    finally:
+        if args.output == '-':
+            f.flush()
+        else:
+            f.close()
+
+    print(f"Exported {rows} entries as {fmt} in {time.perf_counter() - started:.1f}s",
+          file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,22 @@
 import streamlit as st
-import pandas as pd
+from datetime import date, timedelta
+import profiling
 from database import init_db
-from models import ShippingEntry, User
+from notify_listener import start_listener
+from models import User
+from async_db import load_page_data, PAGE_DATA
+from entry_frame import get_entry_frame, peek_entry_frame
 from components.forms import render_entry_form
 from components.charts import (create_shipping_timeline,
                                create_category_distribution,
-                               create_shipping_frequency)
-from components.analytics import calculate_metrics, render_project_details
-from components.achievements import check_achievements, render_achievements
+                               create_shipping_frequency,
+                               cached_figure, has_cached_figure)
+from components.analytics import calculate_metrics, render_project_details, render_analytics
+from components.search import render_project_search
+from components.achievements import render_achievements
 from components.idea_generator import render_idea_generator
-from utils import get_date_range, calculate_streak
-
+from components.debug_panel import render_debug_panel
+from components.export_panel import render_export_panel
 
 def initialize_session_state():
     if 'authenticated' not in st.session_state:
@@ -46,8 +52,15 @@ def main():
                        page_icon="🚢",
                        layout="wide")
 
-    # Initialize database
-    init_db()
+    # Time every section of this rerun (shown to admins, appended to the metrics file)
+    profile = profiling.start(st.session_state.get('current_page', "Dashboard"))
+
+    with profiling.section("init"):
+        # Initialize database
+        init_db()
+
+        # Invalidate this process's caches when other processes write
+        start_listener()
 
     # Initialize session state
     initialize_session_state()
@@ -121,7 +134,7 @@ def main():
         with cols[idx]:
             if st.button(icon_label,
                          key=f"nav_{page_name}",
-                         use_container_width=True,
+                         width="stretch",
                          type="primary" if st.session_state.current_page
                          == page_name else "secondary"):
                 st.session_state.current_page = page_name
@@ -129,74 +142,104 @@ def main():
 
     st.markdown("---")  # Divider between navigation and content
 
-    # Get all entries
-    entries = ShippingEntry.get_all_entries()
-
-    # Check achievements if authenticated
-    if st.session_state.authenticated:
-        check_achievements(entries)
+    page = st.session_state.current_page
+    user_id = st.session_state.user['id'] if st.session_state.authenticated else None
+    scope = User.entry_scope(st.session_state.user if st.session_state.authenticated else None)
+
+    # Entry frames still cached from an earlier rerun don't need their query
+    end = date.today()
+    start = end - timedelta(days=30)
+    frame_keys = {'timeline': ('between', start, end, scope), 'recent': ('recent', 5, scope),
+                  'entries': ('all', scope)}
+    needs = PAGE_DATA.get(page, [])
+    cached_frames = {name: peek_entry_frame(key) for name, key in frame_keys.items()
+                     if name in needs}
+    skip = {name for name, frame in cached_frames.items() if frame}
+
+    # Neither do the inputs of charts whose figure is cached
+    chart_data = {'timeline': ('timeline', (start, end, scope)),
+                  'category_counts': ('categories', (scope,)),
+                  'daily_counts': ('frequency', (scope,))}
+    if page == "Dashboard":
+        skip |= {name for name, (kind, params) in chart_data.items()
+                 if has_cached_figure(kind, params)}
+
+    # Start every query the page declares at once; the page waits for the slowest
+    # one, and anything it reads that wasn't prefetched is fetched on first use
+    with profiling.section("data fetch"):
+        data = load_page_data(page, user_id, skip=skip, scope=scope)
+
+    def frame(name):
+        return cached_frames.get(name) or get_entry_frame(frame_keys[name], lambda: data[name])
 
     # Display content based on selected page
-    if st.session_state.current_page == "Add Entry":
+    if page == "Add Entry":
         if st.session_state.authenticated:
-            render_entry_form()
+            with profiling.section("entry form"):
+                render_entry_form()
         else:
             st.warning("Please login to add new entries.")
             login_form()
-    elif st.session_state.current_page == "Dashboard":
+    elif page == "Dashboard":
         # Display metrics
-        calculate_metrics(entries)
+        with profiling.section("metrics"):
+            calculate_metrics(data['summary'])
 
         # Display current streak
-        streak = calculate_streak(entries)
-        st.info(f"🔥 Current Shipping Streak: {streak} days")
+        streak = data['streak']
+        st.info(f"🔥 Current Shipping Streak: {streak['current_streak']} days "
+                f"(longest: {streak['longest_streak']})")
 
         # Create two columns for charts
         col1, col2 = st.columns(2)
 
-        with col1:
+        with col1, profiling.section("chart: timeline"):
             # Timeline chart
-            st.plotly_chart(create_shipping_timeline(
-                get_date_range(entries, 30)),
-                            use_container_width=True)
+            st.plotly_chart(cached_figure(
+                'timeline', (start, end, scope),
+                lambda: create_shipping_timeline(frame('timeline'))),
+                            width="stretch")
 
-        with col2:
+        with col2, profiling.section("chart: categories"):
             # Category distribution
-            st.plotly_chart(create_category_distribution(entries),
-                            use_container_width=True)
+            st.plotly_chart(cached_figure(
+                'categories', (scope,),
+                lambda: create_category_distribution(data['category_counts'])),
+                            width="stretch")
 
         # Shipping frequency
-        st.plotly_chart(create_shipping_frequency(entries),
-                        use_container_width=True)
-
-        # Project details
-        render_project_details(entries)
-
-    elif st.session_state.current_page == "Achievements":
-        render_achievements()
-
-    elif st.session_state.current_page == "Idea Generator":
-        render_idea_generator()
+        with profiling.section("chart: frequency"):
+            st.plotly_chart(cached_figure(
+                'frequency', (scope,),
+                lambda: create_shipping_frequency(data['daily_counts'])),
+                            width="stretch")
+
+        # Project search, then the most recent projects
+        with profiling.section("search"):
+            render_project_search(scope)
+        with profiling.section("recent projects"):
+            render_project_details(frame('recent'))
+
+    elif page == "Achievements":
+        with profiling.section("achievements"):
+            render_achievements(user_id, data['achievements'])
+
+    elif page == "Idea Generator":
+        with profiling.section("idea generator"):
+            render_idea_generator(frame('entries'))
 
     else:  # Analytics
-        st.subheader("Shipping Analytics")
-
-        # Additional analytics and insights
-        df = pd.DataFrame(entries)
-
-        # Most productive day
-        if not df.empty:
-            df['date'] = pd.to_datetime(df['date'])
-            df['day_of_week'] = df['date'].dt.day_name()
-            productive_day = df['day_of_week'].mode().iloc[0]
-            st.info(f"Most productive day: {productive_day}")
-
-        # Category breakdown
-        st.subheader("Category Breakdown")
-        if not df.empty:
-            category_stats = df['category'].value_counts()
-            st.bar_chart(category_stats)
+        with profiling.section("analytics"):
+            render_analytics(data['weekday_counts'], data['category_counts'],
+                             data['daily_counts'], data['monthly_counts'], data['durations'])
+        # Exports carry every entry's owner, so guests don't get one
+        if st.session_state.authenticated:
+            with profiling.section("export"):
+                render_export_panel(scope)
 
+    profiling.finish(profile)
+    if st.session_state.authenticated and st.session_state.user['role'] == 'admin':
+        render_debug_panel(profile)
 
 if __name__ == "__main__":
     main()
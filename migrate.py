@@ -0,0 +1,142 @@
+"""Versioned schema migrations
+
+Migrations live in ``migrations/`` as ``NNNN_description.sql`` or
+``NNNN_description.py`` (exposing ``upgrade(cur)``) and are applied in
+version order, each in its own transaction, recording the version in
+``schema_version``.
+
+Usage:
+    python migrate.py            # apply pending migrations
+    python migrate.py status     # show applied and pending migrations
+"""
+import os
+import re
+import sys
+import threading
+import importlib.util
+import psycopg2
+from database import get_connection
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+MIGRATION_FILE = re.compile(r'^(\d{4})_(\w+)\.(sql|py)$')
+
+# Arbitrary constant so concurrent workers serialize on the same advisory lock
+MIGRATION_LOCK_ID = 0x5348_4950
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+def discover_migrations():
+    """Return (version, name, path) for every migration file, sorted by version"""
+    migrations = []
+    for filename in os.listdir(MIGRATIONS_DIR):
+        match = MIGRATION_FILE.match(filename)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2),
+                               os.path.join(MIGRATIONS_DIR, filename)))
+    migrations.sort()
+
+    versions = [version for version, _, _ in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError("Duplicate migration version numbers in migrations/")
+    return migrations
+
+def latest_version():
+    migrations = discover_migrations()
+    return migrations[-1][0] if migrations else 0
+
+def current_version():
+    """Return the highest applied migration version, or 0 on a fresh database"""
+    with get_connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+            return cur.fetchone()[0]
+        except psycopg2.errors.UndefinedTable:
+            return 0
+        finally:
+            cur.close()
+
+def _run_migration(cur, path):
+    if path.endswith('.sql'):
+        with open(path, encoding='utf-8') as f:
+            cur.execute(f.read())
+        return
+
+    spec = importlib.util.spec_from_file_location(
+        f"migrations.{os.path.basename(path)[:-3]}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.upgrade(cur)
+
+def apply_migrations(target=None):
+    """Apply pending migrations up to ``target`` and return the versions applied"""
+    applied = []
+    for version, name, path in discover_migrations():
+        if target is not None and version > target:
+            break
+        with get_connection() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK_ID,))
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER PRIMARY KEY,
+                    name VARCHAR(255) NOT NULL,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            cur.execute("SELECT 1 FROM schema_version WHERE version = %s", (version,))
+            if cur.fetchone() is None:
+                _run_migration(cur, path)
+                cur.execute("""
+                    INSERT INTO schema_version (version, name) VALUES (%s, %s)
+                """, (version, name))
+                applied.append(version)
+            cur.close()
+    return applied
+
+def ensure_schema():
+    """Make sure the schema is current, checking at most once per process
+
+    The hot path is a single cached flag; the database is only queried on
+    the first call in each process.
+    """
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if _schema_ready:
+            return
+        if current_version() < latest_version():
+            apply_migrations()
+        _schema_ready = True
+
+def status():
+    with get_connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute("SELECT version, applied_at FROM schema_version")
+            applied = dict(cur.fetchall())
+        except psycopg2.errors.UndefinedTable:
+            applied = {}
+        finally:
+            cur.close()
+
+    for version, name, _ in discover_migrations():
+        applied_at = applied.get(version)
+        state = f"applied {applied_at:%Y-%m-%d %H:%M}" if applied_at else "pending"
+        print(f"{version:04d} {name:<40} {state}")
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else 'up'
+    if command == 'status':
+        status()
+    elif command == 'up':
+        applied = apply_migrations()
+        if applied:
+            print(f"Applied migrations: {', '.join(f'{v:04d}' for v in applied)}")
+        else:
+            print("Schema is up to date")
+    else:
+        print(__doc__)
+        sys.exit(1)
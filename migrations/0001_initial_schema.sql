@@ -0,0 +1,29 @@
+-- Baseline schema; IF NOT EXISTS keeps it safe on databases created before migrations existed
+CREATE TABLE IF NOT EXISTS shipping_entries (
+    id SERIAL PRIMARY KEY,
+    date DATE NOT NULL,
+    project_name VARCHAR(255) NOT NULL,
+    description TEXT,
+    category VARCHAR(100),
+    status VARCHAR(50),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    user_id INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS users (
+    id SERIAL PRIMARY KEY,
+    username VARCHAR(100) UNIQUE NOT NULL,
+    password_hash VARCHAR(255) NOT NULL,
+    role VARCHAR(20) NOT NULL DEFAULT 'guest',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS achievements (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    description TEXT,
+    badge_icon TEXT,
+    unlocked_at TIMESTAMP DEFAULT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    user_id INTEGER
+);
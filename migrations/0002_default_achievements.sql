@@ -0,0 +1,12 @@
+INSERT INTO achievements (name, description, badge_icon)
+SELECT v.name, v.description, v.badge_icon
+FROM (VALUES
+    ('Starter Ship', 'Ship your first project', '🌟'),
+    ('Weekly Warrior', 'Complete 7 days shipping streak', '🔥'),
+    ('Monthly Master', 'Complete 30 days shipping streak', '👑'),
+    ('Category Collector', 'Ship projects in all categories', '🎯'),
+    ('Speed Demon', 'Ship 3 projects in a single day', '⚡')
+) AS v(name, description, badge_icon)
+WHERE NOT EXISTS (
+    SELECT 1 FROM achievements a WHERE a.name = v.name
+);
@@ -0,0 +1,14 @@
+import os
+from werkzeug.security import generate_password_hash
+
+def upgrade(cur):
+    """Create the default admin user; the password hash is computed once, here"""
+    cur.execute("SELECT 1 FROM users WHERE username = 'admin'")
+    if cur.fetchone():
+        return
+
+    admin_password = os.environ.get('ADMIN_PASSWORD', 'admin123')  # Default password if not set
+    cur.execute("""
+        INSERT INTO users (username, password_hash, role)
+        VALUES ('admin', %s, 'admin')
+    """, (generate_password_hash(admin_password),))
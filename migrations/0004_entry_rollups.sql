@@ -0,0 +1,112 @@
+-- Aggregate tables kept current by triggers on shipping_entries, so dashboards
+-- read a few hundred rollup rows instead of scanning the full history.
+-- NULL category/status are stored as '' because they form the primary key.
+CREATE TABLE IF NOT EXISTS entry_daily_counts (
+    date DATE PRIMARY KEY,
+    count INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS entry_category_counts (
+    category VARCHAR(100) PRIMARY KEY,
+    count INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS entry_status_counts (
+    status VARCHAR(50) PRIMARY KEY,
+    count INTEGER NOT NULL
+);
+
+-- weekday follows EXTRACT(DOW): 0 = Sunday ... 6 = Saturday
+CREATE TABLE IF NOT EXISTS entry_weekday_counts (
+    weekday SMALLINT PRIMARY KEY,
+    count INTEGER NOT NULL
+);
+
+CREATE OR REPLACE FUNCTION adjust_entry_rollups(
+    entry_date DATE, entry_category TEXT, entry_status TEXT, delta INTEGER
+) RETURNS void AS $$
+BEGIN
+    INSERT INTO entry_daily_counts AS t (date, count) VALUES (entry_date, delta)
+    ON CONFLICT (date) DO UPDATE SET count = t.count + EXCLUDED.count;
+
+    INSERT INTO entry_category_counts AS t (category, count)
+    VALUES (COALESCE(entry_category, ''), delta)
+    ON CONFLICT (category) DO UPDATE SET count = t.count + EXCLUDED.count;
+
+    INSERT INTO entry_status_counts AS t (status, count)
+    VALUES (COALESCE(entry_status, ''), delta)
+    ON CONFLICT (status) DO UPDATE SET count = t.count + EXCLUDED.count;
+
+    INSERT INTO entry_weekday_counts AS t (weekday, count)
+    VALUES (EXTRACT(DOW FROM entry_date), delta)
+    ON CONFLICT (weekday) DO UPDATE SET count = t.count + EXCLUDED.count;
+
+    IF delta < 0 THEN
+        DELETE FROM entry_daily_counts WHERE date = entry_date AND count <= 0;
+        DELETE FROM entry_category_counts WHERE category = COALESCE(entry_category, '') AND count <= 0;
+        DELETE FROM entry_status_counts WHERE status = COALESCE(entry_status, '') AND count <= 0;
+        DELETE FROM entry_weekday_counts WHERE weekday = EXTRACT(DOW FROM entry_date) AND count <= 0;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION shipping_entries_rollup_trigger() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND OLD.date IS NOT DISTINCT FROM NEW.date
+       AND OLD.category IS NOT DISTINCT FROM NEW.category
+       AND OLD.status IS NOT DISTINCT FROM NEW.status THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM adjust_entry_rollups(OLD.date, OLD.category, OLD.status, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM adjust_entry_rollups(NEW.date, NEW.category, NEW.status, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION rebuild_entry_rollups() RETURNS void AS $$
+BEGIN
+    TRUNCATE entry_daily_counts, entry_category_counts,
+             entry_status_counts, entry_weekday_counts;
+
+    INSERT INTO entry_daily_counts (date, count)
+    SELECT date, COUNT(*) FROM shipping_entries GROUP BY date;
+
+    INSERT INTO entry_category_counts (category, count)
+    SELECT COALESCE(category, ''), COUNT(*) FROM shipping_entries
+    GROUP BY COALESCE(category, '');
+
+    INSERT INTO entry_status_counts (status, count)
+    SELECT COALESCE(status, ''), COUNT(*) FROM shipping_entries
+    GROUP BY COALESCE(status, '');
+
+    INSERT INTO entry_weekday_counts (weekday, count)
+    SELECT EXTRACT(DOW FROM date), COUNT(*) FROM shipping_entries
+    GROUP BY EXTRACT(DOW FROM date);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION shipping_entries_truncate_rollup_trigger() RETURNS trigger AS $$
+BEGIN
+    TRUNCATE entry_daily_counts, entry_category_counts,
+             entry_status_counts, entry_weekday_counts;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS shipping_entries_rollup ON shipping_entries;
+CREATE TRIGGER shipping_entries_rollup
+    AFTER INSERT OR UPDATE OR DELETE ON shipping_entries
+    FOR EACH ROW EXECUTE FUNCTION shipping_entries_rollup_trigger();
+
+DROP TRIGGER IF EXISTS shipping_entries_truncate_rollup ON shipping_entries;
+CREATE TRIGGER shipping_entries_truncate_rollup
+    AFTER TRUNCATE ON shipping_entries
+    FOR EACH STATEMENT EXECUTE FUNCTION shipping_entries_truncate_rollup_trigger();
+
+SELECT rebuild_entry_rollups();
@@ -0,0 +1,36 @@
+def upgrade(cur):
+    """Add the incrementally maintained streaks table and backfill it"""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS streaks (
+            user_id INTEGER PRIMARY KEY,
+            current_streak INTEGER NOT NULL,
+            longest_streak INTEGER NOT NULL,
+            last_ship_date DATE NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Self-contained rather than Streak.rebuild(), so replaying this migration
+    # never runs today's models against this version's schema. Runs of
+    # consecutive days share date - row_number(); scope 0 covers every entry.
+    cur.execute("""
+        WITH days AS (
+            SELECT 0 AS user_id, date FROM shipping_entries
+            UNION
+            SELECT user_id, date FROM shipping_entries WHERE user_id IS NOT NULL
+        ), runs AS (
+            SELECT user_id, date,
+                   date - (ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY date))::integer AS run
+            FROM days
+        ), lengths AS (
+            SELECT user_id, COUNT(*) AS length, MAX(date) AS run_end
+            FROM runs
+            GROUP BY user_id, run
+        )
+        INSERT INTO streaks (user_id, current_streak, longest_streak, last_ship_date)
+        SELECT DISTINCT ON (user_id)
+               user_id, length, MAX(length) OVER (PARTITION BY user_id), run_end
+        FROM lengths
+        ORDER BY user_id, run_end DESC
+        ON CONFLICT (user_id) DO NOTHING
+    """)
@@ -0,0 +1,34 @@
+-- Per-user achievements. user_id 0 is the all-entries scope shared with
+-- streaks, which is what the old global unlocks described.
+CREATE TABLE IF NOT EXISTS user_achievements (
+    user_id INTEGER NOT NULL,
+    achievement_id INTEGER NOT NULL REFERENCES achievements(id) ON DELETE CASCADE,
+    unlocked_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, achievement_id)
+);
+
+CREATE TABLE IF NOT EXISTS user_achievement_progress (
+    user_id INTEGER PRIMARY KEY,
+    ships INTEGER NOT NULL DEFAULT 0,
+    distinct_categories INTEGER NOT NULL DEFAULT 0,
+    max_daily_count INTEGER NOT NULL DEFAULT 0,
+    current_streak INTEGER NOT NULL DEFAULT 0,
+    longest_streak INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Lets add_entry tell whether a category is new for a user with one upsert
+CREATE TABLE IF NOT EXISTS user_categories (
+    user_id INTEGER NOT NULL,
+    category VARCHAR(100) NOT NULL,
+    PRIMARY KEY (user_id, category)
+);
+
+INSERT INTO user_achievements (user_id, achievement_id, unlocked_at)
+SELECT COALESCE(user_id, 0), id, unlocked_at
+FROM achievements
+WHERE unlocked_at IS NOT NULL
+ON CONFLICT DO NOTHING;
+
+ALTER TABLE achievements DROP COLUMN IF EXISTS unlocked_at;
+ALTER TABLE achievements DROP COLUMN IF EXISTS user_id;
@@ -0,0 +1,35 @@
+-- Seed per-user progress counters from existing entries. Kept as plain SQL
+-- (the full-rebuild case of achievement_rules.rebuild_progress as it stood),
+-- so replaying it never depends on today's application code. Scope 0 counts
+-- every entry; streaks come from migration 0005.
+INSERT INTO user_categories (user_id, category)
+SELECT DISTINCT user_id, category FROM shipping_entries
+WHERE user_id IS NOT NULL AND category IS NOT NULL
+UNION
+SELECT DISTINCT 0, category FROM shipping_entries
+WHERE category IS NOT NULL
+ON CONFLICT DO NOTHING;
+
+WITH scoped AS (
+    SELECT user_id AS scope, date, category FROM shipping_entries
+    WHERE user_id IS NOT NULL
+    UNION ALL
+    SELECT 0, date, category FROM shipping_entries
+),
+daily AS (
+    SELECT scope, COUNT(*) AS day_count FROM scoped GROUP BY scope, date
+)
+INSERT INTO user_achievement_progress
+    (user_id, ships, distinct_categories, max_daily_count,
+     current_streak, longest_streak)
+SELECT t.scope, t.ships, t.categories, d.max_daily_count,
+       COALESCE(s.current_streak, 0), COALESCE(s.longest_streak, 0)
+FROM (
+    SELECT scope, COUNT(*) AS ships, COUNT(DISTINCT category) AS categories
+    FROM scoped GROUP BY scope
+) AS t
+JOIN (
+    SELECT scope, MAX(day_count) AS max_daily_count FROM daily GROUP BY scope
+) AS d USING (scope)
+LEFT JOIN streaks s ON s.user_id = t.scope
+ON CONFLICT (user_id) DO NOTHING;
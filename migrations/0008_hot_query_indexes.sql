@@ -0,0 +1,27 @@
+-- Dashboard reads order by (date, id) and filter on date ranges or keyset cursors
+CREATE INDEX IF NOT EXISTS shipping_entries_date_id_idx
+    ON shipping_entries (date DESC, id DESC);
+
+-- Per-user reads: streak recomputes, per-day counts, scoped listings
+CREATE INDEX IF NOT EXISTS shipping_entries_user_date_idx
+    ON shipping_entries (user_id, date);
+
+-- Unlocks look achievements up by name; drop any duplicates left by the old
+-- unsynchronized init_achievements() before making the name unique. Unlocks
+-- of a duplicate move to the surviving (lowest) id first, since deleting it
+-- cascades to user_achievements.
+INSERT INTO user_achievements (user_id, achievement_id, unlocked_at)
+SELECT ua.user_id, keep.id, MIN(ua.unlocked_at)
+FROM user_achievements ua
+JOIN achievements a ON a.id = ua.achievement_id
+JOIN (SELECT name, MIN(id) AS id FROM achievements GROUP BY name) AS keep
+    ON keep.name = a.name
+WHERE a.id <> keep.id
+GROUP BY ua.user_id, keep.id
+ON CONFLICT DO NOTHING;
+
+DELETE FROM achievements a
+USING achievements b
+WHERE a.name = b.name AND a.id > b.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS achievements_name_key ON achievements (name);
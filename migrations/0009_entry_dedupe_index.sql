@@ -0,0 +1,3 @@
+-- Bulk imports skip rows whose (date, project_name) already exists
+CREATE INDEX IF NOT EXISTS shipping_entries_date_project_idx
+    ON shipping_entries (date, project_name);
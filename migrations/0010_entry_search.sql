@@ -0,0 +1,11 @@
+-- Full-text search over project names (weighted higher) and descriptions.
+-- A stored generated column keeps the vector in step with every write path,
+-- including COPY imports, without a trigger.
+ALTER TABLE shipping_entries
+    ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', COALESCE(project_name, '')), 'A') ||
+        setweight(to_tsvector('english', COALESCE(description, '')), 'B')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS shipping_entries_search_idx
+    ON shipping_entries USING GIN (search_vector);
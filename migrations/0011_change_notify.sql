@@ -0,0 +1,82 @@
+-- Cross-process cache invalidation: every committed write to entries or
+-- achievements sends one NOTIFY on 'data_changes' per statement, which the
+-- listener thread in each app process (notify_listener.py) turns into cache
+-- evictions. NOTIFY is transactional, so rolled-back writes send nothing.
+--
+-- Payload: {"table", "origin" (the writer's application_name), "dates"}
+-- where dates lists the distinct entry dates touched, or is null when the
+-- change is too broad to describe (TRUNCATE, or more than 200 dates).
+CREATE OR REPLACE FUNCTION notify_entry_changes() RETURNS trigger AS $$
+DECLARE
+    dates DATE[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(DISTINCT date) INTO dates FROM new_rows;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(DISTINCT date) INTO dates FROM old_rows;
+    ELSIF TG_OP = 'UPDATE' THEN
+        SELECT array_agg(date) INTO dates
+        FROM (SELECT date FROM old_rows UNION SELECT date FROM new_rows) AS touched;
+    END IF;
+
+    IF TG_OP <> 'TRUNCATE' THEN
+        IF dates IS NULL THEN
+            RETURN NULL;  -- the statement matched no rows
+        ELSIF cardinality(dates) > 200 THEN
+            dates := NULL;
+        END IF;
+    END IF;
+
+    PERFORM pg_notify('data_changes', json_build_object(
+        'table', TG_TABLE_NAME,
+        'origin', current_setting('application_name'),
+        'dates', dates
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION notify_table_changes() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('data_changes', json_build_object(
+        'table', TG_TABLE_NAME,
+        'origin', current_setting('application_name'),
+        'dates', NULL
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables are only allowed on single-event triggers
+DROP TRIGGER IF EXISTS shipping_entries_notify_insert ON shipping_entries;
+CREATE TRIGGER shipping_entries_notify_insert
+    AFTER INSERT ON shipping_entries
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_entry_changes();
+
+DROP TRIGGER IF EXISTS shipping_entries_notify_update ON shipping_entries;
+CREATE TRIGGER shipping_entries_notify_update
+    AFTER UPDATE ON shipping_entries
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_entry_changes();
+
+DROP TRIGGER IF EXISTS shipping_entries_notify_delete ON shipping_entries;
+CREATE TRIGGER shipping_entries_notify_delete
+    AFTER DELETE ON shipping_entries
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_entry_changes();
+
+DROP TRIGGER IF EXISTS shipping_entries_notify_truncate ON shipping_entries;
+CREATE TRIGGER shipping_entries_notify_truncate
+    AFTER TRUNCATE ON shipping_entries
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_entry_changes();
+
+DROP TRIGGER IF EXISTS achievements_notify ON achievements;
+CREATE TRIGGER achievements_notify
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON achievements
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_table_changes();
+
+DROP TRIGGER IF EXISTS user_achievements_notify ON user_achievements;
+CREATE TRIGGER user_achievements_notify
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON user_achievements
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_table_changes();
@@ -0,0 +1,110 @@
+"""Convert shipping_entries into a table range-partitioned by month on date"""
+
+# How many months past the current one get a partition up front; later
+# months are created on demand by ensure_entry_partition()
+MONTHS_AHEAD = 3
+
+def upgrade(cur):
+    cur.execute("""
+        CREATE OR REPLACE FUNCTION ensure_entry_partition(entry_date DATE) RETURNS BOOLEAN AS $$
+        DECLARE
+            month_start DATE := date_trunc('month', entry_date)::date;
+            partition_name TEXT := 'shipping_entries_' || to_char(entry_date, 'YYYY_MM');
+        BEGIN
+            IF EXISTS (
+                SELECT 1 FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = 'shipping_entries'::regclass AND c.relname = partition_name
+            ) THEN
+                RETURN FALSE;
+            END IF;
+
+            -- Serialize concurrent writers creating the same month
+            PERFORM pg_advisory_xact_lock(hashtext('shipping_entries_partitions'));
+            EXECUTE format(
+                'CREATE TABLE IF NOT EXISTS %I PARTITION OF shipping_entries FOR VALUES FROM (%L) TO (%L)',
+                partition_name, month_start, (month_start + INTERVAL '1 month')::date);
+            RETURN TRUE;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+    # Free the old table's names for the partitioned one
+    cur.execute("ALTER SEQUENCE shipping_entries_id_seq OWNED BY NONE")
+    cur.execute("ALTER TABLE shipping_entries RENAME TO shipping_entries_unpartitioned")
+    cur.execute("ALTER INDEX shipping_entries_pkey RENAME TO shipping_entries_unpartitioned_pkey")
+    for index in ('shipping_entries_date_id_idx', 'shipping_entries_user_date_idx',
+                  'shipping_entries_date_project_idx', 'shipping_entries_search_idx'):
+        cur.execute(f"DROP INDEX IF EXISTS {index}")
+
+    # The partition key must be part of the primary key
+    cur.execute("""
+        CREATE TABLE shipping_entries (
+            id INTEGER NOT NULL DEFAULT nextval('shipping_entries_id_seq'),
+            date DATE NOT NULL,
+            project_name VARCHAR(255) NOT NULL,
+            description TEXT,
+            category VARCHAR(100),
+            status VARCHAR(50),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            user_id INTEGER,
+            search_vector tsvector GENERATED ALWAYS AS (
+                setweight(to_tsvector('english', COALESCE(project_name, '')), 'A') ||
+                setweight(to_tsvector('english', COALESCE(description, '')), 'B')
+            ) STORED,
+            PRIMARY KEY (id, date)
+        ) PARTITION BY RANGE (date)
+    """)
+    cur.execute("ALTER SEQUENCE shipping_entries_id_seq OWNED BY shipping_entries.id")
+
+    cur.execute(f"""
+        SELECT ensure_entry_partition(month::date)
+        FROM generate_series(
+            date_trunc('month', LEAST(
+                (SELECT MIN(date) FROM shipping_entries_unpartitioned), CURRENT_DATE)),
+            date_trunc('month', GREATEST(
+                (SELECT MAX(date) FROM shipping_entries_unpartitioned),
+                CURRENT_DATE + INTERVAL '{MONTHS_AHEAD} months')),
+            INTERVAL '1 month'
+        ) AS month
+    """)
+
+    # Copy before the triggers exist: rollups, streaks and progress already match
+    cur.execute("""
+        INSERT INTO shipping_entries
+            (id, date, project_name, description, category, status, created_at, user_id)
+        SELECT id, date, project_name, description, category, status, created_at, user_id
+        FROM shipping_entries_unpartitioned
+    """)
+    cur.execute("DROP TABLE shipping_entries_unpartitioned")
+
+    # Indexes from migrations 0008-0010, now created on every partition
+    cur.execute("CREATE INDEX shipping_entries_date_id_idx ON shipping_entries (date DESC, id DESC)")
+    cur.execute("CREATE INDEX shipping_entries_user_date_idx ON shipping_entries (user_id, date)")
+    cur.execute("CREATE INDEX shipping_entries_date_project_idx ON shipping_entries (date, project_name)")
+    cur.execute("CREATE INDEX shipping_entries_search_idx ON shipping_entries USING GIN (search_vector)")
+
+    # Triggers from migrations 0004 and 0011
+    cur.execute("""
+        CREATE TRIGGER shipping_entries_rollup
+            AFTER INSERT OR UPDATE OR DELETE ON shipping_entries
+            FOR EACH ROW EXECUTE FUNCTION shipping_entries_rollup_trigger()
+    """)
+    cur.execute("""
+        CREATE TRIGGER shipping_entries_truncate_rollup
+            AFTER TRUNCATE ON shipping_entries
+            FOR EACH STATEMENT EXECUTE FUNCTION shipping_entries_truncate_rollup_trigger()
+    """)
+    for op, referencing in (('INSERT', 'NEW TABLE AS new_rows'),
+                            ('UPDATE', 'OLD TABLE AS old_rows NEW TABLE AS new_rows'),
+                            ('DELETE', 'OLD TABLE AS old_rows')):
+        cur.execute(f"""
+            CREATE TRIGGER shipping_entries_notify_{op.lower()}
+                AFTER {op} ON shipping_entries
+                REFERENCING {referencing}
+                FOR EACH STATEMENT EXECUTE FUNCTION notify_entry_changes()
+        """)
+    cur.execute("""
+        CREATE TRIGGER shipping_entries_notify_truncate
+            AFTER TRUNCATE ON shipping_entries
+            FOR EACH STATEMENT EXECUTE FUNCTION notify_entry_changes()
+    """)
@@ -0,0 +1,126 @@
+-- Inputs of the Analytics page's trend charts, kept current by triggers so
+-- the page reads rollup rows instead of the full history.
+--
+-- entry_monthly_counts extends the 0004 rollups with one row per
+-- (month, category, status); month is the first day of the month and NULL
+-- category/status are stored as ''.
+CREATE TABLE IF NOT EXISTS entry_monthly_counts (
+    month DATE NOT NULL,
+    category VARCHAR(100) NOT NULL,
+    status VARCHAR(50) NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (month, category, status)
+);
+
+-- entry_status_changes records every status an entry takes (from_status is
+-- NULL when it was created with it), so the time between two statuses can be
+-- measured. Rows are kept when an entry is deleted; readers join
+-- shipping_entries. A date change that moves an entry to another partition
+-- is a delete plus an insert, which records its current status again.
+CREATE TABLE IF NOT EXISTS entry_status_changes (
+    id SERIAL PRIMARY KEY,
+    entry_id INTEGER NOT NULL,
+    from_status VARCHAR(50),
+    to_status VARCHAR(50),
+    changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS entry_status_changes_status_idx
+    ON entry_status_changes (to_status, entry_id, changed_at);
+
+CREATE OR REPLACE FUNCTION adjust_entry_rollups(
+    entry_date DATE, entry_category TEXT, entry_status TEXT, delta INTEGER
+) RETURNS void AS $$
+BEGIN
+    INSERT INTO entry_daily_counts AS t (date, count) VALUES (entry_date, delta)
+    ON CONFLICT (date) DO UPDATE SET count = t.count + EXCLUDED.count;
+
+    INSERT INTO entry_category_counts AS t (category, count)
+    VALUES (COALESCE(entry_category, ''), delta)
+    ON CONFLICT (category) DO UPDATE SET count = t.count + EXCLUDED.count;
+
+    INSERT INTO entry_status_counts AS t (status, count)
+    VALUES (COALESCE(entry_status, ''), delta)
+    ON CONFLICT (status) DO UPDATE SET count = t.count + EXCLUDED.count;
+
+    INSERT INTO entry_weekday_counts AS t (weekday, count)
+    VALUES (EXTRACT(DOW FROM entry_date), delta)
+    ON CONFLICT (weekday) DO UPDATE SET count = t.count + EXCLUDED.count;
+
+    INSERT INTO entry_monthly_counts AS t (month, category, status, count)
+    VALUES (date_trunc('month', entry_date)::date, COALESCE(entry_category, ''),
+            COALESCE(entry_status, ''), delta)
+    ON CONFLICT (month, category, status) DO UPDATE SET count = t.count + EXCLUDED.count;
+
+    IF delta < 0 THEN
+        DELETE FROM entry_daily_counts WHERE date = entry_date AND count <= 0;
+        DELETE FROM entry_category_counts WHERE category = COALESCE(entry_category, '') AND count <= 0;
+        DELETE FROM entry_status_counts WHERE status = COALESCE(entry_status, '') AND count <= 0;
+        DELETE FROM entry_weekday_counts WHERE weekday = EXTRACT(DOW FROM entry_date) AND count <= 0;
+        DELETE FROM entry_monthly_counts
+        WHERE month = date_trunc('month', entry_date)::date
+          AND category = COALESCE(entry_category, '')
+          AND status = COALESCE(entry_status, '')
+          AND count <= 0;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION rebuild_entry_rollups() RETURNS void AS $$
+BEGIN
+    TRUNCATE entry_daily_counts, entry_category_counts,
+             entry_status_counts, entry_weekday_counts, entry_monthly_counts;
+
+    INSERT INTO entry_daily_counts (date, count)
+    SELECT date, COUNT(*) FROM shipping_entries GROUP BY date;
+
+    INSERT INTO entry_category_counts (category, count)
+    SELECT COALESCE(category, ''), COUNT(*) FROM shipping_entries
+    GROUP BY COALESCE(category, '');
+
+    INSERT INTO entry_status_counts (status, count)
+    SELECT COALESCE(status, ''), COUNT(*) FROM shipping_entries
+    GROUP BY COALESCE(status, '');
+
+    INSERT INTO entry_weekday_counts (weekday, count)
+    SELECT EXTRACT(DOW FROM date), COUNT(*) FROM shipping_entries
+    GROUP BY EXTRACT(DOW FROM date);
+
+    INSERT INTO entry_monthly_counts (month, category, status, count)
+    SELECT date_trunc('month', date)::date, COALESCE(category, ''), COALESCE(status, ''), COUNT(*)
+    FROM shipping_entries
+    GROUP BY 1, 2, 3;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION shipping_entries_truncate_rollup_trigger() RETURNS trigger AS $$
+BEGIN
+    TRUNCATE entry_daily_counts, entry_category_counts,
+             entry_status_counts, entry_weekday_counts, entry_monthly_counts,
+             entry_status_changes;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION record_entry_status_change() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO entry_status_changes (entry_id, to_status) VALUES (NEW.id, NEW.status);
+    ELSIF OLD.status IS DISTINCT FROM NEW.status THEN
+        INSERT INTO entry_status_changes (entry_id, from_status, to_status)
+        VALUES (NEW.id, OLD.status, NEW.status);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS shipping_entries_status_history ON shipping_entries;
+CREATE TRIGGER shipping_entries_status_history
+    AFTER INSERT OR UPDATE OF status ON shipping_entries
+    FOR EACH ROW EXECUTE FUNCTION record_entry_status_change();
+
+-- Existing entries start their history at creation with their current status
+INSERT INTO entry_status_changes (entry_id, to_status, changed_at)
+SELECT id, status, COALESCE(created_at, CURRENT_TIMESTAMP) FROM shipping_entries;
+
+SELECT rebuild_entry_rollups();
@@ -0,0 +1,27 @@
+-- Lets a transaction skip the per-row rollup trigger and apply the deltas
+-- itself in one set-based statement (bulk_import.py), without disabling the
+-- trigger and so without an ACCESS EXCLUSIVE lock on shipping_entries:
+--     SET LOCAL shipping.defer_rollups = 'on';
+-- Other sessions are unaffected; the setting ends with the transaction.
+CREATE OR REPLACE FUNCTION shipping_entries_rollup_trigger() RETURNS trigger AS $$
+BEGIN
+    IF current_setting('shipping.defer_rollups', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'UPDATE'
+       AND OLD.date IS NOT DISTINCT FROM NEW.date
+       AND OLD.category IS NOT DISTINCT FROM NEW.category
+       AND OLD.status IS NOT DISTINCT FROM NEW.status THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM adjust_entry_rollups(OLD.date, OLD.category, OLD.status, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM adjust_entry_rollups(NEW.date, NEW.category, NEW.status, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
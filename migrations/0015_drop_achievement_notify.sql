@@ -0,0 +1,6 @@
+-- No cache is built from achievements (pages read them fresh each rerun), so
+-- the NOTIFYs from 0011 for achievement tables only woke listeners that
+-- ignored them. Entry notifications are unchanged.
+DROP TRIGGER IF EXISTS achievements_notify ON achievements;
+DROP TRIGGER IF EXISTS user_achievements_notify ON user_achievements;
+DROP FUNCTION IF EXISTS notify_table_changes();
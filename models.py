@@ -1,171 +1,1170 @@
-from datetime import datetime
-from database import get_db_connection
+"""Database models, one class of static methods per table or derived table
+
+Methods named ``*_query`` return (sql, params) instead of running it, so
+async_db can issue the same statements from its event loop.
+"""
+import os
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+from database import (get_connection, get_analytics_connection, get_backend,
+                      dialect, analytics_dialect, execute_values)
+from cache import bump_data_version
+from events import emit, ENTRIES_CHANGED
+from utils import compute_streaks
+import achievement_rules
 from psycopg2.extras import RealDictCursor
 from werkzeug.security import generate_password_hash, check_password_hash
 
 class User:
     @staticmethod
-    def get_by_username(username):
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        cur.execute("""
+    def by_username_query(username):
+        return """
             SELECT * FROM users WHERE username = %s
-        """, (username,))
-        
-        user = cur.fetchone()
-        cur.close()
-        conn.close()
-        return user
-    
+        """, (username,)
+
+    @staticmethod
+    def get_by_username(username):
+        with get_connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+
+            cur.execute(*User.by_username_query(username))
+
+            user = cur.fetchone()
+            cur.close()
+            return user
+
     @staticmethod
     def authenticate(username, password):
         user = User.get_by_username(username)
         if user and check_password_hash(user['password_hash'], password):
             return user
         return None
-    
+
+    @staticmethod
+    def entry_scope(user):
+        """
+        Owner whose entries a visitor's pages show
+
+        Guests and admins see every entry (None); other signed-in users see
+        only their own.
+        """
+        if user is None or user['role'] == 'admin':
+            return None
+        return user['id']
+
     @staticmethod
     def create_user(username, password, role='guest'):
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        try:
-            cur.execute("""
-                INSERT INTO users (username, password_hash, role)
-                VALUES (%s, %s, %s)
-                RETURNING *
-            """, (username, generate_password_hash(password), role))
-            
-            user = cur.fetchone()
-            conn.commit()
-            return user
-        except Exception as e:
-            conn.rollback()
-            raise e
-        finally:
-            cur.close()
-            conn.close()
+        # Hash before checking out a connection so the KDF doesn't hold a pool slot
+        password_hash = generate_password_hash(password)
+
+        with get_connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+
+            try:
+                cur.execute("""
+                    INSERT INTO users (username, password_hash, role)
+                    VALUES (%s, %s, %s)
+                    RETURNING *
+                """, (username, password_hash, role))
+
+                return cur.fetchone()
+            finally:
+                cur.close()
 
 class ShippingEntry:
+    # Choices offered by the entry form; imports are validated against them
+    CATEGORIES = [
+        "Feature", "Bug Fix", "Enhancement",
+        "Documentation", "Refactoring", "Web Development", "GenAI", "Game"
+    ]
+    STATUSES = ["Completed", "In Progress", "Planned"]
+
+    # Columns bulk_update may change, with the SQL type their new values are cast to
+    UPDATABLE_COLUMNS = {
+        'date': 'date',
+        'project_name': 'varchar',
+        'description': 'text',
+        'category': 'varchar',
+        'status': 'varchar',
+        'user_id': 'integer',
+    }
+
+    # Row fields carried in ENTRIES_CHANGED events
+    EVENT_FIELDS = ['date', 'user_id', 'category', 'status']
+
+    COLUMNS = """
+        id, date::date as date, project_name, description,
+        category, status, created_at
+    """
+
+    # What exports write, in order; bulk_import.py reads the same names back
+    EXPORT_COLUMNS = ['id', 'date', 'project_name', 'description',
+                      'category', 'status', 'created_at', 'user_id']
+
+    # First days of months whose partition is known to exist (see migration 0012)
+    _partition_months = set()
+
+    @staticmethod
+    def _as_date(value):
+        """A date from a date, datetime or ISO string (None stays None)"""
+        if value is None or (isinstance(value, date) and not isinstance(value, datetime)):
+            return value
+        if isinstance(value, datetime):
+            return value.date()
+        return date.fromisoformat(str(value)[:10])
+
+    @staticmethod
+    def _event_row(values):
+        """EVENT_FIELDS values as an ENTRIES_CHANGED row, date normalized for subscribers"""
+        row = dict(zip(ShippingEntry.EVENT_FIELDS, values))
+        row['date'] = ShippingEntry._as_date(row['date'])
+        return row
+
+    @staticmethod
+    def ensure_partitions(cur, dates):
+        """Create the monthly partitions ``dates`` fall in, in the caller's transaction"""
+        if dialect() != 'postgres':
+            return  # only the Postgres table is partitioned
+        dates = [ShippingEntry._as_date(d) for d in dates if d is not None]
+        months = {date(d.year, d.month, 1) for d in dates}
+        missing = sorted(months - ShippingEntry._partition_months)
+        if not missing:
+            return
+        cur.execute("""
+            SELECT month, ensure_entry_partition(month)
+            FROM unnest(%s::date[]) AS month
+        """, (missing,))
+        for month, created in cur.fetchall():
+            # One created here only exists once this transaction commits
+            if not created:
+                ShippingEntry._partition_months.add(month)
+
     @staticmethod
     def add_entry(date, project_name, description, category, status, user_id=None):
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        try:
-            cur.execute("""
-                INSERT INTO shipping_entries (date, project_name, description, category, status, user_id)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                RETURNING id
-            """, (date, project_name, description, category, status, user_id))
-            
-            entry_id = cur.fetchone()[0]
-            conn.commit()
-            return entry_id
-        finally:
-            cur.close()
-            conn.close()
+        with get_connection() as conn:
+            cur = conn.cursor()
+
+            try:
+                ShippingEntry.ensure_partitions(cur, [date])
+                cur.execute("""
+                    INSERT INTO shipping_entries (date, project_name, description, category, status, user_id)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                    RETURNING id
+                """, (date, project_name, description, category, status, user_id))
+
+                entry_id = cur.fetchone()[0]
+                Streak.record_ship(cur, date, user_id)
+                achievement_rules.on_entry_added(
+                    cur, Streak.scopes_for(user_id), date, category)
+            finally:
+                cur.close()
+
+        emit(ENTRIES_CHANGED, changes=[{
+            'id': entry_id,
+            'columns': list(ShippingEntry.UPDATABLE_COLUMNS),
+            'before': None,
+            'after': ShippingEntry._event_row((date, user_id, category, status)),
+        }])
+        return entry_id
+
+    @staticmethod
+    def delete_entry(entry_id, entry_date=None):
+        """
+        Delete one entry; returns whether it existed
+
+        Pass the entry's ``entry_date`` when known: ids are only unique per
+        monthly partition, so without it Postgres probes every partition.
+        """
+        with get_connection() as conn:
+            cur = conn.cursor()
+
+            try:
+                date_filter = "" if entry_date is None else "AND date = %s"
+                cur.execute(f"""
+                    DELETE FROM shipping_entries WHERE id = %s {date_filter}
+                    RETURNING date, user_id, category, status
+                """, (entry_id,) if entry_date is None else (entry_id, entry_date))
+
+                deleted = cur.fetchone()
+                if deleted is not None:
+                    deleted = ShippingEntry._event_row(deleted)
+                    scopes = Streak.scopes_for(deleted['user_id'])
+                    Streak.recompute(cur, {scope: [deleted['date']] for scope in scopes})
+                    achievement_rules.on_entries_changed(cur, scopes, events=())
+            finally:
+                cur.close()
+
+        if deleted is not None:
+            emit(ENTRIES_CHANGED, changes=[{
+                'id': entry_id,
+                'columns': list(ShippingEntry.UPDATABLE_COLUMNS),
+                'before': deleted,
+                'after': None,
+            }])
+        return deleted is not None
+
+    @staticmethod
+    def bulk_update(changes):
+        """
+        Apply many entry updates in one statement
+
+        Args:
+            changes (iterable): (entry_id, {column: value}) pairs; columns must be
+                in UPDATABLE_COLUMNS. Later pairs for the same id win. A pair may
+                carry the entry's current date as a third item; when every
+                entry has one, Postgres only probes those entries' partitions.
+
+        Returns:
+            list: One outcome per distinct id, in input order, as a dict with
+                'id', 'status' ('updated', 'not_found' or 'invalid'), 'columns'
+                and, for invalid rows, 'error'
+        """
+        merged = {}
+        known_dates = {}
+        for entry_id, updates, *known in changes:
+            merged.setdefault(entry_id, {}).update(updates)
+            if known:
+                known_dates[entry_id] = known[0]
+
+        outcomes = {}
+        valid = {}
+        for entry_id, updates in merged.items():
+            unknown = sorted(set(updates) - set(ShippingEntry.UPDATABLE_COLUMNS))
+            if unknown:
+                outcomes[entry_id] = {'id': entry_id, 'status': 'invalid', 'columns': [],
+                                      'error': f"Unknown columns: {', '.join(unknown)}"}
+            elif not updates:
+                outcomes[entry_id] = {'id': entry_id, 'status': 'invalid', 'columns': [],
+                                      'error': "No columns to update"}
+            else:
+                valid[entry_id] = updates
+
+        if not valid:
+            return [outcomes[entry_id] for entry_id in merged]
+
+        # Only the touched columns travel in the VALUES list; a per-column flag
+        # distinguishes "set to NULL" from "leave alone" for rows that skip it
+        columns = [c for c in ShippingEntry.UPDATABLE_COLUMNS
+                   if any(c in updates for updates in valid.values())]
+        template = "(%s::integer, %s::date, " + ", ".join(
+            f"%s::boolean, %s::{ShippingEntry.UPDATABLE_COLUMNS[c]}" for c in columns) + ")"
+        rows = [
+            (entry_id, known_dates.get(entry_id),
+             *[value for c in columns for value in (c in updates, updates.get(c))])
+            for entry_id, updates in valid.items()
+        ]
+        value_names = "known_date, " + ", ".join(f"set_{c}, {c}" for c in columns)
+        match = "e.id = v.id"
+        if all(entry_id in known_dates for entry_id in valid):
+            match += " AND e.date = v.known_date"
+        assignments = ", ".join(
+            f"{c} = CASE WHEN v.set_{c} THEN v.{c} ELSE e.{c} END" for c in columns)
+        fields = ShippingEntry.EVENT_FIELDS
+
+        with get_connection() as conn:
+            cur = conn.cursor()
+
+            try:
+                if 'date' in columns:
+                    ShippingEntry.ensure_partitions(
+                        cur, [updates['date'] for updates in valid.values() if 'date' in updates])
+                if dialect() == 'sqlite':
+                    updated = ShippingEntry._bulk_update_sqlite(
+                        cur, rows, template, value_names, assignments)
+                else:
+                    updated = execute_values(cur, f"""
+                        WITH v (id, {value_names}) AS (VALUES %s),
+                        old AS (
+                            SELECT e.id, {', '.join('e.' + f for f in fields)}
+                            FROM shipping_entries e JOIN v ON {match}
+                        )
+                        UPDATE shipping_entries e
+                        SET {assignments}
+                        FROM v JOIN old ON old.id = v.id
+                        WHERE {match}
+                        RETURNING e.id, {', '.join('old.' + f for f in fields)},
+                                  {', '.join('e.' + f for f in fields)}
+                        """, rows, template=template, page_size=len(rows), fetch=True)
+
+                events = []
+                scopes = set()
+                streak_days = {}
+                for row in updated:
+                    before = ShippingEntry._event_row(row[1:1 + len(fields)])
+                    after = ShippingEntry._event_row(row[1 + len(fields):])
+                    events.append({'id': row[0], 'columns': sorted(valid[row[0]]),
+                                   'before': before, 'after': after})
+
+                    owners = (Streak.scopes_for(before['user_id'])
+                              + Streak.scopes_for(after['user_id']))
+                    scopes.update(owners)
+                    # Moving an entry to another day or owner can make or break streaks
+                    if before['date'] != after['date'] or before['user_id'] != after['user_id']:
+                        for state in (before, after):
+                            for scope in Streak.scopes_for(state['user_id']):
+                                streak_days.setdefault(scope, set()).add(state['date'])
+
+                if streak_days:
+                    Streak.recompute(cur, streak_days)
+                rule_events = achievement_rules.events_for_update(
+                    {c for change in events for c in change['columns']})
+                if rule_events:
+                    achievement_rules.on_entries_changed(cur, scopes, rule_events)
+            finally:
+                cur.close()
+
+        for change in events:
+            outcomes[change['id']] = {'id': change['id'], 'status': 'updated',
+                                      'columns': change['columns']}
+        for entry_id in valid:
+            outcomes.setdefault(entry_id, {'id': entry_id, 'status': 'not_found', 'columns': []})
+
+        if events:
+            emit(ENTRIES_CHANGED, changes=events)
+        return [outcomes[entry_id] for entry_id in merged]
+
+    @staticmethod
+    def _bulk_update_sqlite(cur, rows, template, value_names, assignments):
+        # SQLite's RETURNING only sees the updated row (not even by alias), so
+        # read the old values first
+        fields = ShippingEntry.EVENT_FIELDS
+        cur.execute(f"""
+            SELECT id, {', '.join(fields)} FROM shipping_entries WHERE id = ANY(%s)
+        """, ([row[0] for row in rows],))
+        old = {row[0]: row[1:] for row in cur.fetchall()}
+        updated = execute_values(cur, f"""
+            WITH v (id, {value_names}) AS (VALUES %s)
+            UPDATE shipping_entries AS e
+            SET {assignments}
+            FROM v
+            WHERE e.id = v.id
+            RETURNING id, {', '.join(fields)}
+        """, rows, template=template, page_size=len(rows), fetch=True)
+        return [(row[0], *old[row[0]], *row[1:]) for row in updated]
+
+    @staticmethod
+    def _owner_filter(user_id, prefix="AND"):
+        # Every read takes an owner; None reads all entries (see User.entry_scope)
+        if user_id is None:
+            return "", ()
+        return f"{prefix} user_id = %s", (user_id,)
+
+    @staticmethod
+    def all_entries_query(user_id=None):
+        owner, params = ShippingEntry._owner_filter(user_id, prefix="WHERE")
+        return f"""
+            SELECT {ShippingEntry.COLUMNS}
+            FROM shipping_entries
+            {owner}
+            ORDER BY date DESC
+        """, params
+
+    @staticmethod
+    def export_query(start=None, end=None, user_id=None):
+        conditions, params = [], []
+        if start is not None:
+            conditions.append("date >= %s")
+            params.append(start)
+        if end is not None:
+            conditions.append("date <= %s")
+            params.append(end)
+        if user_id is not None:
+            conditions.append("user_id = %s")
+            params.append(user_id)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return f"""
+            SELECT {', '.join(ShippingEntry.EXPORT_COLUMNS)}
+            FROM shipping_entries
+            {where}
+            ORDER BY date, id
+        """, tuple(params)
+
+    @staticmethod
+    def between_query(start, end, user_id=None):
+        # A literal date range lets the planner prune to the months it covers
+        owner, params = ShippingEntry._owner_filter(user_id)
+        return f"""
+            SELECT {ShippingEntry.COLUMNS}
+            FROM shipping_entries
+            WHERE date BETWEEN %s AND %s {owner}
+            ORDER BY date DESC, id DESC
+        """, (start, end, *params)
+
+    @staticmethod
+    def recent_query(limit=5, user_id=None):
+        # Partitions are scanned newest first, so the limit stops in the latest months
+        owner, params = ShippingEntry._owner_filter(user_id, prefix="WHERE")
+        return f"""
+            SELECT {ShippingEntry.COLUMNS}
+            FROM shipping_entries
+            {owner}
+            ORDER BY date DESC, id DESC
+            LIMIT %s
+        """, (*params, limit)
+
+    @staticmethod
+    def page_query(limit=50, cursor=None, user_id=None):
+        # Fetch one extra row: it tells us whether another page exists without a COUNT(*)
+        if cursor is None:
+            owner, params = ShippingEntry._owner_filter(user_id, prefix="WHERE")
+            return f"""
+                SELECT {ShippingEntry.COLUMNS}
+                FROM shipping_entries
+                {owner}
+                ORDER BY date DESC, id DESC
+                LIMIT %s
+            """, (*params, limit + 1)
+        # The redundant date bound lets the planner prune newer partitions
+        owner, params = ShippingEntry._owner_filter(user_id)
+        return f"""
+            SELECT {ShippingEntry.COLUMNS}
+            FROM shipping_entries
+            WHERE (date, id) < (%s, %s) AND date <= %s {owner}
+            ORDER BY date DESC, id DESC
+            LIMIT %s
+        """, (*cursor, cursor[0], *params, limit + 1)
+
+    @staticmethod
+    def search_query(query, limit=20, cursor=None, user_id=None):
+        # Ranked keyset pagination: the cursor is the last row's (rank, date, id)
+        owner, params = ShippingEntry._owner_filter(user_id)
+        after = "WHERE (rank, date, id) < (%s, %s, %s)" if cursor else ""
+        if dialect() == 'sqlite':
+            return ShippingEntry._search_query_fts(query, limit, cursor, owner, params, after)
+        return f"""
+            SELECT * FROM (
+                SELECT {ShippingEntry.COLUMNS},
+                       ts_rank(search_vector, q)::float8 AS rank
+                FROM shipping_entries, websearch_to_tsquery('english', %s) AS q
+                WHERE search_vector @@ q {owner}
+            ) AS matches
+            {after}
+            ORDER BY rank DESC, date DESC, id DESC
+            LIMIT %s
+        """, (query, *params, *(cursor or ()), limit + 1)
+
+    @staticmethod
+    def _search_query_fts(query, limit, cursor, owner, params, after):
+        # SQLite: FTS5 with bm25 (lower is better, so negated), project names weighted 2:1
+        from embedded_db import fts_query
+        match = fts_query(query)
+        if match is None:
+            return "SELECT * FROM shipping_entries WHERE 0", ()
+        return f"""
+            SELECT * FROM (
+                SELECT {ShippingEntry.COLUMNS}, m.rank
+                FROM shipping_entries
+                JOIN (
+                    SELECT rowid AS match_id, -bm25(shipping_entries_fts, 2.0, 1.0) AS rank
+                    FROM shipping_entries_fts WHERE shipping_entries_fts MATCH %s
+                ) AS m ON m.match_id = shipping_entries.id
+                WHERE TRUE {owner}
+            ) AS matches
+            {after}
+            ORDER BY rank DESC, date DESC, id DESC
+            LIMIT %s
+        """, (match, *params, *(cursor or ()), limit + 1)
+
+    @staticmethod
+    def page_result(entries, limit, keys=('date', 'id')):
+        """Split page_query (or search_query) rows into (entries, next_cursor)"""
+        if len(entries) > limit:
+            entries = entries[:limit]
+            last = entries[-1]
+            return entries, tuple(last[key] for key in keys)
+        return entries, None
 
     @staticmethod
     def get_all_entries(user_id=None):
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        try:
-            # Get all public entries and user-specific entries if authenticated
-            cur.execute("""
-                SELECT id, date::date as date, project_name, description, 
-                       category, status, created_at 
+        """Every entry owned by ``user_id`` (all entries when None), newest first"""
+        with get_connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+
+            try:
+                cur.execute(*ShippingEntry.all_entries_query(user_id))
+
+                return cur.fetchall()
+            finally:
+                cur.close()
+
+    @staticmethod
+    def iter_export(start=None, end=None, user_id=None, batch_size=5000):
+        """
+        Stream entries oldest first, in lists of up to ``batch_size`` tuples
+
+        On Postgres the rows come through a named (server-side) cursor, so
+        only one batch is held in memory however many rows match; SQLite
+        steps through its result the same way.
+
+        Args:
+            start (date): First date to include, None for no lower bound
+            end (date): Last date to include, None for no upper bound
+            user_id (int): Owner to export, None for all entries
+            batch_size (int): Rows fetched per round trip
+
+        Yields:
+            list: Tuples in EXPORT_COLUMNS order
+        """
+        with get_connection() as conn:
+            cur = conn.cursor(name='shipping_entries_export')
+
+            try:
+                cur.execute(*ShippingEntry.export_query(start, end, user_id))
+                while True:
+                    rows = cur.fetchmany(batch_size)
+                    if not rows:
+                        return
+                    yield rows
+            finally:
+                cur.close()
+
+    @staticmethod
+    def get_entries_between(start, end, user_id=None):
+        """Entries dated from start to end inclusive, newest first"""
+        with get_connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+
+            try:
+                cur.execute(*ShippingEntry.between_query(start, end, user_id))
+
+                return cur.fetchall()
+            finally:
+                cur.close()
+
+    @staticmethod
+    def get_recent(limit=5, user_id=None):
+        with get_connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+
+            try:
+                cur.execute(*ShippingEntry.recent_query(limit, user_id))
+
+                return cur.fetchall()
+            finally:
+                cur.close()
+
+    @staticmethod
+    def get_page(limit=50, cursor=None, user_id=None):
+        """
+        Keyset pagination over entries ordered by (date, id) descending
+
+        Args:
+            limit (int): Maximum number of entries to return
+            cursor (tuple): (date, id) of the last entry on the previous page,
+                or None for the first page
+            user_id (int): Only this owner's entries, or None for all
+
+        Returns:
+            tuple: (entries, next_cursor) where next_cursor is None on the last page
+        """
+        with get_connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+
+            try:
+                cur.execute(*ShippingEntry.page_query(limit, cursor, user_id))
+                entries = cur.fetchall()
+            finally:
+                cur.close()
+
+        return ShippingEntry.page_result(entries, limit)
+
+    @staticmethod
+    def search(query, limit=20, cursor=None, user_id=None):
+        """
+        Full-text search over project names and descriptions, best matches first
+
+        Args:
+            query (str): Web-search style query ("quoted phrases", or, -exclude)
+            limit (int): Maximum number of entries to return
+            cursor (tuple): next_cursor from the previous page, or None
+            user_id (int): Only this owner's entries, or None for all
+
+        Returns:
+            tuple: (entries, next_cursor) where next_cursor is None on the last page
+        """
+        with get_connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+
+            try:
+                cur.execute(*ShippingEntry.search_query(query, limit, cursor, user_id))
+                entries = cur.fetchall()
+            finally:
+                cur.close()
+
+        return ShippingEntry.page_result(entries, limit, keys=('rank', 'date', 'id'))
+
+class EntryRollup:
+    """
+    Dashboard aggregates maintained by triggers on shipping_entries (see migration 0004)
+
+    The rollups count every entry; passing a user_id aggregates that owner's
+    entries directly instead. Reads go through get_analytics_connection, so
+    the SQL must also run on DuckDB and SQLite (see analytics_dialect).
+    """
+
+    @staticmethod
+    def summary_query(since, user_id=None):
+        if user_id is not None:
+            # Rollups cover everyone; one owner's rows come straight off (user_id, date)
+            return """
+                SELECT COUNT(*) AS total,
+                       COUNT(*) FILTER (WHERE status = 'Completed') AS completed,
+                       COUNT(*) FILTER (WHERE date > %s) AS since
+                FROM shipping_entries WHERE user_id = %s
+            """, (since, user_id)
+        return """
+            SELECT
+                (SELECT COALESCE(SUM(count), 0) FROM entry_status_counts) AS total,
+                (SELECT COALESCE(SUM(count), 0) FROM entry_status_counts
+                 WHERE status = 'Completed') AS completed,
+                (SELECT COALESCE(SUM(count), 0) FROM entry_daily_counts
+                 WHERE date > %s) AS since
+        """, (since,)
+
+    @staticmethod
+    def daily_counts_query(user_id=None):
+        if user_id is not None:
+            return """
+                SELECT date, COUNT(*) AS count FROM shipping_entries
+                WHERE user_id = %s
+                GROUP BY date
+                ORDER BY date
+            """, (user_id,)
+        return """
+            SELECT date, count FROM entry_daily_counts
+            WHERE count > 0
+            ORDER BY date
+        """, ()
+
+    @staticmethod
+    def category_counts_query(user_id=None):
+        if user_id is not None:
+            return """
+                SELECT category, COUNT(*) AS count FROM shipping_entries
+                WHERE user_id = %s
+                GROUP BY category
+                ORDER BY count DESC, category
+            """, (user_id,)
+        return """
+            SELECT NULLIF(category, '') AS category, count
+            FROM entry_category_counts
+            WHERE count > 0
+            ORDER BY count DESC, category
+        """, ()
+
+    @staticmethod
+    def weekday_counts_query(user_id=None):
+        if user_id is not None and analytics_dialect() == 'sqlite':
+            return """
+                SELECT CAST(strftime('%%w', date) AS INTEGER) AS weekday, COUNT(*) AS count
+                FROM shipping_entries
+                WHERE user_id = %s
+                GROUP BY 1
+                ORDER BY 1
+            """, (user_id,)
+        if user_id is not None:
+            return """
+                SELECT EXTRACT(DOW FROM date)::smallint AS weekday, COUNT(*) AS count
                 FROM shipping_entries
-                ORDER BY date DESC
-            """)
-            
-            entries = cur.fetchall()
-            return entries
-        finally:
+                WHERE user_id = %s
+                GROUP BY 1
+                ORDER BY 1
+            """, (user_id,)
+        return """
+            SELECT weekday, count FROM entry_weekday_counts
+            WHERE count > 0
+            ORDER BY weekday
+        """, ()
+
+    @staticmethod
+    def monthly_counts_query(user_id=None):
+        if user_id is not None:
+            month = ("strftime('%%Y-%%m-01', date)" if analytics_dialect() == 'sqlite'
+                     else "CAST(date_trunc('month', date) AS DATE)")
+            return f"""
+                SELECT {month} AS month, category, status, COUNT(*) AS count
+                FROM shipping_entries
+                WHERE user_id = %s
+                GROUP BY 1, 2, 3
+                ORDER BY 1, 2, 3
+            """, (user_id,)
+        return """
+            SELECT month, NULLIF(category, '') AS category, NULLIF(status, '') AS status, count
+            FROM entry_monthly_counts
+            WHERE count > 0
+            ORDER BY month, category, status
+        """, ()
+
+    @staticmethod
+    def get_summary(since, user_id=None):
+        """Total ships, completed ships and ships dated after ``since``"""
+        with get_analytics_connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+
+            try:
+                cur.execute(*EntryRollup.summary_query(since, user_id))
+
+                return cur.fetchone()
+            finally:
+                cur.close()
+
+    @staticmethod
+    def get_daily_counts(user_id=None):
+        with get_analytics_connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+
+            try:
+                cur.execute(*EntryRollup.daily_counts_query(user_id))
+
+                return cur.fetchall()
+            finally:
+                cur.close()
+
+    @staticmethod
+    def get_category_counts(user_id=None):
+        with get_analytics_connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+
+            try:
+                cur.execute(*EntryRollup.category_counts_query(user_id))
+
+                return cur.fetchall()
+            finally:
+                cur.close()
+
+    @staticmethod
+    def get_weekday_counts(user_id=None):
+        """Counts per weekday, where weekday 0 is Sunday (Postgres DOW)"""
+        with get_analytics_connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+
+            try:
+                cur.execute(*EntryRollup.weekday_counts_query(user_id))
+
+                return cur.fetchall()
+            finally:
+                cur.close()
+
+    @staticmethod
+    def get_monthly_counts(user_id=None):
+        """
+        Entries per month, category and status
+
+        Returns:
+            list: {'month', 'category', 'status', 'count'} rows; month is the
+                first day of the month (an ISO string on SQLite)
+        """
+        with get_analytics_connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+
+            try:
+                cur.execute(*EntryRollup.monthly_counts_query(user_id))
+
+                return cur.fetchall()
+            finally:
+                cur.close()
+
+    @staticmethod
+    def rebuild():
+        """Recompute every rollup table from shipping_entries"""
+        with get_connection() as conn:
+            cur = conn.cursor()
+            EntryRollup.rebuild_tables(cur)
             cur.close()
-            conn.close()
 
-class Achievement:
+        bump_data_version('entries')
+
     @staticmethod
-    def init_achievements():
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        # Create achievements table if it doesn't exist
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS achievements (
-                id SERIAL PRIMARY KEY,
-                name VARCHAR(100) NOT NULL,
-                description TEXT,
-                badge_icon TEXT,
-                unlocked_at TIMESTAMP DEFAULT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                user_id INTEGER
+    def rebuild_tables(cur):
+        """Recompute the rollup tables inside the caller's transaction"""
+        get_backend().rebuild_rollups(cur)
+
+
+class EntryStatusChange:
+    """
+    Every status an entry has taken, recorded by a trigger (see migration 0013)
+
+    The history lives in the primary store rather than the analytics mirror;
+    durations are bucketed into whole days in SQL, so callers receive one
+    row per distinct duration however many entries there are.
+    """
+
+    @staticmethod
+    def durations_query(from_status='Planned', to_status='Completed', user_id=None):
+        """Days from an entry first reaching from_status to first reaching to_status after it"""
+        if dialect() == 'sqlite':
+            days = "CAST(julianday(finished_at) - julianday(started_at) AS INTEGER)"
+        else:
+            days = "FLOOR(EXTRACT(EPOCH FROM finished_at - started_at) / 86400)::integer"
+        owner, params = ("AND e.user_id = %s", (user_id,)) if user_id is not None else ("", ())
+        return f"""
+            WITH started AS (
+                SELECT entry_id, MIN(changed_at) AS started_at
+                FROM entry_status_changes
+                WHERE to_status = %s
+                GROUP BY entry_id
+            ), finished AS (
+                SELECT started.entry_id, started.started_at, MIN(s.changed_at) AS finished_at
+                FROM started
+                JOIN entry_status_changes s
+                  ON s.entry_id = started.entry_id
+                 AND s.to_status = %s
+                 AND s.changed_at >= started.started_at
+                GROUP BY started.entry_id, started.started_at
             )
-        """)
-        
-        # Insert default achievements if they don't exist
-        default_achievements = [
-            ("Starter Ship", "Ship your first project", "🌟"),
-            ("Weekly Warrior", "Complete 7 days shipping streak", "🔥"),
-            ("Monthly Master", "Complete 30 days shipping streak", "👑"),
-            ("Category Collector", "Ship projects in all categories", "🎯"),
-            ("Speed Demon", "Ship 3 projects in a single day", "⚡"),
-        ]
-        
-        for achievement in default_achievements:
+            SELECT {days} AS days, COUNT(*) AS count
+            FROM finished
+            JOIN shipping_entries e ON e.id = finished.entry_id
+            WHERE TRUE {owner}
+            GROUP BY 1
+            ORDER BY 1
+        """, (from_status, to_status) + params
+
+    @staticmethod
+    def get_durations(from_status='Planned', to_status='Completed', user_id=None):
+        """
+        Histogram of whole days between two statuses, for entries that reached both
+
+        Returns:
+            list: {'days', 'count'} rows ordered by days
+        """
+        with get_connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+
+            try:
+                cur.execute(*EntryStatusChange.durations_query(from_status, to_status, user_id))
+
+                return cur.fetchall()
+            finally:
+                cur.close()
+
+
+class Streak:
+    """
+    Current and longest shipping streak per user, maintained as entries change
+
+    Rows are keyed by user id; scope ALL_USERS (0) tracks every entry
+    regardless of owner and backs the public dashboard. current_streak is the
+    run of consecutive ship days ending on last_ship_date; get() decides
+    whether that run is still alive for the caller's "today".
+    """
+    ALL_USERS = 0
+
+    @staticmethod
+    def scopes_for(user_id):
+        return [Streak.ALL_USERS] if user_id is None else [Streak.ALL_USERS, user_id]
+
+    @staticmethod
+    def get_query(user_id=None):
+        return """
+            SELECT current_streak, longest_streak, last_ship_date
+            FROM streaks WHERE user_id = %s
+        """, (Streak.ALL_USERS if user_id is None else user_id,)
+
+    @staticmethod
+    def get(user_id=None, tz=None):
+        """
+        Streak for a user (or everyone when user_id is None)
+
+        Args:
+            user_id (int): Owner to report on, None for all entries
+            tz (str): IANA timezone deciding what "today" is; defaults to
+                APP_TIMEZONE or the server's local time
+        """
+        with get_connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            cur.execute(*Streak.get_query(user_id))
+            row = cur.fetchone()
+            cur.close()
+
+        return Streak.as_of_today(row, tz)
+
+    @staticmethod
+    def as_of_today(row, tz=None):
+        """Turn a stored streak row into what the user sees today"""
+        if row is None:
+            return {'current_streak': 0, 'longest_streak': 0, 'last_ship_date': None}
+
+        tz = tz or os.environ.get('APP_TIMEZONE')
+        today = datetime.now(ZoneInfo(tz)).date() if tz else date.today()
+        # A streak survives until a full day passes without shipping
+        if (today - row['last_ship_date']).days > 1:
+            row['current_streak'] = 0
+        return row
+
+    @staticmethod
+    def record_ship(cur, ship_date, user_id=None):
+        """Fold one newly inserted entry into the stored streaks (caller's transaction)"""
+        if isinstance(ship_date, datetime):
+            ship_date = ship_date.date()
+
+        for scope in Streak.scopes_for(user_id):
+            cur.execute("""
+                INSERT INTO streaks (user_id, current_streak, longest_streak, last_ship_date)
+                VALUES (%s, 1, 1, %s)
+                ON CONFLICT (user_id) DO NOTHING
+                RETURNING user_id
+            """, (scope, ship_date))
+            if cur.fetchone() is not None:
+                continue
+
             cur.execute("""
-                INSERT INTO achievements (name, description, badge_icon)
-                SELECT %s, %s, %s
-                WHERE NOT EXISTS (
-                    SELECT 1 FROM achievements WHERE name = %s
-                )
-            """, (*achievement, achievement[0]))
-        
-        conn.commit()
-        cur.close()
-        conn.close()
+                SELECT last_ship_date FROM streaks WHERE user_id = %s FOR UPDATE
+            """, (scope,))
+            gap = (ship_date - cur.fetchone()[0]).days
+
+            if gap == 0:
+                continue
+            elif gap == 1:
+                cur.execute("""
+                    UPDATE streaks
+                    SET current_streak = current_streak + 1,
+                        longest_streak = GREATEST(longest_streak, current_streak + 1),
+                        last_ship_date = %s, updated_at = CURRENT_TIMESTAMP
+                    WHERE user_id = %s
+                """, (ship_date, scope))
+            elif gap > 1:
+                cur.execute("""
+                    UPDATE streaks
+                    SET current_streak = 1, last_ship_date = %s,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE user_id = %s
+                """, (ship_date, scope))
+            else:
+                # Backdated entry: it may bridge two earlier runs
+                Streak.recompute(cur, {scope: [ship_date]})
+
+    # Ship days fetched per query while walking a run
+    RUN_PAGE = 64
 
     @staticmethod
-    def get_achievements(user_id=None):
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        if user_id:
+    def _ship_days(cur, scope, days):
+        """Which of ``days`` the scope still has entries on"""
+        if scope == Streak.ALL_USERS:
+            cur.execute("SELECT date FROM entry_daily_counts WHERE date = ANY(%s)", (days,))
+        else:
             cur.execute("""
-                SELECT * FROM achievements
-                WHERE user_id = %s OR user_id IS NULL
-                ORDER BY unlocked_at NULLS LAST, name
-            """, (user_id,))
+                SELECT DISTINCT date FROM shipping_entries
+                WHERE user_id = %s AND date = ANY(%s)
+            """, (scope, days))
+        return {ShippingEntry._as_date(row[0]) for row in cur.fetchall()}
+
+    @staticmethod
+    def _days_beyond(cur, scope, day, step, limit):
+        """Up to ``limit`` ship days strictly past ``day`` going ``step`` (+1/-1), nearest first"""
+        op, order = ('>', 'ASC') if step > 0 else ('<', 'DESC')
+        if scope == Streak.ALL_USERS:
+            cur.execute(f"""
+                SELECT date FROM entry_daily_counts WHERE date {op} %s
+                ORDER BY date {order} LIMIT %s
+            """, (day, limit))
         else:
+            cur.execute(f"""
+                SELECT DISTINCT date FROM shipping_entries
+                WHERE user_id = %s AND date {op} %s
+                ORDER BY date {order} LIMIT %s
+            """, (scope, day, limit))
+        return [ShippingEntry._as_date(row[0]) for row in cur.fetchall()]
+
+    @staticmethod
+    def _run_edge(cur, scope, day, step, bridged=frozenset()):
+        """
+        Last day of the run through ``day`` going ``step`` (+1/-1)
+
+        Walks the date index a page at a time and stops at the first gap, so
+        the cost follows the run's length rather than the history's. Days in
+        ``bridged`` count as shipped.
+        """
+        one = timedelta(days=step)
+
+        def extend(edge):
+            while edge + one in bridged:
+                edge += one
+            return edge
+
+        edge = extend(day)
+        while True:
+            days = Streak._days_beyond(cur, scope, edge, step, Streak.RUN_PAGE)
+            for shipped in days:
+                if shipped != edge + one:
+                    return edge
+                edge = extend(shipped)
+            if len(days) < Streak.RUN_PAGE:
+                return edge
+
+    @staticmethod
+    def _run_length(cur, scope, day, bridged=frozenset()):
+        start = Streak._run_edge(cur, scope, day, -1, bridged)
+        end = Streak._run_edge(cur, scope, day, 1, bridged)
+        return (end - start).days + 1
+
+    @staticmethod
+    def _store(cur, scope, current_streak, longest_streak, last_ship_date):
+        cur.execute("""
+            INSERT INTO streaks (user_id, current_streak, longest_streak, last_ship_date)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (user_id) DO UPDATE
+            SET current_streak = EXCLUDED.current_streak,
+                longest_streak = EXCLUDED.longest_streak,
+                last_ship_date = EXCLUDED.last_ship_date,
+                updated_at = CURRENT_TIMESTAMP
+        """, (scope, current_streak, longest_streak, last_ship_date))
+
+    @staticmethod
+    def recompute(cur, changed):
+        """
+        Bring stored streaks up to date after entries were moved or deleted
+
+        Only the runs around the changed days are re-read. A scope is recounted
+        in full when a day it lost may have split its longest run.
+
+        Args:
+            cur: Cursor in the writer's transaction
+            changed (dict): scope -> days that may have gained or lost their
+                only entry
+        """
+        for scope, days in changed.items():
+            days = {ShippingEntry._as_date(day) for day in days}
+            latest = Streak._days_beyond(cur, scope, date.max, -1, 1)
+            if not latest:
+                cur.execute("DELETE FROM streaks WHERE user_id = %s", (scope,))
+                continue
+
             cur.execute("""
-                SELECT * FROM achievements
-                ORDER BY unlocked_at NULLS LAST, name
-            """)
-        
-        achievements = cur.fetchall()
-        cur.close()
-        conn.close()
-        return achievements
+                SELECT longest_streak FROM streaks WHERE user_id = %s FOR UPDATE
+            """, (scope,))
+            row = cur.fetchone()
+            present = Streak._ship_days(cur, scope, list(days))
+            lost = days - present
+
+            # Counting lost days as shipped gives an upper bound on the run
+            # each one broke; below the longest, that run was not the longest
+            if row is None or any(Streak._run_length(cur, scope, day, lost) >= row[0]
+                                  for day in lost):
+                Streak.recount(cur, scope)
+                continue
+
+            current_streak = Streak._run_length(cur, scope, latest[0])
+            longest_streak = max([row[0], current_streak]
+                                 + [Streak._run_length(cur, scope, day) for day in present])
+            Streak._store(cur, scope, current_streak, longest_streak, latest[0])
 
     @staticmethod
-    def unlock_achievement(name, user_id=None):
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        try:
+    def recount(cur, scope):
+        """Recompute one scope's streak from all of its ship days"""
+        if scope == Streak.ALL_USERS:
+            cur.execute("SELECT date FROM entry_daily_counts")
+        else:
             cur.execute("""
-                UPDATE achievements
-                SET unlocked_at = CURRENT_TIMESTAMP, user_id = %s
-                WHERE name = %s AND unlocked_at IS NULL
-                RETURNING id
-            """, (user_id, name))
-            
-            unlocked = cur.fetchone() is not None
-            conn.commit()
-            return unlocked
-        finally:
+                SELECT DISTINCT date FROM shipping_entries WHERE user_id = %s
+            """, (scope,))
+        stats = compute_streaks([row[0] for row in cur.fetchall()]).get(0)
+
+        if stats is None:
+            cur.execute("DELETE FROM streaks WHERE user_id = %s", (scope,))
+            return
+        Streak._store(cur, scope, stats['current_streak'], stats['longest_streak'],
+                      stats['last_ship_date'])
+
+    @staticmethod
+    def rebuild(cur=None):
+        """Recompute every user's streak (and the global one) in one vectorized pass"""
+        if cur is None:
+            with get_connection() as conn:
+                cur = conn.cursor()
+                Streak.rebuild(cur)
+                cur.close()
+            return
+
+        cur.execute("SELECT DISTINCT user_id, date FROM shipping_entries")
+        rows = cur.fetchall()
+        owned = [(user_id, day) for user_id, day in rows if user_id is not None]
+        streaks = compute_streaks(
+            [day for _, day in rows] + [day for _, day in owned],
+            [Streak.ALL_USERS] * len(rows) + [user_id for user_id, _ in owned],
+        )
+
+        cur.execute("DELETE FROM streaks")
+        execute_values(cur, """
+            INSERT INTO streaks (user_id, current_streak, longest_streak, last_ship_date)
+            VALUES %s
+        """, [(scope, s['current_streak'], s['longest_streak'], s['last_ship_date'])
+              for scope, s in streaks.items()])
+
+class Achievement:
+    PROGRESS_FIELDS = ['ships', 'distinct_categories', 'max_daily_count',
+                       'current_streak', 'longest_streak']
+
+    @staticmethod
+    def achievements_query(user_id=None):
+        # The scope's progress counters ride along on every row, so the
+        # Achievements page needs this one statement (see progress_from)
+        scope = Streak.ALL_USERS if user_id is None else user_id
+        return f"""
+            SELECT a.id, a.name, a.description, a.badge_icon, ua.unlocked_at,
+                   {', '.join('p.' + f for f in Achievement.PROGRESS_FIELDS)}
+            FROM achievements a
+            LEFT JOIN user_achievements ua
+                ON ua.achievement_id = a.id AND ua.user_id = %s
+            LEFT JOIN user_achievement_progress p ON p.user_id = %s
+            ORDER BY ua.unlocked_at NULLS LAST, a.name
+        """, (scope, scope)
+
+    @staticmethod
+    def progress_from(achievements):
+        """The progress row carried by get_achievements() rows, None if there is none"""
+        if not achievements or achievements[0]['ships'] is None:
+            return None
+        return {f: achievements[0][f] for f in Achievement.PROGRESS_FIELDS}
+
+    @staticmethod
+    def progress_query(user_id=None):
+        return """
+            SELECT ships, distinct_categories, max_daily_count,
+                   current_streak, longest_streak
+            FROM user_achievement_progress WHERE user_id = %s
+        """, (Streak.ALL_USERS if user_id is None else user_id,)
+
+    @staticmethod
+    def get_achievements(user_id=None):
+        """
+        Every achievement with the user's unlock time, or all-entries unlocks when user_id is None
+
+        Each row also holds the scope's progress counters; see progress_from().
+        """
+        with get_connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+
+            cur.execute(*Achievement.achievements_query(user_id))
+
+            achievements = cur.fetchall()
+            cur.close()
+            return achievements
+
+    @staticmethod
+    def get_progress(user_id=None):
+        with get_connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+
+            cur.execute(*Achievement.progress_query(user_id))
+
+            progress = cur.fetchone()
             cur.close()
-            conn.close()
+            return progress
+
+    @staticmethod
+    def unlock_achievement(name, user_id=None):
+        with get_connection() as conn:
+            cur = conn.cursor()
+
+            try:
+                cur.execute("""
+                    INSERT INTO user_achievements (user_id, achievement_id)
+                    SELECT %s, id FROM achievements WHERE name = %s
+                    ON CONFLICT DO NOTHING
+                    RETURNING achievement_id
+                """, (Streak.ALL_USERS if user_id is None else user_id, name))
+
+                return cur.fetchone() is not None
+            finally:
+                cur.close()
@@ -0,0 +1,135 @@
+"""Cross-process cache invalidation over Postgres LISTEN/NOTIFY
+
+Triggers from migration 0011 send a ``data_changes`` notification for every
+committed statement that writes entries. Each app process
+runs one daemon thread holding a dedicated connection that LISTENs for them
+and invalidates the in-process caches:
+
+- entry changes with known dates are re-emitted as ENTRIES_CHANGED, so
+  caches evict only what covers those dates, exactly as for local writes;
+- broader entry changes (TRUNCATE, huge statements) bump the 'entries'
+  data version, which misses every entry cache.
+
+Notifications from this process's own sessions are skipped: local writers
+already emit precise events when they commit. After a dropped connection
+every version is bumped, since notifications sent meanwhile are lost.
+"""
+import os
+import json
+import select
+import threading
+from datetime import date
+import psycopg2
+import psycopg2.extensions
+from database import get_db_connection, get_backend, APPLICATION_NAME
+from cache import bump_data_version
+from events import emit, ENTRIES_CHANGED
+
+CHANNEL = 'data_changes'
+
+# Table -> data version its changes invalidate
+TABLE_VERSIONS = {
+    'shipping_entries': 'entries',
+}
+
+POLL_INTERVAL = 5
+MAX_BACKOFF = 60
+
+_thread = None
+_stop = threading.Event()
+_lock = threading.Lock()
+_stats = {'received': 0, 'own': 0, 'evictions': 0, 'bumps': 0, 'reconnects': 0}
+
+def handle_notification(payload):
+    """Invalidate caches for one ``data_changes`` payload (a JSON string)"""
+    change = json.loads(payload)
+    with _lock:
+        _stats['received'] += 1
+        if change.get('origin') == APPLICATION_NAME:
+            _stats['own'] += 1
+            return
+
+    table = change.get('table')
+    name = TABLE_VERSIONS.get(table)
+    if name is None:
+        return
+
+    dates = change.get('dates')
+    if table == 'shipping_entries' and dates:
+        # Only the dates are known; that is all the entry caches evict on
+        emit(ENTRIES_CHANGED, changes=[
+            {'id': None, 'columns': None, 'before': None,
+             'after': {'date': date.fromisoformat(day)}}
+            for day in dates
+        ])
+        with _lock:
+            _stats['evictions'] += 1
+    else:
+        bump_data_version(name)
+        with _lock:
+            _stats['bumps'] += 1
+
+def _bump_all():
+    for name in set(TABLE_VERSIONS.values()):
+        bump_data_version(name)
+
+def _listen():
+    backoff = 1
+    connected_before = False
+    while not _stop.is_set():
+        conn = None
+        try:
+            conn = get_db_connection()
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            cur = conn.cursor()
+            cur.execute(f"LISTEN {CHANNEL}")
+            cur.close()
+
+            if connected_before:
+                with _lock:
+                    _stats['reconnects'] += 1
+                _bump_all()
+            connected_before = True
+            backoff = 1
+
+            while not _stop.is_set():
+                if select.select([conn], [], [], POLL_INTERVAL) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    try:
+                        handle_notification(notify.payload)
+                    except Exception as e:
+                        print(f"Error handling change notification {notify.payload!r}: {e}")
+        except (psycopg2.Error, OSError) as e:
+            print(f"Change listener disconnected, retrying in {backoff}s: {e}")
+            _stop.wait(backoff)
+            backoff = min(backoff * 2, MAX_BACKOFF)
+        finally:
+            if conn is not None and not conn.closed:
+                conn.close()
+
+def start_listener():
+    """Start this process's listener thread once; set DB_CHANGE_LISTENER=0 to disable
+
+    Does nothing on backends without change notifications (embedded).
+    """
+    global _thread
+    if os.environ.get('DB_CHANGE_LISTENER', '1') == '0' or not get_backend().notifications:
+        return None
+    with _lock:
+        if _thread is None or not _thread.is_alive():
+            _stop.clear()
+            _thread = threading.Thread(target=_listen, name='change-listener', daemon=True)
+            _thread.start()
+        return _thread
+
+def stop_listener(timeout=None):
+    _stop.set()
+    if _thread is not None:
+        _thread.join(timeout)
+
+def listener_stats():
+    with _lock:
+        return dict(_stats, running=_thread is not None and _thread.is_alive())
@@ -0,0 +1,118 @@
+"""Maintenance for the monthly partitions of shipping_entries
+
+Partitions are named ``shipping_entries_YYYY_MM`` and are normally created on
+demand by writers (``ShippingEntry.ensure_partitions``). Archiving detaches
+whole months older than a cutoff and renames them
+``shipping_entries_archive_YYYY_MM``. They then drop out of every dashboard
+query but stay in the database until you dump or drop them. Rollups, streaks
+and achievement progress are rebuilt without them; unlocked achievements are
+kept.
+
+Usage:
+    python partitions.py                       # list partitions
+    python partitions.py create [MONTHS]       # create the next MONTHS (default 3)
+    python partitions.py archive YYYY-MM-DD    # detach months ending before the date
+"""
+import sys
+from datetime import date
+from database import get_connection, dialect
+from cache import bump_data_version
+from rebuild_rollups import rebuild_all
+
+PREFIX = 'shipping_entries_'
+ARCHIVE_PREFIX = 'shipping_entries_archive_'
+
+def _month(name, prefix=PREFIX):
+    year, month = name[len(prefix):].split('_')
+    return date(int(year), int(month), 1)
+
+def list_partitions():
+    """Return (name, month, estimated rows) for every attached partition, oldest first"""
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT c.relname, c.reltuples::bigint
+            FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'shipping_entries'::regclass
+            ORDER BY c.relname
+        """)
+        rows = cur.fetchall()
+        cur.close()
+    return [(name, _month(name), max(rows, 0)) for name, rows in rows]
+
+def create_partitions(months_ahead=3):
+    """Create partitions from this month through ``months_ahead`` later; return those created"""
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT month::date, ensure_entry_partition(month::date)
+            FROM generate_series(date_trunc('month', CURRENT_DATE),
+                                 date_trunc('month', CURRENT_DATE) + %s * INTERVAL '1 month',
+                                 INTERVAL '1 month') AS month
+        """, (months_ahead,))
+        created = [month for month, was_created in cur.fetchall() if was_created]
+        cur.close()
+    return created
+
+def archive_partitions(before):
+    """
+    Detach every partition whose month ends on or before ``before``
+
+    Runs in one transaction, so dashboards never see a half-archived
+    history. DETACH takes a brief exclusive lock on shipping_entries.
+
+    Returns:
+        list: Names of the archived tables
+    """
+    cutoff = date(before.year, before.month, 1)
+    archived = []
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT c.relname
+            FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'shipping_entries'::regclass
+            ORDER BY c.relname
+        """)
+        for (name,) in cur.fetchall():
+            if _month(name) >= cutoff:
+                continue
+            archive = ARCHIVE_PREFIX + name[len(PREFIX):]
+            cur.execute(f"ALTER TABLE shipping_entries DETACH PARTITION {name}")
+            cur.execute(f"ALTER TABLE {name} RENAME TO {archive}")
+            archived.append(archive)
+
+        if archived:
+            rebuild_all(cur)
+            # DETACH fires no triggers, so announce it for other processes' caches
+            cur.execute("""
+                SELECT pg_notify('data_changes', json_build_object(
+                    'table', 'shipping_entries',
+                    'origin', current_setting('application_name'),
+                    'dates', NULL
+                )::text)
+            """)
+        cur.close()
+
+    if archived:
+        bump_data_version('entries')
+    return archived
+
+if __name__ == "__main__":
+    if dialect() != 'postgres':
+        print("Only the Postgres backend partitions shipping_entries")
+        sys.exit(1)
+    command = sys.argv[1] if len(sys.argv) > 1 else 'list'
+    if command == 'list':
+        for name, month, rows in list_partitions():
+            print(f"{name:<32} {month:%Y-%m} ~{rows} rows")
+    elif command == 'create':
+        created = create_partitions(int(sys.argv[2]) if len(sys.argv) > 2 else 3)
+        print(f"Created partitions for: {', '.join(f'{m:%Y-%m}' for m in created)}"
+              if created else "All partitions already exist")
+    elif command == 'archive' and len(sys.argv) > 2:
+        archived = archive_partitions(date.fromisoformat(sys.argv[2]))
+        print(f"Archived: {', '.join(archived)}" if archived else "Nothing to archive")
+    else:
+        print(__doc__)
+        sys.exit(1)
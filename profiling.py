@@ -0,0 +1,139 @@
+"""Per-rerun profiling: wall time per section and stats for every SQL statement
+
+main() starts a Profile for each rerun and wraps its phases in section();
+database's cursors (and async_db's) report each statement through
+record_query(). The profile lives in a context variable, so queries run by
+asyncio tasks and asyncio.to_thread workers land in the rerun that started
+them, and statements outside a rerun (CLIs, migrations) cost one lookup.
+
+finish() appends one JSON line per rerun to PROFILE_METRICS_FILE (default
+profile_metrics.jsonl, empty to disable), rolled over to ``<file>.1`` past
+PROFILE_METRICS_MAX_BYTES. Admins see the same data in the debug panel
+(components/debug_panel.py).
+"""
+import os
+import json
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+
+METRICS_FILE = os.environ.get('PROFILE_METRICS_FILE', 'profile_metrics.jsonl')
+METRICS_MAX_BYTES = int(os.environ.get('PROFILE_METRICS_MAX_BYTES', 5 * 1024 * 1024))
+
+# Statements are grouped by their first characters, whitespace collapsed
+SQL_PREVIEW_LENGTH = 200
+
+_current = contextvars.ContextVar('profile', default=None)
+_file_lock = threading.Lock()
+
+def _preview(sql):
+    if isinstance(sql, bytes):
+        sql = sql.decode('utf-8', 'replace')
+    return ' '.join(str(sql).split())[:SQL_PREVIEW_LENGTH]
+
+class Profile:
+    """Timings of one script rerun"""
+
+    def __init__(self, page):
+        self.page = page
+        self.created_at = datetime.now()
+        self.started = time.perf_counter()
+        self.total_ms = None
+        self.sections = []  # [name, depth, ms] in start order; ms is None until it ends
+        self.queries = []   # {'sql', 'ms', 'rows'} in issue order
+        self._depth = 0
+        self._lock = threading.Lock()
+
+    def add_query(self, sql, seconds, rows):
+        query = {'sql': _preview(sql), 'ms': seconds * 1000, 'rows': rows}
+        with self._lock:
+            self.queries.append(query)
+        return query
+
+    def query_stats(self):
+        """Per-statement count, total/max latency and rows, slowest total first"""
+        grouped = {}
+        with self._lock:
+            queries = list(self.queries)
+        for query in queries:
+            stats = grouped.setdefault(query['sql'], {'sql': query['sql'], 'count': 0,
+                                                      'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0})
+            stats['count'] += 1
+            stats['total_ms'] += query['ms']
+            stats['max_ms'] = max(stats['max_ms'], query['ms'])
+            stats['rows'] += query['rows']
+        return sorted(grouped.values(), key=lambda stats: stats['total_ms'], reverse=True)
+
+    def summary(self):
+        """The profile as one JSON-serializable metrics record"""
+        sections = {}
+        for name, _, ms in self.sections:
+            sections[name] = round(sections.get(name, 0) + (ms or 0), 3)
+        with self._lock:
+            queries = list(self.queries)
+        slowest = max(queries, key=lambda query: query['ms'], default=None)
+        return {
+            'ts': self.created_at.isoformat(timespec='seconds'),
+            'page': self.page,
+            'total_ms': round(self.total_ms, 3) if self.total_ms is not None else None,
+            'sections': sections,
+            'queries': len(queries),
+            'query_ms': round(sum(query['ms'] for query in queries), 3),
+            'rows': sum(query['rows'] for query in queries),
+            'slowest_query': slowest and {'sql': slowest['sql'], 'ms': round(slowest['ms'], 3)},
+        }
+
+def start(page):
+    """Begin profiling a rerun of ``page`` in the current context"""
+    profile = Profile(page)
+    _current.set(profile)
+    return profile
+
+def current():
+    return _current.get()
+
+@contextmanager
+def section(name):
+    """Record the wall time of the enclosed block under ``name``"""
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    depth = profile._depth
+    entry = [name, depth, None]
+    profile.sections.append(entry)
+    profile._depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile._depth = depth
+        entry[2] = (time.perf_counter() - started) * 1000
+
+def record_query(sql, seconds, rows=0):
+    """Add one statement to the current rerun's profile; returns its record or None"""
+    profile = _current.get()
+    if profile is None:
+        return None
+    return profile.add_query(sql, seconds, rows)
+
+def finish(profile):
+    """Close the rerun's profile and append its summary to the metrics file"""
+    profile.total_ms = (time.perf_counter() - profile.started) * 1000
+    if METRICS_FILE:
+        write_metrics(profile.summary())
+    return profile
+
+def write_metrics(record, path=None):
+    path = path or METRICS_FILE
+    line = json.dumps(record, default=str) + '\n'
+    with _file_lock:
+        try:
+            if os.path.exists(path) and os.path.getsize(path) > METRICS_MAX_BYTES:
+                os.replace(path, path + '.1')
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(line)
+        except OSError as e:
+            print(f"Error writing profile metrics: {e}")
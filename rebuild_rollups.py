@@ -0,0 +1,40 @@
+from database import get_connection
+from cache import bump_data_version
+from models import Streak, EntryRollup
+import achievement_rules
+
+def rebuild_all(cur, rollups=True):
+    """
+    Recompute everything derived from shipping_entries inside the caller's transaction
+
+    Rollups, streaks and achievement progress are rebuilt with set-based or
+    vectorized passes, then every rule gets a chance to fire. Returns the
+    names of newly unlocked achievements. Pass rollups=False when the caller
+    has already brought the rollup tables up to date.
+    """
+    if rollups:
+        EntryRollup.rebuild_tables(cur)
+    Streak.rebuild(cur)
+
+    # Backfills bypass add_entry, so recount progress and give every rule a chance to fire
+    achievement_rules.rebuild_progress(cur)
+    cur.execute("SELECT user_id FROM user_achievement_progress")
+    unlocked = []
+    for (scope,) in cur.fetchall():
+        unlocked += achievement_rules.dispatch(cur, scope, achievement_rules.ALL_EVENTS)
+    return unlocked
+
+def rebuild_rollups():
+    """Recompute the dashboard rollup tables and streaks, e.g. after a backfill"""
+    with get_connection() as conn:
+        cur = conn.cursor()
+        unlocked = rebuild_all(cur)
+        cur.close()
+    bump_data_version('entries')
+
+    print("Rebuilt entry rollups, streaks and achievement progress")
+    if unlocked:
+        print(f"Unlocked achievements: {', '.join(unlocked)}")
+
+if __name__ == "__main__":
+    rebuild_rollups()
@@ -41,6 +41,7 @@ def update_admin_and_add_projects():
 		]
 
 		for project in completed_projects:
+				cur.execute("SELECT ensure_entry_partition(%s)", (project["date"],))
 				cur.execute("""
 						INSERT INTO shipping_entries 
 						(date, project_name, description, category, status)
@@ -1,43 +1,40 @@
-import os
-from database import get_db_connection
-from werkzeug.security import generate_password_hash
-from datetime import datetime, timedelta
+from models import ShippingEntry
 
 def update_project(project_id, updates):
     """
     Update a project's details in the shipping_entries table
-    
+
     Args:
         project_id (int): The ID of the project to update
         updates (dict): Dictionary containing the fields to update and their new values
     """
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
+    return update_projects([(project_id, updates)])[0]
+
+def update_projects(changes):
+    """
+    Update many projects in one round-trip
+
+    Args:
+        changes (list): (project_id, updates) pairs; see ShippingEntry.bulk_update
+    """
     try:
-        # Build the SET clause dynamically based on the provided updates
-        set_clause = ", ".join([f"{key} = %s" for key in updates.keys()])
-        values = list(updates.values())
-        values.append(project_id)  # Add project_id for WHERE clause
-        
-        query = f"""
-            UPDATE shipping_entries 
-            SET {set_clause}
-            WHERE id = %s
-        """
-        
-        cur.execute(query, values)
-        conn.commit()
-        print(f"Successfully updated project {project_id}")
-        
+        outcomes = ShippingEntry.bulk_update(changes)
     except Exception as e:
         print(f"Error updating project: {e}")
-    finally:
-        cur.close()
-        conn.close()
+        return [{'id': project_id, 'status': 'error', 'columns': [], 'error': str(e)}
+                for project_id, _ in changes]
+
+    for outcome in outcomes:
+        if outcome['status'] == 'updated':
+            print(f"Successfully updated project {outcome['id']}")
+        elif outcome['status'] == 'not_found':
+            print(f"Project {outcome['id']} not found")
+        else:
+            print(f"Error updating project {outcome['id']}: {outcome['error']}")
+    return outcomes
 
 if __name__ == "__main__":
     updates = {
         "project_name": "cookie.bchwy.com",
     }
-    update_project(4, updates)
\ No newline at end of file
+    update_project(4, updates)
@@ -1,40 +1,148 @@
-from datetime import datetime, timedelta
-import pandas as pd
-
-def get_date_range(entries, days=30):
-    df = pd.DataFrame(entries)
-    if len(entries) > 0 and 'date' in df.columns:
-        df['date'] = pd.to_datetime(df['date'])
-        
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=days)
-        
-        return df[(df['date'] >= start_date) & (df['date'] <= end_date)]
-    return df
-
-def calculate_streak(entries):
-    if not entries:
-        return 0
-        
-    df = pd.DataFrame(entries)
-    if 'date' not in df.columns or len(df) == 0:
-        return 0
-        
-    df['date'] = pd.to_datetime(df['date'])
-    df = df.sort_values('date')
-    
-    current_streak = 0
-    last_date = datetime.now().date()
-    
-    dates = df['date'].dt.date.tolist()
-    if not dates:
-        return 0
-        
-    for date in dates[::-1]:
-        if (last_date - date).days == 1:
-            current_streak += 1
-            last_date = date
-        else:
-            break
-    
-    return current_streak
+# numpy is imported inside each function: the models import this module, and
+# most reruns never call it
+
+def compute_streaks(days, scopes=None):
+    """
+    Compute shipping streaks in one vectorized pass, optionally per scope
+
+    Args:
+        days (array-like): Ship dates; duplicates and any order are fine
+        scopes (array-like): Scope id (e.g. user id) for each date, or None
+            to treat all dates as a single scope 0
+
+    Returns:
+        dict: scope -> {'current_streak', 'longest_streak', 'last_ship_date'}
+            where current_streak is the run of consecutive days ending on
+            last_ship_date (callers decide whether that run is still alive)
+    """
+    import numpy as np
+
+    days = np.asarray(days, dtype='datetime64[D]').astype(np.int64)
+    if len(days) == 0:
+        return {}
+    if scopes is None:
+        scopes = np.zeros(len(days), dtype=np.int64)
+    else:
+        scopes = np.asarray(scopes, dtype=np.int64)
+
+    # Distinct (scope, day) pairs sorted by scope then day
+    pairs = np.unique(np.stack([scopes, days], axis=1), axis=0)
+    scope, day = pairs[:, 0], pairs[:, 1]
+
+    # A run starts wherever the scope changes or a day is skipped
+    run_starts = np.ones(len(day), dtype=bool)
+    run_starts[1:] = (scope[1:] != scope[:-1]) | (np.diff(day) != 1)
+    run_lengths = np.bincount(np.cumsum(run_starts) - 1)
+    run_scopes = scope[run_starts]
+
+    scope_starts = np.flatnonzero(np.r_[True, run_scopes[1:] != run_scopes[:-1]])
+    scope_last_runs = np.r_[scope_starts[1:] - 1, len(run_lengths) - 1]
+    longest = np.maximum.reduceat(run_lengths, scope_starts)
+
+    scope_ends = np.r_[np.flatnonzero(scope[1:] != scope[:-1]), len(scope) - 1]
+    last_days = day[scope_ends].astype('datetime64[D]').astype(object)
+
+    return {
+        int(s): {
+            'current_streak': int(run_lengths[last_run]),
+            'longest_streak': int(best),
+            'last_ship_date': last_day,
+        }
+        for s, last_run, best, last_day in zip(
+            run_scopes[scope_starts], scope_last_runs, longest, last_days)
+    }
+
+# Largest number of buckets compute_frequency picks automatically
+MAX_FREQUENCY_BUCKETS = 120
+
+def compute_frequency(days, counts=None, granularity=None,
+                      max_buckets=MAX_FREQUENCY_BUCKETS):
+    """
+    Bucket ship counts by day, week or month in one vectorized pass
+
+    Args:
+        days (array-like): Ship dates, in any order
+        counts (array-like): Ships on each date (e.g. rollup rows), or None
+            to count each date once
+        granularity (str): 'day', 'week' (Monday-based) or 'month'; None
+            picks the finest one that fits in ``max_buckets``
+        max_buckets (int): Bucket budget for automatic granularity
+
+    Returns:
+        dict: {'granularity', 'starts' (datetime64[D] bucket starts),
+            'counts' (every bucket, zeros included)}
+    """
+    import numpy as np
+
+    days = np.asarray(days, dtype='datetime64[D]')
+    weights = None if counts is None else np.asarray(counts, dtype=np.float64)
+    if len(days) == 0:
+        return {'granularity': granularity or 'day',
+                'starts': np.array([], dtype='datetime64[D]'),
+                'counts': np.array([], dtype=np.int64)}
+
+    offsets = days.astype(np.int64)
+    span = offsets.max() - offsets.min() + 1
+    if granularity is None:
+        granularity = ('day' if span <= max_buckets else
+                       'week' if span <= max_buckets * 7 else 'month')
+
+    if granularity == 'day':
+        index = offsets
+    elif granularity == 'week':
+        # The epoch was a Thursday; shift so weeks start on Monday
+        index = (offsets + 3) // 7
+    elif granularity == 'month':
+        index = days.astype('datetime64[M]').astype(np.int64)
+    else:
+        raise ValueError(f"Unknown granularity {granularity!r}")
+
+    first = index.min()
+    totals = np.bincount(index - first, weights=weights).astype(np.int64)
+    buckets = np.arange(first, first + len(totals))
+
+    if granularity == 'day':
+        starts = buckets.astype('datetime64[D]')
+    elif granularity == 'week':
+        starts = (buckets * 7 - 3).astype('datetime64[D]')
+    else:
+        starts = buckets.astype('datetime64[M]').astype('datetime64[D]')
+
+    return {'granularity': granularity, 'starts': starts, 'counts': totals}
+
+def rolling_mean(values, window):
+    """Trailing mean over ``window`` values; the first window-1 average what they have"""
+    import numpy as np
+
+    values = np.asarray(values, dtype=np.float64)
+    cumulative = np.cumsum(np.r_[0, values])
+    upper = np.arange(1, len(values) + 1)
+    lower = np.maximum(upper - window, 0)
+    return (cumulative[upper] - cumulative[lower]) / (upper - lower)
+
+def summarize_durations(days, counts):
+    """
+    Summary statistics of a duration histogram
+
+    Args:
+        days (array-like): Distinct durations in days, ascending
+        counts (array-like): How many entries took each duration
+
+    Returns:
+        dict: {'entries', 'mean', 'median', 'p90'}; the averages are None
+            when the histogram is empty
+    """
+    import numpy as np
+
+    days = np.asarray(days, dtype=np.float64)
+    counts = np.asarray(counts, dtype=np.int64)
+    total = int(counts.sum())
+    if total == 0:
+        return {'entries': 0, 'mean': None, 'median': None, 'p90': None}
+
+    # Percentiles by rank over the cumulative counts, no expansion per entry
+    cumulative = np.cumsum(counts)
+    ranks = np.ceil(np.array([0.5, 0.9]) * total)
+    median, p90 = days[np.searchsorted(cumulative, ranks)]
+    return {'entries': total, 'mean': float(np.dot(days, counts) / total),
+            'median': float(median), 'p90': float(p90)}